@@ -0,0 +1 @@
+"""Benchmarks de la persistance (non chargés par le bot)"""
@@ -0,0 +1,153 @@
+"""Benchmark des codecs de sérialisation sur des données de la taille d'un gros serveur.
+
+Mesure la sérialisation, l'écriture atomique, la lecture et la taille de
+persistent_data.json et xp_data.json pour chaque codec disponible.
+
+Utilisation :
+    python -m benchmarks.bench_codec
+    python -m benchmarks.bench_codec --users 10000,100000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from utils import codec as codec_module
+from utils.codec import Codec, CodecError, read_file
+from utils.persistence import atomic_write
+
+
+def make_xp_data(users):
+    """Même forme que les enregistrements du cog Levels"""
+    rng = random.Random(42)
+    data = {}
+    for index in range(users):
+        xp = rng.randint(0, 500_000)
+        data[str(100_000_000_000_000_000 + index)] = {
+            'xp': xp,
+            'level': int((xp / 100) ** 0.5),
+            'messages': rng.randint(0, 20_000)
+        }
+    return data
+
+
+def make_persistent_data(users):
+    """Même forme que persistent_data.json, avec un enregistrement de modération par utilisateur"""
+    rng = random.Random(7)
+    banned = {}
+    authorized = {}
+    for index in range(users):
+        user_id = str(100_000_000_000_000_000 + index)
+        banned[user_id] = {
+            'reason': rng.choice(["Spam", "Raid", "Insultes répétées", "Publicité"]),
+            'banned_by': str(200_000_000_000_000_000 + rng.randint(0, 50)),
+            'date': '2024-01-15T03:00:00'
+        }
+        if index % 100 == 0:
+            authorized[user_id] = {'level': rng.randint(1, 3), 'granted_by': 'owner'}
+
+    return {
+        'tickets': {'config': {'active_tickets': {}}},
+        'roles': {'config': {'role_message_id': None, 'role_messages': {}}},
+        'welcome': {'config': {}},
+        'moderation': {'banned_users': banned, 'authorized_users': authorized, 'super_banned_users': {}},
+        'system': {'anonymous_commands': True}
+    }
+
+
+def legacy_encode(data):
+    """Ancien chemin : json.dump(..., indent=2, ensure_ascii=False) de la bibliothèque standard"""
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def legacy_decode(raw):
+    return json.loads(raw.decode('utf-8'))
+
+
+def available_codecs():
+    codecs = [('stdlib json indent=2 (ancien)', legacy_encode, legacy_decode)]
+    for format_name, compression in [
+        ('json', None), ('json-compact', None), ('json-compact', 'zlib'),
+        ('json-compact', 'zstd'), ('msgpack', None), ('msgpack', 'zstd')
+    ]:
+        try:
+            codec = Codec(format_name, compression)
+        except CodecError:
+            continue
+        codecs.append((codec.describe(), codec.encode, codec.decode))
+    return codecs
+
+
+def measure(function, repeat):
+    """Meilleur temps sur `repeat` exécutions (secondes) et dernier résultat"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(users_list, repeat, directory):
+    results = []
+    for users in users_list:
+        datasets = {
+            'persistent_data.json': make_persistent_data(users),
+            'xp_data.json': make_xp_data(users)
+        }
+        for filename, data in datasets.items():
+            path = os.path.join(directory, filename)
+            for name, encode, decode in available_codecs():
+                encode_time, payload = measure(lambda: encode(data), repeat)
+                write_time, _ = measure(lambda: atomic_write(path, payload), repeat)
+                if decode is legacy_decode:
+                    load_time, loaded = measure(lambda: legacy_decode(open(path, 'rb').read()), repeat)
+                else:
+                    load_time, loaded = measure(lambda: read_file(path), repeat)
+                assert len(loaded) == len(data)
+
+                results.append({
+                    'users': users,
+                    'file': filename,
+                    'codec': name,
+                    'size': len(payload),
+                    'encode_ms': encode_time * 1000,
+                    'write_ms': write_time * 1000,
+                    'load_ms': load_time * 1000
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des codecs de sérialisation")
+    parser.add_argument('--users', default='10000,100000,1000000', help="Tailles à mesurer (séparées par des virgules)")
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre d'exécutions par mesure (meilleur temps)")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON")
+    args = parser.parse_args()
+
+    users_list = [int(value) for value in args.users.split(',')]
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(users_list, args.repeat, directory)
+
+    if args.json:
+        print(json.dumps({
+            'orjson': codec_module.orjson is not None,
+            'msgpack': codec_module.msgpack is not None,
+            'zstandard': codec_module.zstandard is not None,
+            'results': results
+        }, indent=2))
+        return
+
+    print(f"{'Utilisateurs':>12}  {'Fichier':<22} {'Codec':<34} {'Taille':>12} "
+          f"{'Sérialis.':>10} {'Écriture':>10} {'Lecture':>10}")
+    for result in results:
+        print(f"{result['users']:>12,}  {result['file']:<22} {result['codec']:<34} "
+              f"{result['size'] / 1024 / 1024:>9.2f} Mo {result['encode_ms']:>8.1f}ms "
+              f"{result['write_ms']:>8.1f}ms {result['load_ms']:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
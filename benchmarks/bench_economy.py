@@ -0,0 +1,291 @@
+"""Test de charge de l'économie : mises et virements concurrents.
+
+Lance `--bets` mises simulées (débit de la mise, attente comme pendant
+l'envoi du message, puis gain éventuel), `--transfers` virements et
+`--dailies` !daily par compte, toutes en même temps, sur une petite
+population pour que chaque compte soit disputé. Vérifie ensuite :
+
+    - aucun solde négatif (pas de double dépense) ;
+    - une seule récompense quotidienne par compte ;
+    - chaque solde final = solde initial + gains - mises acceptées
+      (pas de mise à jour perdue) ;
+    - la somme des soldes ne varie que des mises, gains et taxes ;
+    - les soldes recalculés depuis le registre sont identiques.
+
+`--naive` rejoue les mises avec l'ancien enchaînement (vérification du
+solde, attente, puis débit sans revérifier) pour comparaison.
+
+`--job-accounts N` mesure aussi les tâches planifiées (intérêts, impôt,
+séries) sur N comptes, serveur en mémoire puis hors mémoire (lecture de la
+base par pages) : durée, comptes modifiés et blocage de la boucle.
+
+Utilisation :
+    python -m benchmarks.bench_economy
+    python -m benchmarks.bench_economy --bets 10000 --users 100 --stripes 1,1024 --naive
+    python -m benchmarks.bench_economy --bets 0 --transfers 0 --job-accounts 1000000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from benchmarks.bench_persistence import FIRST_USER_ID, GUILD_ID, git_revision
+from cogs.economy import Economy
+from tests.helpers import BenchBot
+from utils.accounts import Account
+from utils.economy_jobs import JOBS, job_settings, np
+from utils.locks import StripedLock
+from utils.monitor import LoopMonitor
+
+
+async def naive_bet(economy, user_id, stake):
+    """Ancien enchaînement de !slots : la vérification et le débit sont séparés par un await"""
+    user_data = await economy.get_user_data(GUILD_ID, user_id)
+    if user_data['balance'] < stake:
+        return False
+    await asyncio.sleep(0)
+    user_data['balance'] -= stake
+    return True
+
+
+async def run_scenario(users, bets, transfers, dailies, stake, initial, stripes, naive, seed):
+    bot = BenchBot(os.getcwd(), flush_interval=5.0)
+    await bot.db.connect()
+    await bot.db.put_many(f'economy_users:{GUILD_ID}', {
+        str(user_id): {
+            'balance': initial, 'bank': 0, 'daily_streak': 0, 'last_daily': None, 'last_work': None,
+            'inventory': {}, 'active_effects': {},
+            'stats': {'total_earned': 0, 'total_spent': 0, 'work_count': 0, 'gamble_wins': 0, 'gamble_losses': 0}
+        }
+        for user_id in range(FIRST_USER_ID, FIRST_USER_ID + users)
+    })
+    await bot.db.flush()
+
+    economy = Economy(bot)
+    economy.locks = StripedLock(stripes)
+    await economy.cog_load()
+    economy.scheduled_jobs.cancel()
+
+    rng = random.Random(seed)
+    population = range(FIRST_USER_ID, FIRST_USER_ID + users)
+    expected = defaultdict(int)
+    accepted = rejected = fees = 0
+    claims = defaultdict(int)
+    now = datetime.now()
+
+    async def bet(user_id, win):
+        nonlocal accepted, rejected
+        if naive:
+            debited = await naive_bet(economy, user_id, stake)
+        else:
+            debited = await economy.debit_if_sufficient(GUILD_ID, user_id, stake, "bench", kind='bet')
+        if not debited:
+            rejected += 1
+            return
+        accepted += 1
+        expected[user_id] -= stake
+        await asyncio.sleep(0)  # Envoi du message de résultat
+        if win:
+            await economy.add_money(GUILD_ID, user_id, stake * 2, "bench", kind='payout')
+            expected[user_id] += stake * 2
+
+    async def transfer(sender, receiver, amount):
+        nonlocal fees
+        fee = amount // 50
+        if await economy.transfer(GUILD_ID, sender, receiver, amount, "bench", fee=fee):
+            expected[sender] -= amount
+            expected[receiver] += amount - fee
+            fees += fee
+
+    async def daily(user_id):
+        claim = await economy.claim_daily(GUILD_ID, user_id, now)
+        if claim is not None:
+            claims[user_id] += 1
+            expected[user_id] += claim[0]
+
+    operations = [bet(population[rng.randrange(users)], rng.random() < 0.45) for _ in range(bets)]
+    operations += [
+        transfer(population[rng.randrange(users)], population[rng.randrange(users)], rng.randint(1, stake))
+        for _ in range(transfers)
+    ]
+    if not naive:
+        operations += [daily(user_id) for user_id in population for _ in range(dailies)]
+    rng.shuffle(operations)
+
+    started = time.perf_counter()
+    # Le premier accès charge le serveur : toutes les opérations se disputent ce chargement
+    await asyncio.wait_for(asyncio.gather(*operations), timeout=120)
+    elapsed = time.perf_counter() - started
+
+    records = await economy.user_data.get(GUILD_ID)
+    negative = sum(1 for user_id in population if records[str(user_id)]['balance'] < 0)
+    lost_updates = sum(
+        1 for user_id in population if records[str(user_id)]['balance'] != initial + expected[user_id]
+    )
+    total = sum(records[str(user_id)]['balance'] for user_id in population)
+
+    await economy.ledger.commit()
+    rebuilt, mismatches = economy.ledger.rebuild()
+    ledger_differences = sum(
+        1 for (guild_id, user_id), balance in rebuilt.items()
+        if records[str(user_id)]['balance'] != balance
+    )
+
+    await economy.cog_unload()
+    await bot.storage.close()
+    await bot.db.close()
+
+    return {
+        'mode': 'naive' if naive else 'locked',
+        'stripes': stripes,
+        'operations': len(operations),
+        'elapsed_ms': elapsed * 1000,
+        'throughput': len(operations) / elapsed,
+        'bets_accepted': accepted,
+        'bets_rejected': rejected,
+        'contended_locks': economy.locks.contended,
+        'negative_balances': negative,
+        'lost_updates': lost_updates,
+        'money_created': total - initial * users - sum(expected.values()),
+        'fees': fees,
+        'dailies_claimed': sum(claims.values()),
+        # Plusieurs !daily simultanés d'un même membre ne doivent en créditer qu'un
+        'duplicate_dailies': sum(count - 1 for count in claims.values() if count > 1),
+        # En mode naïf les mises ne passent pas par le registre
+        'ledger_mismatches': None if naive else len(mismatches) + ledger_differences,
+    }
+
+
+async def run_jobs(accounts, seed):
+    """Chaque tâche planifiée sur `accounts` comptes d'un serveur, en mémoire puis hors mémoire"""
+    bot = BenchBot(os.getcwd(), flush_interval=5.0)
+    await bot.db.connect()
+    rng = random.Random(seed)
+    now = datetime.now()
+    population = {}
+    for user_id in range(FIRST_USER_ID, FIRST_USER_ID + accounts):
+        # Population typique : peu de comptes riches, une minorité d'épargnants et de séries en cours
+        account = Account(int(rng.paretovariate(1.2) * 200))
+        account.bank = rng.choice((0,) * 9 + (rng.randint(1, 50_000),))
+        account.daily_streak = rng.choice((0,) * 7 + (1, 3, 12))
+        account.last_daily = (now - timedelta(hours=rng.randint(0, 100))).isoformat()
+        account.total_earned = account.balance
+        population[str(user_id)] = account
+    await bot.db.put_many(f'economy_users:{GUILD_ID}', population)
+    del population  # Comme en production : seuls le cache et la base gardent les comptes
+
+    economy = Economy(bot)
+    await economy.cog_load()
+    economy.scheduled_jobs.cancel()
+    settings = job_settings({'jobs': {name: {'enabled': True} for name in JOBS}})
+
+    results = {}
+    # Serveur en mémoire (comptes du cache), puis hors mémoire (lecture de la base par pages)
+    for source in ('cache', 'database'):
+        if source == 'cache':
+            await economy.user_data.get(GUILD_ID)
+        else:
+            economy.user_data.evict_idle(now=float('inf'))
+        results[source] = {}
+        for name in JOBS:
+            monitor = LoopMonitor(interval=0.005, stall_threshold=0.05, warn_threshold=float('inf'), window=100_000)
+            monitor.start()
+            await asyncio.sleep(0.02)
+            started = time.perf_counter()
+            changed = await economy.run_job(name, settings[name])
+            elapsed = time.perf_counter() - started
+            await monitor.stop()
+            results[source][name] = {
+                'accounts': accounts,
+                'changed': changed,
+                'elapsed_ms': elapsed * 1000,
+                'max_loop_lag_ms': monitor.max_lag * 1000,
+                'p99_loop_lag_ms': monitor.percentile(99) * 1000
+            }
+        # Le parcours de la base ne remplit pas le cache
+        results[source]['guild_loaded_after'] = economy.user_data.peek(GUILD_ID) is not None
+
+    await economy.cog_unload()
+    await bot.storage.close()
+    await bot.db.close()
+    return {'mode': 'jobs', 'numpy': np is not None, 'jobs': results}
+
+
+async def run(args):
+    results = []
+    origin = os.getcwd()
+    scenarios = [(stripes, False) for stripes in args.stripes] + ([(args.stripes[-1], True)] if args.naive else [])
+    if not args.bets and not args.transfers and not args.dailies:
+        scenarios = []
+    for stripes, naive in scenarios:
+        with tempfile.TemporaryDirectory() as directory:
+            # Les cogs écrivent leurs fichiers (configuration, registre) dans le dossier courant
+            os.chdir(directory)
+            try:
+                results.append(await run_scenario(
+                    args.users, args.bets, args.transfers, args.dailies, args.stake, args.initial, stripes, naive, args.seed
+                ))
+            finally:
+                os.chdir(origin)
+
+    if args.job_accounts:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                results.append(await run_jobs(args.job_accounts, args.seed))
+            finally:
+                os.chdir(origin)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des débits et virements de l'économie")
+    parser.add_argument('--bets', type=int, default=10000, help="Mises concurrentes")
+    parser.add_argument('--transfers', type=int, default=2000, help="Virements concurrents")
+    parser.add_argument('--dailies', type=int, default=5, help="!daily simultanés par compte")
+    parser.add_argument('--users', type=int, default=100, help="Comptes disputés")
+    parser.add_argument('--stake', type=int, default=100)
+    parser.add_argument('--initial', type=int, default=500, help="Solde initial de chaque compte")
+    parser.add_argument('--stripes', default='1024', help="Nombres de bandes de verrous à comparer (ex. 1,1024)")
+    parser.add_argument('--naive', action='store_true', help="Comparer avec l'ancien enchaînement non atomique")
+    parser.add_argument('--job-accounts', type=int, default=0, help="Comptes pour mesurer les tâches planifiées")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help="Fichier de sortie JSON (stdout par défaut)")
+    args = parser.parse_args()
+    args.stripes = [int(value) for value in args.stripes.split(',')]
+
+    logging.disable(logging.INFO)
+    results = asyncio.run(run(args))
+    report = {
+        'benchmark': 'economy_concurrency',
+        'revision': git_revision(),
+        'settings': {key: getattr(args, key) for key in ('bets', 'transfers', 'dailies', 'users', 'stake', 'initial', 'seed')},
+        'results': results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    # Code de sortie non nul si une version verrouillée perd de l'argent
+    failed = any(
+        result['mode'] == 'locked'
+        and (result['negative_balances'] or result['lost_updates'] or result['money_created']
+             or result['ledger_mismatches'] or result['duplicate_dailies'])
+        for result in results
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+"""Benchmark de la persistance sur les vrais chemins d'écriture des cogs.
+
+Instancie les cogs Levels, Economy, Giveaways et Suggestions sur une vraie
+base SQLite et un vrai AsyncStorage, sans connexion Discord, puis rejoue des
+opérations à un débit de production :
+
+    xp           Levels.on_message (gain d'XP)
+    add_money    Economy.add_money
+    remove_money Economy.remove_money
+    giveaway     participation à un giveaway (bouton)
+    vote         vote sur une suggestion (bouton)
+
+Pour chaque population, rapporte la latence p50/p99 par opération, les
+octets écrits (valeurs sérialisées, fichiers d'état, croissance de la base)
+et le temps de blocage de la boucle d'événements mesuré par LoopMonitor.
+La sortie est en JSON pour comparer deux versions.
+
+Utilisation :
+    python -m benchmarks.bench_persistence
+    python -m benchmarks.bench_persistence --users 1000,100000,1000000 --ops 5000 --rate 2000
+    python -m benchmarks.bench_persistence --output resultats.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import discord
+
+from cogs.economy import Economy
+from cogs.giveaways import Giveaways
+from cogs.levels import Levels
+from cogs.suggestions import Suggestions
+from tests.helpers import BenchBot
+from utils.monitor import LoopMonitor
+
+GUILD_ID = 1
+GIVEAWAY_ID = 'bench_giveaway'
+SUGGESTION_ID = 'bench_suggestion'
+FIRST_USER_ID = 100_000_000_000_000_000
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+def fake_member(user_id):
+    return SimpleNamespace(
+        id=user_id, bot=False, guild=SimpleNamespace(id=GUILD_ID), name=f"user{user_id}", mention=f"<@{user_id}>",
+        display_name=f"user{user_id}", display_avatar=SimpleNamespace(url=""),
+        created_at=datetime(2020, 1, 1), roles=[]
+    )
+
+
+def fake_message(user_id):
+    guild = SimpleNamespace(id=GUILD_ID)
+    return SimpleNamespace(
+        author=fake_member(user_id), guild=guild, content="bonjour",
+        channel=SimpleNamespace(send=_noop)
+    )
+
+
+def fake_interaction(user_id, embed):
+    guild = SimpleNamespace(id=GUILD_ID, get_member=lambda member_id: None, get_role=lambda role_id: None)
+    return SimpleNamespace(
+        user=fake_member(user_id), guild=guild,
+        response=SimpleNamespace(send_message=_noop),
+        message=SimpleNamespace(embeds=[embed]),
+        edit_original_response=_noop
+    )
+
+
+def user_ids(users):
+    return range(FIRST_USER_ID, FIRST_USER_ID + users)
+
+
+async def populate(db, users):
+    """Population synthétique écrite directement en base (comme après une migration)"""
+    rng = random.Random(42)
+    levels = {}
+    accounts = {}
+    for user_id in user_ids(users):
+        xp = rng.randint(0, 500_000)
+        levels[str(user_id)] = {'xp': xp, 'level': int((xp / 100) ** 0.5), 'messages': rng.randint(0, 20_000)}
+        accounts[str(user_id)] = {
+            'balance': rng.randint(0, 100_000), 'bank': 0, 'daily_streak': 0,
+            'last_daily': None, 'last_work': None, 'inventory': {}, 'active_effects': {},
+            'stats': {'total_earned': 0, 'total_spent': 0, 'work_count': 0, 'gamble_wins': 0, 'gamble_losses': 0}
+        }
+
+    await db.put_many(f'levels:{GUILD_ID}', levels)
+    await db.put_many(f'economy_users:{GUILD_ID}', accounts)
+
+    # Un giveaway et une suggestion populaires : la moitié de la population y a déjà participé
+    half = list(user_ids(users))[::2]
+    await db.put_many('giveaways', {GIVEAWAY_ID: {
+        'guild_id': GUILD_ID, 'channel_id': 1, 'message_id': 1, 'host_id': 0, 'prize': "Nitro",
+        'winners': 1, 'end_time': (datetime.now() + timedelta(days=30)).isoformat(),
+        'participants': half, 'requirements': {}
+    }})
+    await db.put_many('suggestions', {SUGGESTION_ID: {
+        'id': SUGGESTION_ID, 'author_id': 0, 'content': "Ajouter un salon musique", 'status': 'pending',
+        'created_at': datetime.now().isoformat(), 'votes': {str(user_id): 'upvote' for user_id in half},
+        'anonymous': True
+    }})
+
+
+def make_operations(levels, economy, giveaways, suggestions):
+    giveaway_embed = discord.Embed(title="🎉 GIVEAWAY !")
+    giveaway_embed.add_field(name="👥 Participants", value="0")
+
+    async def xp(user_id):
+        # Le bench mesure le gain d'XP, pas l'anti-spam d'une minute
+        levels.last_message.pop((GUILD_ID, str(user_id)))
+        await levels.on_message(fake_message(user_id))
+
+    async def add_money(user_id):
+        await economy.add_money(GUILD_ID, user_id, 10, "bench")
+
+    async def remove_money(user_id):
+        await economy.remove_money(GUILD_ID, user_id, 10, "bench")
+
+    async def giveaway(user_id):
+        await giveaways.handle_giveaway_interaction(fake_interaction(user_id, giveaway_embed), GIVEAWAY_ID, 'join')
+
+    async def vote(user_id):
+        await suggestions.handle_vote(fake_interaction(user_id, None), SUGGESTION_ID, 'upvote')
+
+    return {
+        'xp': xp,
+        'add_money': add_money,
+        'remove_money': remove_money,
+        'giveaway': giveaway,
+        'vote': vote
+    }
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def directory_size(directory):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(directory) for name in files
+    )
+
+
+async def run_population(users, ops, rate, flush_interval, directory):
+    bot = BenchBot(directory, flush_interval)
+    await bot.db.connect()
+    await populate(bot.db, users)
+    await bot.db.flush()
+
+    levels, economy, giveaways, suggestions = Levels(bot), Economy(bot), Giveaways(bot), Suggestions(bot)
+    cogs = [levels, economy, giveaways, suggestions]
+    for cog in cogs:
+        await cog.cog_load()
+    giveaways.check_giveaways.cancel()
+    economy.scheduled_jobs.cancel()
+    levels.voice_tick.cancel()
+
+    # Premier accès : chargement paresseux du serveur, mesuré à part
+    started = time.perf_counter()
+    await levels.xp_data.get(GUILD_ID)
+    await economy.user_data.get(GUILD_ID)
+    guild_load = time.perf_counter() - started
+
+    operations = make_operations(levels, economy, giveaways, suggestions)
+    rng = random.Random(7)
+    population = user_ids(users)
+    monitor = LoopMonitor(interval=0.01, stall_threshold=0.05, warn_threshold=float('inf'), window=100_000)
+
+    results = {}
+    for name, operation in operations.items():
+        await bot.db.flush()
+        await bot.storage.drain()
+        size_before = directory_size(directory)
+        db_bytes_before = bot.db.bytes_written
+        db_rows_before = bot.db.rows_written
+        storage_bytes_before = bot.storage.bytes_written
+        ledger_bytes_before = economy.ledger.bytes_written
+        monitor.reset()
+        monitor.start()
+
+        latencies = []
+        started = time.perf_counter()
+        for index in range(ops):
+            user_id = population[rng.randrange(users)]
+            op_started = time.perf_counter()
+            await operation(user_id)
+            latencies.append(time.perf_counter() - op_started)
+
+            # Débit cible : laisser tourner la boucle (flusher, moniteur) comme en production
+            delay = started + (index + 1) / rate - time.perf_counter()
+            await asyncio.sleep(max(0.0, delay))
+
+        # Inclure le flush final (coût réel des écritures différées, XP accumulée comprise)
+        flush_started = time.perf_counter()
+        for cog in cogs:
+            if hasattr(cog, 'save_to_persistent_data'):
+                await cog.save_to_persistent_data()
+        await bot.db.flush()
+        await bot.storage.drain()
+        final_flush = time.perf_counter() - flush_started
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(monitor.interval * 2)
+        await monitor.stop()
+
+        results[name] = {
+            'ops': ops,
+            'throughput': ops / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': max(latencies) * 1000,
+            'rows_written': bot.db.rows_written - db_rows_before,
+            'bytes_written': (bot.db.bytes_written - db_bytes_before) + (bot.storage.bytes_written - storage_bytes_before)
+                             + (economy.ledger.bytes_written - ledger_bytes_before),
+            'disk_growth': directory_size(directory) - size_before,
+            'final_flush_ms': final_flush * 1000,
+            'loop': {
+                'mean_lag_ms': monitor.mean_lag * 1000,
+                'p99_lag_ms': monitor.percentile(99) * 1000,
+                'max_lag_ms': monitor.max_lag * 1000,
+                'stalls': monitor.stalls
+            }
+        }
+
+    for cog in cogs:
+        unload = getattr(cog, 'cog_unload', None)
+        if unload is not None:
+            await unload()
+    await bot.storage.close()
+    await bot.db.close()
+
+    return {'users': users, 'guild_load_ms': guild_load * 1000, 'operations': results}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(users_list, ops, rate, flush_interval):
+    populations = []
+    origin = os.getcwd()
+    for users in users_list:
+        with tempfile.TemporaryDirectory() as directory:
+            # Les cogs écrivent leurs fichiers de configuration dans le dossier courant
+            os.chdir(directory)
+            try:
+                populations.append(await run_population(users, ops, rate, flush_interval, directory))
+            finally:
+                os.chdir(origin)
+    return populations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la persistance des cogs")
+    parser.add_argument('--users', default='1000,100000', help="Tailles de population (séparées par des virgules)")
+    parser.add_argument('--ops', type=int, default=2000, help="Opérations par type et par population")
+    parser.add_argument('--rate', type=float, default=1000, help="Débit cible (opérations par seconde)")
+    parser.add_argument('--flush-interval', type=float, default=5.0, help="Intervalle du flusher de la base (s)")
+    parser.add_argument('--output', help="Fichier de sortie JSON (stdout par défaut)")
+    args = parser.parse_args()
+
+    # Les cogs journalisent chaque gain : ne pas mesurer l'écriture des logs
+    logging.disable(logging.INFO)
+
+    users_list = [int(value) for value in args.users.split(',')]
+    report = {
+        'benchmark': 'persistence',
+        'revision': git_revision(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'ops': args.ops, 'rate': args.rate, 'flush_interval': args.flush_interval},
+        'populations': asyncio.run(run(users_list, args.ops, args.rate, args.flush_interval))
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
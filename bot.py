@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands, tasks
-import json
 import logging
 import os
 import asyncio
@@ -8,6 +7,19 @@ from datetime import datetime, time
 import shutil
 from dotenv import load_dotenv
 
+from utils.backup import BackupStore, collect_data_files
+from utils.cards import CardRenderer
+from utils.codec import Codec, dumps_json, read_file
+from utils.database import Database, create_backend
+from utils.expiring import ExpiringMap
+from utils.guild_state import GuildStateCache
+from utils.journal import Journal
+from utils.members import NameResolver
+from utils.monitor import LoopMonitor
+from utils.migrate_json import migrate_legacy_files
+from utils.persistence import TrackedDict, TrackedSet, WriteBehindStore, atomic_write
+from utils.storage import AsyncStorage
+
 # Chargement des variables d'environnement
 load_dotenv()
 
@@ -24,11 +36,34 @@ logging.basicConfig(
 
 logger = logging.getLogger('discord_bot')
 
+# Cogs à charger et les cogs qui doivent être chargés avant eux.
+# Les cogs sans dépendance entre eux sont initialisés en parallèle.
+COGS = {
+    'cogs.welcome': (),
+    'cogs.role_selection': (),
+    'cogs.moderation': (),
+    'cogs.tickets': (),
+    'cogs.utilities': (),
+    'cogs.fun': (),
+    'cogs.levels': (),
+    'cogs.games': ('cogs.fun',),  # La commande coinflip de Fun reste prioritaire
+    'cogs.customization': (),
+    'cogs.onboarding': (),
+    'cogs.antiraid': (),
+    'cogs.automod': (),
+    'cogs.economy': ('cogs.fun', 'cogs.games'),
+    'cogs.music': (),
+    'cogs.logs': (),
+    'cogs.giveaways': (),
+    'cogs.suggestions': ()
+}
+
 class CommunityBot(commands.Bot):
     def __init__(self):
+        self.startup_started = datetime.now().timestamp()
+
         # Chargement de la configuration
-        with open('config.json', 'r', encoding='utf-8') as f:
-            self.config = json.load(f)
+        self.config = read_file('config.json')
         
         # Configuration des intents
         intents = discord.Intents.default()
@@ -44,8 +79,8 @@ class CommunityBot(commands.Bot):
         )
         
         # Variables pour stocker les données persistantes
-        self.warnings = {}  # {user_id: count}
-        self.muted_users = set()
+        self.warnings = TrackedDict()  # {user_id: count}
+        self.muted_users = TrackedSet()
 
         # Variables pour l'anti-raid et l'automod
         self.raid_detection = {
@@ -91,6 +126,64 @@ class CommunityBot(commands.Bot):
         self.auto_save_interval = 3600  # 1 heure en secondes
         self.daily_backup_enabled = True
         self.backup_retention_days = 7  # Garder 7 jours de sauvegardes
+        self.backups = BackupStore('backups')
+
+        # Mesure du démarrage : durée de chargement de chaque cog et budget total jusqu'à on_ready
+        self.startup_trace = {}
+        self.startup_budget = self.config.get('startup', {}).get('budget', 15)
+
+        # Persistance différée : les modifications sont regroupées et écrites en tâche de fond
+        persistence_config = self.config.get('persistence', {})
+
+        # Codec des fichiers d'état (config.json reste toujours en JSON lisible)
+        self.codec = Codec.from_config(persistence_config)
+
+        # E/S fichier hors de la boucle d'événements et mesure des blocages de la boucle
+        self.storage = AsyncStorage()
+        self.loop_monitor = LoopMonitor(stall_threshold=persistence_config.get('loop_stall_threshold', 0.1))
+
+        # Cartes de rang en image : rendu dans un pool de processus, avatars et cartes en cache
+        cards_config = self.config.get('cards', {})
+        self.cards = CardRenderer(
+            self.storage,
+            workers=cards_config.get('workers', 2),
+            avatar_cache_size=cards_config.get('avatar_cache_size', 256),
+            card_cache_size=cards_config.get('card_cache_size', 512)
+        ) if cards_config.get('enabled', True) else None
+        # Noms des classements : cache des membres, requêtes groupées, file de fetch_user
+        self.member_names = NameResolver(self)
+        self.persistence = WriteBehindStore(interval=persistence_config.get('flush_interval', 5))
+        # Les cogs modifient warnings et muted_users directement : leur version suffit à déclencher l'écriture
+        self.persistence.register(
+            'warnings', 'warnings.json', lambda: self.warnings,
+            encoder=self.codec.encode, version=lambda: self.warnings.version
+        )
+        self.persistence.register(
+            'muted_users', 'muted_users.json', lambda: list(self.muted_users),
+            encoder=self.codec.encode, version=lambda: self.muted_users.version
+        )
+
+        # Journal des modifications de persistent_data : enregistrements fsync'és par groupe,
+        # instantané complet seulement tous les `compact_every` enregistrements
+        self.journal = Journal(
+            'persistent_data.json',
+            interval=persistence_config.get('flush_interval', 5),
+            compact_every=persistence_config.get('compact_every', 1000),
+            encoder=self.codec.encode
+        )
+        self.journal.attach(lambda: self.persistent_data)
+
+        # Base de données par enregistrements pour les données volumineuses des cogs (XP, économie...)
+        self.db = Database(
+            create_backend(persistence_config),
+            flush_interval=persistence_config.get('flush_interval', 5)
+        )
+
+        # Salons configurés par serveur (namespace channels:<guild_id>), chargés à la demande ;
+        # config.json['channels'] ne sert plus que de valeur par défaut
+        self.guild_channels = GuildStateCache(
+            self.db, 'channels', idle_timeout=persistence_config.get('guild_idle_timeout', 1800)
+        )
 
         # Charger les données sauvegardées
         self.load_persistent_data()
@@ -98,13 +191,12 @@ class CommunityBot(commands.Bot):
     def load_persistent_data(self):
         """Charge toutes les données persistantes depuis les fichiers"""
         try:
-            # Charger les données principales
-            with open('persistent_data.json', 'r', encoding='utf-8') as f:
-                self.persistent_data = json.load(f)
-            logger.info("✅ Données persistantes chargées avec succès")
-        except FileNotFoundError:
-            logger.info("📁 Aucun fichier de données persistantes trouvé, création d'un nouveau")
-            self.save_persistent_data()
+            # Dernier instantané + rejeu de la queue du journal
+            self.persistent_data = self.journal.load(self.persistent_data, self.apply_journal_record)
+            for category, values in self.persistent_data.items():
+                for key, value in values.items():
+                    self.journal.remember((category, key), value)
+            logger.info(f"✅ Données persistantes chargées avec succès ({self.journal.replayed} opérations rejouées)")
         except Exception as e:
             logger.error(f"❌ Erreur lors du chargement des données: {e}")
 
@@ -115,8 +207,7 @@ class CommunityBot(commands.Bot):
     def save_persistent_data(self):
         """Sauvegarde toutes les données persistantes"""
         try:
-            with open('persistent_data.json', 'w', encoding='utf-8') as f:
-                json.dump(self.persistent_data, f, indent=2, ensure_ascii=False)
+            atomic_write('persistent_data.json', self.codec.encode(self.persistent_data))
             logger.info("💾 Données persistantes sauvegardées")
         except Exception as e:
             logger.error(f"❌ Erreur lors de la sauvegarde: {e}")
@@ -124,47 +215,35 @@ class CommunityBot(commands.Bot):
     def load_warnings(self):
         """Charge les avertissements"""
         try:
-            with open('warnings.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Convertir les clés string en int
-                self.warnings = {int(k): v for k, v in data.items()}
+            data = read_file('warnings.json')
+            # Convertir les clés string en int
+            self.warnings = TrackedDict((int(k), v) for k, v in data.items())
             logger.info("⚠️ Avertissements chargés")
         except FileNotFoundError:
-            self.warnings = {}
+            self.warnings = TrackedDict()
         except Exception as e:
             logger.error(f"❌ Erreur chargement avertissements: {e}")
-            self.warnings = {}
+            self.warnings = TrackedDict()
 
     def save_warnings(self):
-        """Sauvegarde les avertissements"""
-        try:
-            with open('warnings.json', 'w', encoding='utf-8') as f:
-                json.dump(self.warnings, f, indent=2)
-            logger.info("💾 Avertissements sauvegardés")
-        except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde avertissements: {e}")
+        """Programme la sauvegarde des avertissements (écriture atomique différée)"""
+        self.persistence.mark_dirty('warnings')
 
     def load_muted_users(self):
         """Charge les utilisateurs mutés"""
         try:
-            with open('muted_users.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.muted_users = set(data)
+            data = read_file('muted_users.json')
+            self.muted_users = TrackedSet(data)
             logger.info("🔇 Utilisateurs mutés chargés")
         except FileNotFoundError:
-            self.muted_users = set()
+            self.muted_users = TrackedSet()
         except Exception as e:
             logger.error(f"❌ Erreur chargement muted: {e}")
-            self.muted_users = set()
+            self.muted_users = TrackedSet()
 
     def save_muted_users(self):
-        """Sauvegarde les utilisateurs mutés"""
-        try:
-            with open('muted_users.json', 'w', encoding='utf-8') as f:
-                json.dump(list(self.muted_users), f, indent=2)
-            logger.info("💾 Utilisateurs mutés sauvegardés")
-        except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde muted: {e}")
+        """Programme la sauvegarde des utilisateurs mutés (écriture atomique différée)"""
+        self.persistence.mark_dirty('muted_users')
 
     def get_persistent_data(self, category, key=None, default=None):
         """Récupère des données persistantes"""
@@ -177,58 +256,167 @@ class CommunityBot(commands.Bot):
         return self.persistent_data[category].get(key, default)
 
     def set_persistent_data(self, category, key, value):
-        """Définit des données persistantes"""
+        """Définit des données persistantes (une valeur non sérialisable en JSON est ignorée)"""
+        try:
+            if self.journal.changed((category, key), value):
+                self.journal.append({'op': 'set', 'category': category, 'key': key, 'value': value})
+        except (TypeError, ValueError) as e:
+            # Refusée avant d'entrer dans persistent_data : l'instantané resterait sinon impossible à écrire
+            self.journal.forget((category, key))
+            logger.error(f"❌ Donnée persistante {category}/{key} non sérialisable, ignorée: {e}")
+            return
+
         if category not in self.persistent_data:
             self.persistent_data[category] = {}
 
         self.persistent_data[category][key] = value
-        self.save_persistent_data()
 
     def update_persistent_data(self, category, data_dict):
-        """Met à jour plusieurs données persistantes"""
+        """Met à jour plusieurs données persistantes (les valeurs non sérialisables en JSON sont ignorées)"""
+        changed = {key: value for key, value in data_dict.items() if self.journal.changed((category, key), value)}
+        if changed:
+            try:
+                self.journal.append({'op': 'update', 'category': category, 'data': changed})
+            except (TypeError, ValueError):
+                # Retrouver les clés fautives et journaliser les autres
+                for key, value in list(changed.items()):
+                    try:
+                        dumps_json(value)
+                    except (TypeError, ValueError) as e:
+                        del changed[key]
+                        self.journal.forget((category, key))
+                        data_dict = {k: v for k, v in data_dict.items() if k != key}
+                        logger.error(f"❌ Donnée persistante {category}/{key} non sérialisable, ignorée: {e}")
+                if changed:
+                    self.journal.append({'op': 'update', 'category': category, 'data': changed})
+
         if category not in self.persistent_data:
             self.persistent_data[category] = {}
 
         self.persistent_data[category].update(data_dict)
-        self.save_persistent_data()
+
+    @staticmethod
+    def apply_journal_record(state, record):
+        """Rejoue une opération du journal (affectations idempotentes)"""
+        category = state.setdefault(record['category'], {})
+        if record['op'] == 'set':
+            category[record['key']] = record['value']
+        elif record['op'] == 'update':
+            category.update(record['data'])
+        else:
+            logger.warning(f"⚠️ Opération de journal inconnue ignorée: {record['op']}")
+
+    def persistence_bytes(self):
+        """(octets écrits, octets non réécrits car inchangés) depuis le démarrage"""
+        return (
+            self.persistence.bytes_written + self.journal.bytes_written,
+            self.persistence.bytes_skipped + self.journal.bytes_skipped
+        )
+
+    def log_persistence_delta(self, label, before):
+        """Journalise les octets écrits et ignorés depuis `before`"""
+        written, skipped = self.persistence_bytes()
+        logger.info(
+            f"💾 {label}: {written - before[0]:,} octets écrits, "
+            f"{skipped - before[1]:,} octets ignorés (inchangés)"
+        )
+
+    async def get_guild_channel_id(self, guild_id, key):
+        """ID du salon `key` (logs, welcome, tickets...) configuré pour un serveur"""
+        records = await self.guild_channels.get(guild_id)
+        if key in records:
+            return records[key]
+
+        # Ancienne configuration globale : seulement si le salon appartient bien à ce serveur
+        channel_id = self.config['channels'].get(key)
+        channel = self.get_channel(channel_id) if channel_id else None
+        if channel is not None and channel.guild.id == guild_id:
+            return channel_id
+        return None
+
+    async def set_guild_channel(self, guild_id, key, channel_id):
+        """Enregistre le salon `key` d'un serveur (une ligne en base)"""
+        records = await self.guild_channels.get(guild_id)
+        records[key] = channel_id
+        self.guild_channels.put(guild_id, key, channel_id)
+
+    async def save_config(self):
+        """Sauvegarde config.json sans bloquer la boucle"""
+        try:
+            await self.storage.save('config.json', self.config)
+        except Exception as e:
+            logger.error(f"❌ Erreur sauvegarde config.json: {e}")
 
     async def setup_hook(self):
         """Appelé quand le bot démarre"""
+        # Démarrer le flusher de persistance différée et le commit de groupe du journal
+        self.persistence.start()
+        self.journal.start()
+        self.loop_monitor.start()
+
+        # Connexion à la base de données et import unique des anciens fichiers JSON
+        await self.db.connect()
+        migrated = await migrate_legacy_files(self.db)
+        if migrated:
+            logger.info(f"📦 {len(migrated)} ancien(s) fichier(s) JSON importé(s) dans la base de données")
+        self.guild_channels.start()
+
+        await self.load_cogs(COGS)
+    
+    async def load_cogs(self, cogs):
+        """Charge les cogs en parallèle dans le respect de leurs dépendances"""
         logger.info("Chargement des cogs...")
-        
-        # Liste des cogs à charger
-        cogs = [
-            'cogs.welcome',
-            'cogs.role_selection',
-            'cogs.moderation',
-            'cogs.tickets',
-            'cogs.utilities',
-            'cogs.fun',
-            'cogs.levels',
-            'cogs.games',
-            'cogs.customization',
-            'cogs.onboarding',
-            'cogs.antiraid',
-            'cogs.automod',
-            'cogs.economy',
-            'cogs.music',
-            'cogs.logs',
-            'cogs.giveaways',
-            'cogs.suggestions'
-        ]
-        
-        for cog in cogs:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        loading = {}
+
+        async def load(name):
+            # Attendre les dépendances (même en échec : l'ordre est ce qui compte)
+            dependencies = [loading[dependency] for dependency in cogs[name] if dependency in loading]
+            if dependencies:
+                await asyncio.gather(*dependencies)
+
+            cog_started = loop.time()
             try:
-                await self.load_extension(cog)
-                logger.info(f"Cog {cog} chargé avec succès")
+                await self.load_extension(name)
+                logger.info(f"Cog {name} chargé avec succès")
             except Exception as e:
-                logger.error(f"Erreur lors du chargement du cog {cog}: {e}")
+                logger.error(f"Erreur lors du chargement du cog {name}: {e}")
+            self.startup_trace[name] = loop.time() - cog_started
+
+        for name in cogs:
+            unknown = [dependency for dependency in cogs[name] if dependency not in cogs]
+            if unknown:
+                raise ValueError(f"Dépendances inconnues pour {name}: {', '.join(unknown)}")
+            loading[name] = loop.create_task(load(name))
+
+        await asyncio.gather(*loading.values())
+
+        elapsed = loop.time() - started
+        self.startup_trace['total'] = elapsed
+        slowest = sorted(
+            ((name, duration) for name, duration in self.startup_trace.items() if name in cogs),
+            key=lambda item: item[1], reverse=True
+        )
+        logger.info(
+            f"⏱️ {len(cogs)} cogs chargés en {elapsed:.2f}s - "
+            + ", ".join(f"{name.split('.')[-1]} {duration * 1000:.0f} ms" for name, duration in slowest)
+        )
     
     async def on_ready(self):
         """Appelé quand le bot est prêt"""
         logger.info(f'{self.user} est connecté et prêt !')
         logger.info(f'Connecté à {len(self.guilds)} serveur(s)')
 
+        # Temps de démarrage à froid (premier on_ready uniquement)
+        if 'ready' not in self.startup_trace:
+            self.startup_trace['ready'] = datetime.now().timestamp() - self.startup_started
+            logger.info(f"🚀 Démarrage à froid en {self.startup_trace['ready']:.2f}s")
+            if self.startup_trace['ready'] > self.startup_budget:
+                logger.warning(
+                    f"⚠️ Budget de démarrage dépassé ({self.startup_trace['ready']:.2f}s > {self.startup_budget}s)"
+                )
+
         # Démarrer les tâches automatiques
         self.start_auto_tasks()
 
@@ -246,24 +434,25 @@ class CommunityBot(commands.Bot):
         """Charge les configurations de tous les cogs"""
         logger.info("🔄 Chargement des configurations des cogs...")
 
-        # Attendre que tous les cogs soient chargés
-        await asyncio.sleep(2)
+        # Les cogs sont déjà chargés par setup_hook : configurations chargées en parallèle
+        async def load(cog_name, cog):
+            try:
+                await cog.load_from_persistent_data()
+                logger.info(f"✅ Configuration {cog_name} chargée")
+            except Exception as e:
+                logger.error(f"❌ Erreur chargement {cog_name}: {e}")
 
-        # Charger les configurations spécifiques
-        for cog_name, cog in self.cogs.items():
-            if hasattr(cog, 'load_from_persistent_data'):
-                try:
-                    await cog.load_from_persistent_data()
-                    logger.info(f"✅ Configuration {cog_name} chargée")
-                except Exception as e:
-                    logger.error(f"❌ Erreur chargement {cog_name}: {e}")
+        await asyncio.gather(*(
+            load(cog_name, cog) for cog_name, cog in self.cogs.items()
+            if hasattr(cog, 'load_from_persistent_data')
+        ))
 
     async def close(self):
         """Appelé quand le bot se ferme"""
         logger.info("🔄 Sauvegarde avant fermeture...")
+        before = self.persistence_bytes()
 
         # Sauvegarder toutes les données
-        self.save_persistent_data()
         self.save_warnings()
         self.save_muted_users()
 
@@ -276,6 +465,45 @@ class CommunityBot(commands.Bot):
                 except Exception as e:
                     logger.error(f"❌ Erreur sauvegarde {cog_name}: {e}")
 
+        # Décharger les cogs tant que la base et le stockage sont ouverts : leur cog_unload
+        # écrit l'XP en attente, les instantanés et le point de contrôle du registre
+        # (super().close() les déchargerait trop tard, en ignorant les erreurs)
+        for extension in tuple(self.extensions):
+            try:
+                await self.unload_extension(extension)
+            except Exception as e:
+                logger.error(f"❌ Erreur déchargement {extension}: {e}")
+        for cog_name in tuple(self.cogs):
+            try:
+                await self.remove_cog(cog_name)
+            except Exception as e:
+                logger.error(f"❌ Erreur déchargement {cog_name}: {e}")
+
+        # Arrêter le flusher et forcer l'écriture des données en attente
+        await self.persistence.close()
+
+        # Instantané final : le prochain démarrage n'a aucun journal à rejouer
+        try:
+            await self.journal.close()
+        except Exception as e:
+            logger.error(f"❌ Erreur instantané final: {e}")
+
+        self.log_persistence_delta("Fermeture", before)
+
+        if self.cards is not None:
+            await self.cards.close()
+        await self.member_names.stop()
+
+        # Terminer les sauvegardes de configuration programmées par les cogs
+        await self.storage.close()
+        await self.loop_monitor.stop()
+        await self.guild_channels.stop()
+
+        try:
+            await self.db.close()
+        except Exception as e:
+            logger.error(f"❌ Erreur fermeture base de données: {e}")
+
         logger.info("✅ Sauvegarde terminée")
         await super().close()
 
@@ -289,9 +517,9 @@ class CommunityBot(commands.Bot):
             color=0x3498db
         )
         message = await ctx.send(embed=embed)
+        before = self.persistence_bytes()
 
         # Sauvegarder toutes les données
-        self.save_persistent_data()
         self.save_warnings()
         self.save_muted_users()
 
@@ -307,6 +535,13 @@ class CommunityBot(commands.Bot):
                 except Exception as e:
                     failed_cogs.append(f"{cog_name}: {e}")
 
+        # Écrire immédiatement au lieu d'attendre le prochain passage du flusher
+        await self.persistence.flush()
+        await self.journal.compact()
+        await self.db.flush()
+        self.log_persistence_delta("Sauvegarde manuelle", before)
+        written, skipped = self.persistence_bytes()
+
         # Message de confirmation
         embed = discord.Embed(
             title="✅ Sauvegarde terminée !",
@@ -314,6 +549,12 @@ class CommunityBot(commands.Bot):
             color=0x2ecc71
         )
 
+        embed.add_field(
+            name="📦 Données",
+            value=f"{written - before[0]:,} octets écrits • {skipped - before[1]:,} octets inchangés ignorés",
+            inline=False
+        )
+
         if saved_cogs:
             embed.add_field(
                 name="💾 Cogs sauvegardés",
@@ -341,6 +582,10 @@ class CommunityBot(commands.Bot):
         )
         message = await ctx.send(embed=embed)
 
+        # Écrire les modifications en attente avant de relire les fichiers
+        await self.persistence.flush()
+        await self.journal.commit()
+
         # Charger toutes les données
         self.load_persistent_data()
 
@@ -445,13 +690,99 @@ class CommunityBot(commands.Bot):
             inline=False
         )
 
+        # Persistance différée
+        pending = "⏳ Écriture en attente" if self.persistence.is_dirty() or self.journal.is_dirty() else "✅ À jour"
+        embed.add_field(
+            name="⏱️ Écriture différée",
+            value=f"{pending}\n"
+                  f"Intervalle: {self.persistence.interval}s • Format: {self.codec.describe()}\n"
+                  f"Écritures: {self.persistence.writes} • Regroupées: {self.persistence.coalesced}",
+            inline=False
+        )
+
+        last_snapshot = (
+            datetime.fromtimestamp(self.journal.last_snapshot).strftime('%H:%M:%S')
+            if self.journal.last_snapshot else "Jamais"
+        )
+        embed.add_field(
+            name="📜 Journal",
+            value=f"Enregistrements depuis l'instantané: {self.journal.log_records}\n"
+                  f"Commits: {self.journal.commits} • Instantanés: {self.journal.snapshots}\n"
+                  f"Dernier instantané: {last_snapshot}",
+            inline=False
+        )
+
+        embed.add_field(
+            name="🧵 E/S asynchrones",
+            value=f"Sauvegardes: {self.storage.saves} • Échecs: {self.storage.failures}\n"
+                  f"Sérialisation (boucle): {self.storage.encode_time * 1000:.0f} ms • "
+                  f"max {self.storage.max_encode_time * 1000:.1f} ms\n"
+                  f"Écriture (thread): {self.storage.write_time * 1000:.0f} ms",
+            inline=False
+        )
+
+        embed.add_field(
+            name="⏲️ Latence de la boucle",
+            value=f"Moyenne: {self.loop_monitor.mean_lag * 1000:.1f} ms • "
+                  f"p99: {self.loop_monitor.percentile(99) * 1000:.1f} ms • "
+                  f"max: {self.loop_monitor.max_lag * 1000:.0f} ms\n"
+                  f"Blocages ≥ {self.loop_monitor.stall_threshold * 1000:.0f} ms: {self.loop_monitor.stalls}",
+            inline=False
+        )
+
+        if self.cards is not None:
+            average = self.cards.render_time / self.cards.renders * 1000 if self.cards.renders else 0
+            embed.add_field(
+                name="🖼️ Cartes de rang",
+                value=f"Rendus: {self.cards.renders} ({average:.0f} ms en moyenne) • "
+                      f"Cache: {self.cards.hits} hit(s)\n"
+                      f"Cartes en cache: {len(self.cards.cards)} ({self.cards.cards.nbytes() / 1024:.0f} Ko) • "
+                      f"Avatars: {len(self.cards.avatars)} • Téléchargés: {self.cards.avatar_downloads}",
+                inline=False
+            )
+
+        embed.add_field(
+            name="🗄️ Base de données",
+            value=f"{self.db.backend.describe()}\n"
+                  f"En attente: {self.db.pending_count} • Lignes écrites: {self.db.rows_written}",
+            inline=False
+        )
+
+        caches = [self.guild_channels] + [
+            cache for cog in self.cogs.values() for cache in vars(cog).values()
+            if isinstance(cache, GuildStateCache)
+        ]
+        embed.add_field(
+            name="🏘️ Données par serveur",
+            value="\n".join(
+                f"{cache.name}: {len(cache)} en mémoire • {cache.loads} chargements • {cache.evictions} évictions"
+                for cache in caches
+            ),
+            inline=False
+        )
+
+        cooldowns = [
+            tracker for cog in self.cogs.values() for tracker in vars(cog).values()
+            if isinstance(tracker, ExpiringMap)
+        ]
+        if cooldowns:
+            embed.add_field(
+                name="⏱️ Cooldowns",
+                value="\n".join(
+                    f"{tracker.name}: {tracker.expire()} entrée(s) • ~{tracker.nbytes() / 1024:.0f} Ko • "
+                    f"{tracker.expired} expirée(s)"
+                    for tracker in cooldowns
+                ),
+                inline=False
+            )
+
         embed.add_field(
             name="🔧 Commandes utiles",
             value="`!save_all` - Sauvegarder manuellement\n`!load_all` - Charger manuellement\n`!persistent_status` - Voir ce statut",
             inline=False
         )
 
-        embed.set_footer(text="Les données sont sauvegardées automatiquement à chaque modification")
+        embed.set_footer(text=f"Les modifications sont regroupées et sauvegardées toutes les {self.persistence.interval}s")
 
         await ctx.send(embed=embed)
 
@@ -904,9 +1235,9 @@ class CommunityBot(commands.Bot):
         """Sauvegarde automatique toutes les heures"""
         try:
             logger.info("🔄 Début de la sauvegarde automatique...")
+            before = self.persistence_bytes()
 
             # Sauvegarder toutes les données
-            self.save_persistent_data()
             self.save_warnings()
             self.save_muted_users()
 
@@ -920,61 +1251,57 @@ class CommunityBot(commands.Bot):
                     except Exception as e:
                         logger.error(f"Erreur sauvegarde {cog_name}: {e}")
 
+            # Instantané horaire : borne la taille du journal à rejouer après un crash
+            await self.persistence.flush()
+            await self.journal.compact()
+            await self.db.flush()
+
             self.last_auto_save = datetime.now()
-            logger.info(f"✅ Sauvegarde automatique terminée - {len(saved_cogs)} cogs sauvegardés")
+            self.log_persistence_delta("Sauvegarde automatique", before)
+            logger.info(f"✅ Sauvegarde automatique terminée - {len(saved_cogs)} cogs vérifiés")
 
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde automatique: {e}")
 
     @tasks.loop(time=time(hour=3, minute=0))  # Tous les jours à 3h du matin
     async def daily_backup_task(self):
-        """Sauvegarde quotidienne avec archivage"""
+        """Sauvegarde quotidienne incrémentale (seuls les morceaux modifiés sont stockés)"""
         try:
             logger.info("🌙 Début de la sauvegarde quotidienne...")
 
-            # Créer le dossier de sauvegardes s'il n'existe pas
-            backup_dir = "backups"
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-
-            # Nom du fichier de sauvegarde avec date
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            backup_name = f"backup_{timestamp}"
-            backup_path = os.path.join(backup_dir, backup_name)
-
-            # Créer le dossier de cette sauvegarde
-            os.makedirs(backup_path, exist_ok=True)
-
-            # Sauvegarder tous les fichiers de données
-            files_to_backup = [
-                'persistent_data.json',
-                'warnings.json',
-                'muted_users.json',
-                'config.json'
-            ]
-
-            backed_up_files = []
-            for file in files_to_backup:
-                if os.path.exists(file):
-                    try:
-                        shutil.copy2(file, os.path.join(backup_path, file))
-                        backed_up_files.append(file)
-                    except Exception as e:
-                        logger.error(f"Erreur copie {file}: {e}")
+            # Instantané à jour avant la copie (sinon persistent_data.json ne contient pas la queue du journal)
+            await self.persistence.flush()
+            await self.journal.compact()
+            await self.storage.drain()
+
+            # Tous les fichiers de données écrits par le bot et les cogs
+            files = {name: name for name in await self.storage.run(collect_data_files)}
+
+            # Copie cohérente de la base de données
+            db_snapshot = os.path.join(self.backups.root, 'database.snapshot')
+            os.makedirs(self.backups.root, exist_ok=True)
+            if await self.db.backup(db_snapshot):
+                db_name = os.path.basename(getattr(self.db.backend, 'path', 'bot_data.db'))
+                files[db_name] = db_snapshot
 
-            # Créer un fichier de métadonnées
             metadata = {
-                'backup_date': timestamp,
-                'files_backed_up': backed_up_files,
                 'bot_version': '2.0',
                 'guilds_count': len(self.guilds),
                 'users_count': len(self.users)
             }
 
-            with open(os.path.join(backup_path, 'metadata.json'), 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
-
-            logger.info(f"✅ Sauvegarde quotidienne terminée - {len(backed_up_files)} fichiers sauvegardés dans {backup_path}")
+            try:
+                manifest = await self.storage.run(self.backups.create, files, metadata)
+            finally:
+                if os.path.exists(db_snapshot):
+                    os.remove(db_snapshot)
+
+            stats = manifest['stats']
+            logger.info(
+                f"✅ Sauvegarde quotidienne {manifest['name']} terminée - {stats['files']} fichiers "
+                f"({stats['total_bytes']:,} octets), {stats['new_chunks']}/{stats['chunks']} morceaux nouveaux, "
+                f"{stats['stored_bytes']:,} octets stockés en {stats['duration']}s"
+            )
 
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde quotidienne: {e}")
@@ -987,11 +1314,14 @@ class CommunityBot(commands.Bot):
 
             logger.info("🧹 Début du nettoyage des anciennes sauvegardes...")
 
-            backup_dir = "backups"
+            backup_dir = self.backups.root
             if not os.path.exists(backup_dir):
                 return
 
-            # Date limite (garder seulement les X derniers jours)
+            # Sauvegardes expirées et morceaux qui ne sont plus référencés
+            manifests, chunks, freed = await self.storage.run(self.backups.gc, self.backup_retention_days)
+
+            # Anciennes sauvegardes complètes (dossiers backup_<date>)
             cutoff_date = datetime.now() - timedelta(days=self.backup_retention_days)
 
             deleted_backups = []
@@ -1005,13 +1335,16 @@ class CommunityBot(commands.Bot):
 
                         # Supprimer si trop ancien
                         if backup_date < cutoff_date:
-                            shutil.rmtree(item_path)
+                            await self.storage.run(shutil.rmtree, item_path)
                             deleted_backups.append(item)
 
                     except Exception as e:
                         logger.error(f"Erreur traitement backup {item}: {e}")
 
-            logger.info(f"✅ Nettoyage terminé - {len(deleted_backups)} anciennes sauvegardes supprimées")
+            logger.info(
+                f"✅ Nettoyage terminé - {manifests + len(deleted_backups)} anciennes sauvegardes supprimées, "
+                f"{chunks} morceaux ({freed:,} octets) libérés"
+            )
 
         except Exception as e:
             logger.error(f"❌ Erreur nettoyage sauvegardes: {e}")
@@ -1077,16 +1410,27 @@ class CommunityBot(commands.Bot):
         )
 
         # Compter les sauvegardes
-        backup_count = 0
-        if os.path.exists("backups"):
-            backup_count = len([d for d in os.listdir("backups") if d.startswith('backup_')])
+        manifests = await self.storage.run(self.backups.list_manifests)
+        store_size, chunk_count = await self.storage.run(self.backups.disk_usage)
 
         embed.add_field(
             name="📁 Sauvegardes Disponibles",
-            value=f"{backup_count} sauvegardes quotidiennes",
+            value=f"{len(manifests)} sauvegardes quotidiennes\n"
+                  f"{chunk_count} morceaux • {store_size / 1024 / 1024:.1f} Mo sur disque",
             inline=True
         )
 
+        if manifests:
+            latest = manifests[-1]
+            stats = latest['stats']
+            embed.add_field(
+                name="🗂️ Dernière Sauvegarde Quotidienne",
+                value=f"`{latest['name']}` • {stats['files']} fichiers\n"
+                      f"{stats['total_bytes'] / 1024:.0f} Ko de données, "
+                      f"{stats['stored_bytes'] / 1024:.0f} Ko nouveaux ({stats['duration']}s)",
+                inline=False
+            )
+
         embed.add_field(
             name="🗑️ Rétention",
             value=f"{self.backup_retention_days} jours",
@@ -1095,7 +1439,7 @@ class CommunityBot(commands.Bot):
 
         embed.add_field(
             name="🎯 Avantages",
-            value="• **Aucune perte de données** possible\n• **Sauvegardes automatiques** 24/7\n• **Archivage quotidien** sécurisé\n• **Nettoyage automatique** des anciennes versions",
+            value="• **Aucune perte de données** possible\n• **Sauvegardes automatiques** 24/7\n• **Archivage quotidien** incrémental et compressé\n• **Restauration vérifiée** : `python -m utils.backup restore`",
             inline=False
         )
 
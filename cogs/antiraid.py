@@ -1,148 +1,203 @@
 import discord
 from discord.ext import commands, tasks
 import asyncio
+import copy
+from collections import deque
 import logging
 from datetime import datetime, timedelta
-import json
 import re
 
+from utils.expiring import ExpiringMap
+from utils.guild_state import GuildStateCache, guild_scoped
+
 logger = logging.getLogger('discord_bot.antiraid')
 
+# Configuration d'un serveur : une ligne par section dans le namespace antiraid:<guild_id>
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "raid_detection": {
+        "joins_threshold": 5,  # Nombre de joins
+        "joins_timeframe": 10,  # En secondes
+        "auto_quarantine": True
+    },
+    "anti_spam": {
+        "enabled": True,
+        "max_messages": 5,
+        "timeframe": 10,
+        "max_duplicates": 3,
+        "punishment": "mute"  # mute, kick, ban
+    },
+    "verification": {
+        "enabled": True,
+        "min_account_age": 7,  # Jours
+        "require_avatar": False,
+        "auto_quarantine_new": True
+    },
+    "channels": {
+        "logs": None,
+        "quarantine": None
+    },
+    "roles": {
+        "quarantine": None,
+        "verified": None
+    },
+    "whitelist": {
+        "users": [],
+        "roles": []
+    }
+}
+
+
 class AntiRaid(commands.Cog):
     """Système de protection anti-raid avancé"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.config = self.load_config()
+        # Configuration par serveur, chargée au premier événement du serveur
+        self.settings = GuildStateCache(
+            bot.db, 'antiraid',
+            idle_timeout=bot.config.get('persistence', {}).get('guild_idle_timeout', 1800),
+            loader=self.load_guild_config
+        )
+        self.legacy_config = None  # Ancien antiraid_config.json global, copié une fois par serveur
         
         # Données de détection
-        self.join_tracker = []  # Joins récents
-        self.message_tracker = {}  # Messages par utilisateur
-        self.raid_mode = False
-        self.quarantine_users = set()
-        
-        # Démarrer les tâches de nettoyage
+        self.join_tracker = {}  # Joins récents par serveur {guild_id: deque[(heure, membre)]}, plus anciens à gauche
+        # Messages récents par (serveur, utilisateur) : un membre silencieux plus longtemps
+        # que la fenêtre anti-spam de son serveur sort du tracker
+        self.message_tracker = ExpiringMap(60, name='antiraid.messages')
+        self.raid_guilds = set()  # Serveurs en mode anti-raid
+        self.quarantine_users = set()  # (serveur, utilisateur)
+
+    async def cog_load(self):
+        """Lit l'ancienne configuration globale puis démarre les tâches de nettoyage"""
+        self.legacy_config = await self.bot.storage.load('antiraid_config.json')
+        self.settings.start()
         self.cleanup_tracker.start()
-        
-    def load_config(self):
-        """Charge la configuration anti-raid"""
-        try:
-            with open('antiraid_config.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            # Configuration par défaut
-            default_config = {
-                "enabled": True,
-                "raid_detection": {
-                    "joins_threshold": 5,  # Nombre de joins
-                    "joins_timeframe": 10,  # En secondes
-                    "auto_quarantine": True
-                },
-                "anti_spam": {
-                    "enabled": True,
-                    "max_messages": 5,
-                    "timeframe": 10,
-                    "max_duplicates": 3,
-                    "punishment": "mute"  # mute, kick, ban
-                },
-                "verification": {
-                    "enabled": True,
-                    "min_account_age": 7,  # Jours
-                    "require_avatar": False,
-                    "auto_quarantine_new": True
-                },
-                "channels": {
-                    "logs": None,
-                    "quarantine": None
-                },
-                "roles": {
-                    "quarantine": None,
-                    "verified": None
-                },
-                "whitelist": {
-                    "users": [],
-                    "roles": []
-                }
-            }
-            self.save_config(default_config)
-            return default_config
+
+    async def cog_unload(self):
+        self.cleanup_tracker.cancel()
+        await self.settings.stop()
+
+    async def load_guild_config(self, guild_id):
+        """Configuration d'un serveur : valeurs par défaut complétées par ses sections en base"""
+        namespace = self.settings.namespace(guild_id)
+        records = await self.bot.db.load(namespace)
+        if not records and self.legacy_config:
+            # Premier chargement : l'ancienne configuration globale, limitée aux salons et rôles du serveur
+            records = self.scope_legacy_config(guild_id)
+            await self.bot.db.put_many(namespace, records)
+
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        for section, value in records.items():
+            default = config.get(section)
+            config[section] = {**default, **value} if isinstance(default, dict) else value
+        self.track_timeframe(config)
+        return config
+
+    def scope_legacy_config(self, guild_id):
+        """Copie de l'ancienne configuration globale sans les salons et rôles des autres serveurs"""
+        config = copy.deepcopy(self.legacy_config)
+        guild = self.bot.get_guild(guild_id)
+        get_channel = guild.get_channel if guild else lambda _: None
+        get_role = guild.get_role if guild else lambda _: None
+
+        channels = config.get('channels', {})
+        for key in channels:
+            channels[key] = guild_scoped(channels[key], get_channel)
+        roles = config.get('roles', {})
+        for key in roles:
+            roles[key] = guild_scoped(roles[key], get_role)
+        whitelist = config.get('whitelist', {})
+        if 'roles' in whitelist:
+            whitelist['roles'] = guild_scoped(whitelist['roles'], get_role)
+        return config
+
+    def track_timeframe(self, config):
+        """Le tracker de messages garde au moins la plus longue fenêtre anti-spam des serveurs chargés"""
+        self.message_tracker.ttl = max(self.message_tracker.ttl, config['anti_spam']['timeframe'])
     
-    def save_config(self, config=None):
-        """Sauvegarde la configuration"""
-        if config is None:
-            config = self.config
-        try:
-            with open('antiraid_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde config anti-raid: {e}")
+    def save_config(self, guild_id, config, section):
+        """Sauvegarde une section de la configuration d'un serveur"""
+        self.settings.put(guild_id, section, config[section])
     
     @tasks.loop(minutes=1)
     async def cleanup_tracker(self):
         """Nettoie les données de tracking anciennes"""
         now = datetime.now()
         
-        # Nettoie les joins anciens
-        self.join_tracker = [
-            join for join in self.join_tracker 
-            if (now - join['time']).seconds < 300  # Garde 5 minutes
-        ]
+        # Nettoie les joins anciens (5 minutes gardées) et les serveurs sans join récent
+        for guild_id, joins in list(self.join_tracker.items()):
+            self.prune_joins(joins, now)
+            if not joins:
+                del self.join_tracker[guild_id]
         
-        # Nettoie les messages anciens
-        for user_id in list(self.message_tracker.keys()):
-            self.message_tracker[user_id] = [
-                msg for msg in self.message_tracker[user_id]
-                if (now - msg['time']).seconds < 60  # Garde 1 minute
-            ]
-            if not self.message_tracker[user_id]:
-                del self.message_tracker[user_id]
+        # Libère les membres silencieux même sans nouveau message
+        self.message_tracker.expire()
     
+    @staticmethod
+    def prune_joins(joins, now, keep=300):
+        """Retire par la gauche les joins de plus de `keep` secondes"""
+        while joins and (now - joins[0][0]).total_seconds() >= keep:
+            joins.popleft()
+
+    @staticmethod
+    def recent_joins(joins, now, timeframe):
+        """Membres arrivés dans les `timeframe` dernières secondes (parcours depuis la droite)"""
+        recent = []
+        for joined_at, member in reversed(joins):
+            if (now - joined_at).total_seconds() > timeframe:
+                break
+            recent.append(member)
+        recent.reverse()
+        return recent
+
     @commands.Cog.listener()
     async def on_member_join(self, member):
         """Détection de raid et vérification des nouveaux membres"""
-        if not self.config['enabled']:
+        config = await self.settings.get(member.guild.id)
+        if not config['enabled']:
             return
             
         now = datetime.now()
         
-        # Ajouter le join au tracker
-        self.join_tracker.append({
-            'user': member,
-            'time': now
-        })
+        # Ajouter le join au tracker du serveur
+        joins = self.join_tracker.get(member.guild.id)
+        if joins is None:
+            joins = self.join_tracker[member.guild.id] = deque()
+        self.prune_joins(joins, now)
+        joins.append((now, member))
         
         # Vérifier si c'est un raid
-        await self.check_raid_detection(member.guild)
+        await self.check_raid_detection(config, member.guild)
         
         # Vérifier l'âge du compte
-        await self.check_account_verification(member)
+        await self.check_account_verification(config, member)
         
         # Log du join
-        await self.log_member_join(member)
+        await self.log_member_join(config, member)
     
-    async def check_raid_detection(self, guild):
+    async def check_raid_detection(self, config, guild):
         """Vérifie s'il y a un raid en cours"""
-        config = self.config['raid_detection']
-        now = datetime.now()
+        detection = config['raid_detection']
         
-        # Compter les joins récents
-        recent_joins = [
-            join for join in self.join_tracker
-            if (now - join['time']).seconds <= config['joins_timeframe']
-        ]
+        # Compter les joins récents sur ce serveur
+        recent_joins = self.recent_joins(
+            self.join_tracker.get(guild.id, ()), datetime.now(), detection['joins_timeframe']
+        )
         
-        if len(recent_joins) >= config['joins_threshold']:
-            if not self.raid_mode:
-                await self.activate_raid_mode(guild)
+        if len(recent_joins) >= detection['joins_threshold']:
+            if guild.id not in self.raid_guilds:
+                await self.activate_raid_mode(config, guild)
                 
                 # Quarantaine automatique des nouveaux arrivants
-                if config['auto_quarantine']:
-                    for join_data in recent_joins:
-                        await self.quarantine_user(join_data['user'])
+                if detection['auto_quarantine']:
+                    for member in recent_joins:
+                        await self.quarantine_user(config, member)
     
-    async def activate_raid_mode(self, guild):
+    async def activate_raid_mode(self, config, guild):
         """Active le mode anti-raid"""
-        self.raid_mode = True
+        self.raid_guilds.add(guild.id)
         
         embed = discord.Embed(
             title="🚨 MODE ANTI-RAID ACTIVÉ",
@@ -157,7 +212,7 @@ class AntiRaid(commands.Cog):
         )
         
         # Envoyer dans le canal de logs
-        log_channel = self.get_log_channel(guild)
+        log_channel = self.get_log_channel(config, guild)
         if log_channel:
             await log_channel.send(embed=embed)
         
@@ -168,11 +223,11 @@ class AntiRaid(commands.Cog):
         
         # Désactiver automatiquement après 10 minutes
         await asyncio.sleep(600)
-        await self.deactivate_raid_mode(guild)
+        await self.deactivate_raid_mode(config, guild)
     
-    async def deactivate_raid_mode(self, guild):
+    async def deactivate_raid_mode(self, config, guild):
         """Désactive le mode anti-raid"""
-        self.raid_mode = False
+        self.raid_guilds.discard(guild.id)
         
         embed = discord.Embed(
             title="✅ MODE ANTI-RAID DÉSACTIVÉ",
@@ -181,16 +236,16 @@ class AntiRaid(commands.Cog):
             timestamp=datetime.now()
         )
         
-        log_channel = self.get_log_channel(guild)
+        log_channel = self.get_log_channel(config, guild)
         if log_channel:
             await log_channel.send(embed=embed)
         
         logger.info(f"Mode anti-raid désactivé sur {guild.name}")
     
-    async def check_account_verification(self, member):
+    async def check_account_verification(self, config, member):
         """Vérifie l'âge et la validité du compte"""
-        config = self.config['verification']
-        if not config['enabled']:
+        verification = config['verification']
+        if not verification['enabled']:
             return
         
         now = datetime.now()
@@ -200,12 +255,12 @@ class AntiRaid(commands.Cog):
         reasons = []
         
         # Vérifier l'âge du compte
-        if account_age < config['min_account_age']:
+        if account_age < verification['min_account_age']:
             suspicious = True
             reasons.append(f"Compte trop récent ({account_age} jours)")
         
         # Vérifier l'avatar
-        if config['require_avatar'] and member.display_avatar == member.default_avatar:
+        if verification['require_avatar'] and member.display_avatar == member.default_avatar:
             suspicious = True
             reasons.append("Pas d'avatar personnalisé")
         
@@ -215,10 +270,10 @@ class AntiRaid(commands.Cog):
             reasons.append("Nom d'utilisateur suspect")
         
         if suspicious:
-            if config['auto_quarantine_new'] or self.raid_mode:
-                await self.quarantine_user(member, reasons)
+            if verification['auto_quarantine_new'] or member.guild.id in self.raid_guilds:
+                await self.quarantine_user(config, member, reasons)
             else:
-                await self.log_suspicious_user(member, reasons)
+                await self.log_suspicious_user(config, member, reasons)
     
     def is_suspicious_username(self, username):
         """Vérifie si un nom d'utilisateur est suspect"""
@@ -234,9 +289,9 @@ class AntiRaid(commands.Cog):
                 return True
         return False
     
-    async def quarantine_user(self, member, reasons=None):
+    async def quarantine_user(self, config, member, reasons=None):
         """Met un utilisateur en quarantaine"""
-        quarantine_role_id = self.config['roles']['quarantine']
+        quarantine_role_id = config['roles']['quarantine']
         if not quarantine_role_id:
             return
         
@@ -247,7 +302,7 @@ class AntiRaid(commands.Cog):
         try:
             # Retirer tous les autres rôles et ajouter la quarantaine
             await member.edit(roles=[quarantine_role], reason="Quarantaine automatique")
-            self.quarantine_users.add(member.id)
+            self.quarantine_users.add((member.guild.id, member.id))
             
             # Log de la quarantaine
             embed = discord.Embed(
@@ -262,7 +317,7 @@ class AntiRaid(commands.Cog):
             if reasons:
                 embed.add_field(name="⚠️ Raisons", value="\n".join(f"• {reason}" for reason in reasons), inline=False)
             
-            log_channel = self.get_log_channel(member.guild)
+            log_channel = self.get_log_channel(config, member.guild)
             if log_channel:
                 await log_channel.send(embed=embed)
             
@@ -277,45 +332,42 @@ class AntiRaid(commands.Cog):
         if not message.guild or message.author.bot:
             return
         
-        if not self.config['anti_spam']['enabled']:
+        config = await self.settings.get(message.guild.id)
+        if not config['anti_spam']['enabled']:
             return
         
         # Vérifier la whitelist
-        if self.is_whitelisted(message.author):
+        if self.is_whitelisted(config, message.author):
             return
         
-        await self.check_spam(message)
-        await self.check_suspicious_content(message)
+        await self.check_spam(config, message)
+        await self.check_suspicious_content(config, message)
     
-    async def check_spam(self, message):
+    async def check_spam(self, config, message):
         """Vérifie le spam de messages"""
-        config = self.config['anti_spam']
-        user_id = message.author.id
+        anti_spam = config['anti_spam']
+        tracker_key = (message.guild.id, message.author.id)
         now = datetime.now()
         
-        # Initialiser le tracker pour l'utilisateur
-        if user_id not in self.message_tracker:
-            self.message_tracker[user_id] = []
-        
-        # Ajouter le message
-        self.message_tracker[user_id].append({
+        # Ajouter le message aux messages récents de l'utilisateur
+        recent_messages = self.message_tracker.get(tracker_key, [])
+        recent_messages.append({
             'content': message.content,
             'time': now,
             'channel': message.channel.id
         })
         
-        # Nettoyer les anciens messages
-        timeframe = config['timeframe']
-        self.message_tracker[user_id] = [
-            msg for msg in self.message_tracker[user_id]
+        # Nettoyer les anciens messages (et repousser l'expiration de l'entrée)
+        timeframe = anti_spam['timeframe']
+        recent_messages = [
+            msg for msg in recent_messages
             if (now - msg['time']).seconds <= timeframe
         ]
-        
-        recent_messages = self.message_tracker[user_id]
+        self.message_tracker[tracker_key] = recent_messages
         
         # Vérifier le nombre de messages
-        if len(recent_messages) > config['max_messages']:
-            await self.punish_spammer(message.author, "Trop de messages", message.channel)
+        if len(recent_messages) > anti_spam['max_messages']:
+            await self.punish_spammer(config, message.author, "Trop de messages", message.channel)
             return
         
         # Vérifier les doublons
@@ -325,11 +377,11 @@ class AntiRaid(commands.Cog):
             content_counts[content] = content_counts.get(content, 0) + 1
         
         for content, count in content_counts.items():
-            if count > config['max_duplicates']:
-                await self.punish_spammer(message.author, "Messages dupliqués", message.channel)
+            if count > anti_spam['max_duplicates']:
+                await self.punish_spammer(config, message.author, "Messages dupliqués", message.channel)
                 return
 
-    async def check_suspicious_content(self, message):
+    async def check_suspicious_content(self, config, message):
         """Vérifie le contenu suspect"""
         content = message.content.lower()
 
@@ -342,12 +394,11 @@ class AntiRaid(commands.Cog):
 
         for pattern in suspicious_patterns:
             if re.search(pattern, content):
-                await self.log_suspicious_message(message, f"Pattern suspect: {pattern}")
+                await self.log_suspicious_message(config, message, f"Pattern suspect: {pattern}")
 
-    async def punish_spammer(self, member, reason, channel):
+    async def punish_spammer(self, config, member, reason, channel):
         """Punit un spammeur"""
-        config = self.config['anti_spam']
-        punishment = config['punishment']
+        punishment = config['anti_spam']['punishment']
 
         try:
             if punishment == "mute":
@@ -370,7 +421,7 @@ class AntiRaid(commands.Cog):
             embed.add_field(name="⚖️ Punition", value=punishment.title(), inline=False)
             embed.add_field(name="📍 Canal", value=channel.mention, inline=False)
 
-            log_channel = self.get_log_channel(member.guild)
+            log_channel = self.get_log_channel(config, member.guild)
             if log_channel:
                 await log_channel.send(embed=embed)
 
@@ -389,9 +440,9 @@ class AntiRaid(commands.Cog):
         except discord.Forbidden:
             pass
 
-    def is_whitelisted(self, member):
+    def is_whitelisted(self, config, member):
         """Vérifie si un membre est dans la whitelist"""
-        whitelist = self.config['whitelist']
+        whitelist = config['whitelist']
 
         # Vérifier l'utilisateur
         if member.id in whitelist['users']:
@@ -404,9 +455,9 @@ class AntiRaid(commands.Cog):
 
         return False
 
-    def get_log_channel(self, guild):
-        """Récupère le canal de logs"""
-        log_channel_id = self.config['channels']['logs']
+    def get_log_channel(self, config, guild):
+        """Récupère le canal de logs du serveur"""
+        log_channel_id = config['channels']['logs']
         if log_channel_id:
             return guild.get_channel(log_channel_id)
         return None
@@ -420,7 +471,7 @@ class AntiRaid(commands.Cog):
                 except discord.Forbidden:
                     pass
 
-    async def log_member_join(self, member):
+    async def log_member_join(self, config, member):
         """Log l'arrivée d'un membre"""
         embed = discord.Embed(
             title="📥 Nouveau membre",
@@ -433,11 +484,11 @@ class AntiRaid(commands.Cog):
         embed.add_field(name="📊 Âge du compte", value=f"{(datetime.now() - member.created_at).days} jours", inline=True)
         embed.set_thumbnail(url=member.display_avatar.url)
 
-        log_channel = self.get_log_channel(member.guild)
+        log_channel = self.get_log_channel(config, member.guild)
         if log_channel:
             await log_channel.send(embed=embed)
 
-    async def log_suspicious_user(self, member, reasons):
+    async def log_suspicious_user(self, config, member, reasons):
         """Log un utilisateur suspect"""
         embed = discord.Embed(
             title="⚠️ Utilisateur suspect détecté",
@@ -450,11 +501,11 @@ class AntiRaid(commands.Cog):
         embed.add_field(name="⚠️ Raisons", value="\n".join(f"• {reason}" for reason in reasons), inline=False)
         embed.set_thumbnail(url=member.display_avatar.url)
 
-        log_channel = self.get_log_channel(member.guild)
+        log_channel = self.get_log_channel(config, member.guild)
         if log_channel:
             await log_channel.send(embed=embed)
 
-    async def log_suspicious_message(self, message, reason):
+    async def log_suspicious_message(self, config, message, reason):
         """Log un message suspect"""
         embed = discord.Embed(
             title="🚨 Message suspect",
@@ -466,7 +517,7 @@ class AntiRaid(commands.Cog):
         embed.add_field(name="📝 Contenu", value=message.content[:1000], inline=False)
         embed.add_field(name="⚠️ Raison", value=reason, inline=False)
 
-        log_channel = self.get_log_channel(message.guild)
+        log_channel = self.get_log_channel(config, message.guild)
         if log_channel:
             await log_channel.send(embed=embed)
 
@@ -514,9 +565,10 @@ class AntiRaid(commands.Cog):
             for channel in ctx.guild.channels:
                 await channel.set_permissions(quarantine_role, send_messages=False, add_reactions=False)
 
-        # Mettre à jour la config
-        self.config['roles']['quarantine'] = quarantine_role.id
-        self.save_config()
+        # Mettre à jour la config du serveur
+        config = await self.settings.get(ctx.guild.id)
+        config['roles']['quarantine'] = quarantine_role.id
+        self.save_config(ctx.guild.id, config, 'roles')
 
         embed.add_field(
             name="✅ Rôle de quarantaine",
@@ -537,7 +589,7 @@ class AntiRaid(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def status_antiraid(self, ctx):
         """Affiche le statut du système anti-raid"""
-        config = self.config
+        config = await self.settings.get(ctx.guild.id)
 
         embed = discord.Embed(
             title="📊 Statut Anti-Raid",
@@ -547,11 +599,13 @@ class AntiRaid(commands.Cog):
 
         # Statut général
         status = "🟢 Activé" if config['enabled'] else "🔴 Désactivé"
-        raid_status = "🚨 ACTIF" if self.raid_mode else "✅ Normal"
+        raid_status = "🚨 ACTIF" if ctx.guild.id in self.raid_guilds else "✅ Normal"
 
         embed.add_field(name="🛡️ Système", value=status, inline=True)
         embed.add_field(name="⚡ Mode Raid", value=raid_status, inline=True)
-        embed.add_field(name="🔒 En quarantaine", value=str(len(self.quarantine_users)), inline=True)
+        embed.add_field(name="🔒 En quarantaine", value=str(
+            sum(1 for guild_id, _ in self.quarantine_users if guild_id == ctx.guild.id)
+        ), inline=True)
 
         # Configuration
         embed.add_field(
@@ -567,9 +621,10 @@ class AntiRaid(commands.Cog):
         )
 
         # Statistiques
-        recent_joins = len([j for j in self.join_tracker if (datetime.now() - j['time']).seconds < 300])
+        recent_joins = len(self.recent_joins(self.join_tracker.get(ctx.guild.id, ()), datetime.now(), 300))
         embed.add_field(name="📈 Joins récents (5min)", value=str(recent_joins), inline=True)
-        embed.add_field(name="💬 Messages trackés", value=str(len(self.message_tracker)), inline=True)
+        tracked = sum(1 for (guild_id, _), _ in self.message_tracker.items() if guild_id == ctx.guild.id)
+        embed.add_field(name="💬 Messages trackés", value=str(tracked), inline=True)
 
         await ctx.send(embed=embed)
 
@@ -577,11 +632,12 @@ class AntiRaid(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def toggle_antiraid(self, ctx):
         """Active/désactive le système anti-raid"""
-        self.config['enabled'] = not self.config['enabled']
-        self.save_config()
+        config = await self.settings.get(ctx.guild.id)
+        config['enabled'] = not config['enabled']
+        self.save_config(ctx.guild.id, config, 'enabled')
 
-        status = "activé" if self.config['enabled'] else "désactivé"
-        color = 0x2ecc71 if self.config['enabled'] else 0xe74c3c
+        status = "activé" if config['enabled'] else "désactivé"
+        color = 0x2ecc71 if config['enabled'] else 0xe74c3c
 
         embed = discord.Embed(
             title=f"🛡️ Anti-Raid {status.title()}",
@@ -594,8 +650,9 @@ class AntiRaid(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def set_logs_channel(self, ctx, channel: discord.TextChannel):
         """Configure le canal de logs"""
-        self.config['channels']['logs'] = channel.id
-        self.save_config()
+        config = await self.settings.get(ctx.guild.id)
+        config['channels']['logs'] = channel.id
+        self.save_config(ctx.guild.id, config, 'channels')
 
         embed = discord.Embed(
             title="📝 Canal de logs configuré",
@@ -608,6 +665,7 @@ class AntiRaid(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def manage_whitelist(self, ctx, action: str, target: discord.Member = None, role: discord.Role = None):
         """Gère la whitelist (add/remove user/role)"""
+        config = await self.settings.get(ctx.guild.id)
         if action not in ['add', 'remove']:
             embed = discord.Embed(
                 title="❌ Action invalide",
@@ -620,14 +678,14 @@ class AntiRaid(commands.Cog):
         if target:
             # Gestion utilisateur
             if action == 'add':
-                if target.id not in self.config['whitelist']['users']:
-                    self.config['whitelist']['users'].append(target.id)
+                if target.id not in config['whitelist']['users']:
+                    config['whitelist']['users'].append(target.id)
                     message = f"✅ {target.mention} ajouté à la whitelist"
                 else:
                     message = f"ℹ️ {target.mention} est déjà dans la whitelist"
             else:
-                if target.id in self.config['whitelist']['users']:
-                    self.config['whitelist']['users'].remove(target.id)
+                if target.id in config['whitelist']['users']:
+                    config['whitelist']['users'].remove(target.id)
                     message = f"✅ {target.mention} retiré de la whitelist"
                 else:
                     message = f"ℹ️ {target.mention} n'est pas dans la whitelist"
@@ -635,14 +693,14 @@ class AntiRaid(commands.Cog):
         elif role:
             # Gestion rôle
             if action == 'add':
-                if role.id not in self.config['whitelist']['roles']:
-                    self.config['whitelist']['roles'].append(role.id)
+                if role.id not in config['whitelist']['roles']:
+                    config['whitelist']['roles'].append(role.id)
                     message = f"✅ {role.mention} ajouté à la whitelist"
                 else:
                     message = f"ℹ️ {role.mention} est déjà dans la whitelist"
             else:
-                if role.id in self.config['whitelist']['roles']:
-                    self.config['whitelist']['roles'].remove(role.id)
+                if role.id in config['whitelist']['roles']:
+                    config['whitelist']['roles'].remove(role.id)
                     message = f"✅ {role.mention} retiré de la whitelist"
                 else:
                     message = f"ℹ️ {role.mention} n'est pas dans la whitelist"
@@ -655,7 +713,7 @@ class AntiRaid(commands.Cog):
             await ctx.send(embed=embed)
             return
 
-        self.save_config()
+        self.save_config(ctx.guild.id, config, 'whitelist')
 
         embed = discord.Embed(
             title="🛡️ Whitelist mise à jour",
@@ -668,9 +726,10 @@ class AntiRaid(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def manage_quarantine(self, ctx, action: str, member: discord.Member = None):
         """Gère la quarantaine (list/release)"""
+        config = await self.settings.get(ctx.guild.id)
         if action == 'list':
             # Lister les utilisateurs en quarantaine
-            quarantine_role_id = self.config['roles']['quarantine']
+            quarantine_role_id = config['roles']['quarantine']
             if not quarantine_role_id:
                 embed = discord.Embed(
                     title="❌ Rôle de quarantaine non configuré",
@@ -718,7 +777,7 @@ class AntiRaid(commands.Cog):
 
         elif action == 'release' and member:
             # Libérer un utilisateur de la quarantaine
-            quarantine_role_id = self.config['roles']['quarantine']
+            quarantine_role_id = config['roles']['quarantine']
             if not quarantine_role_id:
                 embed = discord.Embed(
                     title="❌ Rôle de quarantaine non configuré",
@@ -730,7 +789,7 @@ class AntiRaid(commands.Cog):
             quarantine_role = ctx.guild.get_role(quarantine_role_id)
             if quarantine_role in member.roles:
                 await member.remove_roles(quarantine_role, reason=f"Libéré par {ctx.author}")
-                self.quarantine_users.discard(member.id)
+                self.quarantine_users.discard((ctx.guild.id, member.id))
 
                 embed = discord.Embed(
                     title="✅ Utilisateur libéré",
@@ -748,7 +807,7 @@ class AntiRaid(commands.Cog):
                 log_embed.add_field(name="👤 Utilisateur", value=f"{member.mention} ({member.id})", inline=False)
                 log_embed.add_field(name="👮 Libéré par", value=f"{ctx.author.mention}", inline=False)
 
-                log_channel = self.get_log_channel(ctx.guild)
+                log_channel = self.get_log_channel(config, ctx.guild)
                 if log_channel:
                     await log_channel.send(embed=log_embed)
             else:
@@ -770,6 +829,7 @@ class AntiRaid(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def configure_antiraid(self, ctx, setting: str = None, value: str = None):
         """Configure les paramètres avancés"""
+        config = await self.settings.get(ctx.guild.id)
         if not setting:
             # Afficher la configuration actuelle
             embed = discord.Embed(
@@ -777,7 +837,6 @@ class AntiRaid(commands.Cog):
                 color=0x3498db
             )
 
-            config = self.config
             embed.add_field(
                 name="🚨 Détection de raid",
                 value=f"Seuil: {config['raid_detection']['joins_threshold']} joins\n"
@@ -843,8 +902,9 @@ class AntiRaid(commands.Cog):
                 if setting == 'punishment' and new_value not in ['mute', 'kick', 'ban']:
                     raise ValueError("Punition doit être: mute, kick, ou ban")
 
-            self.config[section][key] = new_value
-            self.save_config()
+            config[section][key] = new_value
+            self.save_config(ctx.guild.id, config, section)
+            self.track_timeframe(config)
 
             embed = discord.Embed(
                 title="✅ Configuration mise à jour",
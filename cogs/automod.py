@@ -1,88 +1,138 @@
 import discord
 from discord.ext import commands
 import re
-import json
 import logging
 from datetime import datetime, timedelta
 import asyncio
+import copy
+
+from utils.expiring import ExpiringMap
+from utils.guild_state import GuildStateCache, guild_scoped
 
 logger = logging.getLogger('discord_bot.automod')
 
+# Configuration d'un serveur : une ligne par section dans le namespace automod:<guild_id>
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "filters": {
+        "profanity": {
+            "enabled": True,
+            "action": "delete",  # delete, warn, mute, kick, ban
+            "punishment_escalation": True
+        },
+        "spam": {
+            "enabled": True,
+            "max_mentions": 5,
+            "max_emojis": 10,
+            "max_caps_percentage": 70,
+            "action": "warn"
+        },
+        "links": {
+            "enabled": True,
+            "whitelist": [],
+            "block_invites": True,
+            "block_suspicious": True,
+            "action": "delete"
+        },
+        "zalgo": {
+            "enabled": True,
+            "action": "delete"
+        },
+        "repeated_text": {
+            "enabled": True,
+            "max_repeated_chars": 5,
+            "action": "warn"
+        }
+    },
+    "punishments": {
+        "escalation_enabled": True,
+        "escalation_steps": ["warn", "mute", "kick", "ban"],
+        "mute_duration": 600,  # 10 minutes
+        "reset_violations_after": 86400  # 24 heures
+    },
+    "channels": {
+        "logs": None,
+        "ignored": []
+    },
+    "roles": {
+        "ignored": [],
+        "muted": None
+    },
+    "whitelist": {
+        "users": [],
+        "roles": []
+    }
+}
+
+
 class AutoMod(commands.Cog):
     """Système d'automodération intelligent"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.config = self.load_config()
-        self.word_filters = self.load_word_filters()
-        self.user_violations = {}  # Tracking des violations par utilisateur
-        
-    def load_config(self):
-        """Charge la configuration d'automodération"""
-        try:
-            with open('automod_config.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            default_config = {
-                "enabled": True,
-                "filters": {
-                    "profanity": {
-                        "enabled": True,
-                        "action": "delete",  # delete, warn, mute, kick, ban
-                        "punishment_escalation": True
-                    },
-                    "spam": {
-                        "enabled": True,
-                        "max_mentions": 5,
-                        "max_emojis": 10,
-                        "max_caps_percentage": 70,
-                        "action": "warn"
-                    },
-                    "links": {
-                        "enabled": True,
-                        "whitelist": [],
-                        "block_invites": True,
-                        "block_suspicious": True,
-                        "action": "delete"
-                    },
-                    "zalgo": {
-                        "enabled": True,
-                        "action": "delete"
-                    },
-                    "repeated_text": {
-                        "enabled": True,
-                        "max_repeated_chars": 5,
-                        "action": "warn"
-                    }
-                },
-                "punishments": {
-                    "escalation_enabled": True,
-                    "escalation_steps": ["warn", "mute", "kick", "ban"],
-                    "mute_duration": 600,  # 10 minutes
-                    "reset_violations_after": 86400  # 24 heures
-                },
-                "channels": {
-                    "logs": None,
-                    "ignored": []
-                },
-                "roles": {
-                    "ignored": [],
-                    "muted": None
-                },
-                "whitelist": {
-                    "users": [],
-                    "roles": []
-                }
-            }
-            self.save_config(default_config)
-            return default_config
-    
-    def load_word_filters(self):
+        # Configuration par serveur, chargée au premier message du serveur
+        self.settings = GuildStateCache(
+            bot.db, 'automod',
+            idle_timeout=bot.config.get('persistence', {}).get('guild_idle_timeout', 1800),
+            loader=self.load_guild_config
+        )
+        self.legacy_config = None  # Ancienne configuration globale (config/automod), copiée une fois par serveur
+        self.word_filters = {}
+        self.user_violations = ExpiringMap(
+            DEFAULT_CONFIG['punishments']['reset_violations_after'], resolution=60, name='automod.violations'
+        )  # Violations par (serveur, utilisateur)
+
+    async def cog_load(self):
+        """Charge les filtres de mots et démarre l'éviction des serveurs inactifs"""
+        self.legacy_config = await self.bot.db.get('config', 'automod')
+        self.word_filters = await self.load_word_filters()
+        self.settings.start()
+
+    async def cog_unload(self):
+        await self.settings.stop()
+
+    async def load_guild_config(self, guild_id):
+        """Configuration d'un serveur : valeurs par défaut complétées par ses sections en base"""
+        namespace = self.settings.namespace(guild_id)
+        records = await self.bot.db.load(namespace)
+        if not records and self.legacy_config:
+            # Premier chargement : l'ancienne configuration globale, limitée aux salons et rôles du serveur
+            records = self.scope_legacy_config(guild_id)
+            await self.bot.db.put_many(namespace, records)
+
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        for section, value in records.items():
+            default = config.get(section)
+            config[section] = {**default, **value} if isinstance(default, dict) else value
+
+        # Les violations sont oubliées après reset_violations_after secondes sans récidive :
+        # le suivi garde au moins le plus long délai des serveurs chargés
+        reset_after = config['punishments']['reset_violations_after']
+        self.user_violations.ttl = max(self.user_violations.ttl, reset_after)
+        return config
+
+    def scope_legacy_config(self, guild_id):
+        """Copie de l'ancienne configuration globale sans les salons et rôles des autres serveurs"""
+        config = copy.deepcopy(self.legacy_config)
+        guild = self.bot.get_guild(guild_id)
+        get_channel = guild.get_channel if guild else lambda _: None
+        get_role = guild.get_role if guild else lambda _: None
+
+        channels = config.get('channels', {})
+        for key in channels:
+            channels[key] = guild_scoped(channels[key], get_channel)
+        roles = config.get('roles', {})
+        for key in roles:
+            roles[key] = guild_scoped(roles[key], get_role)
+        whitelist = config.get('whitelist', {})
+        if 'roles' in whitelist:
+            whitelist['roles'] = guild_scoped(whitelist['roles'], get_role)
+        return config
+
+    async def load_word_filters(self):
         """Charge les filtres de mots"""
-        try:
-            with open('word_filters.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
+        filters = await self.bot.db.get('config', 'word_filters')
+        if filters is None:
             default_filters = {
                 "profanity": [
                     # Mots grossiers en français (version censurée pour l'exemple)
@@ -99,26 +149,17 @@ class AutoMod(commands.Cog):
             }
             self.save_word_filters(default_filters)
             return default_filters
+        return filters
     
-    def save_config(self, config=None):
-        """Sauvegarde la configuration"""
-        if config is None:
-            config = self.config
-        try:
-            with open('automod_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde config automod: {e}")
+    def save_config(self, guild_id, config, section):
+        """Sauvegarde une section de la configuration d'un serveur"""
+        self.settings.put(guild_id, section, config[section])
     
     def save_word_filters(self, filters=None):
         """Sauvegarde les filtres de mots"""
         if filters is None:
             filters = self.word_filters
-        try:
-            with open('word_filters.json', 'w', encoding='utf-8') as f:
-                json.dump(filters, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde filtres: {e}")
+        self.bot.db.put('config', 'word_filters', filters)
     
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -126,32 +167,33 @@ class AutoMod(commands.Cog):
         if not message.guild or message.author.bot:
             return
         
-        if not self.config['enabled']:
+        config = await self.settings.get(message.guild.id)
+        if not config['enabled']:
             return
         
         # Vérifier les exemptions
-        if self.is_exempt(message.author, message.channel):
+        if self.is_exempt(config, message.author, message.channel):
             return
         
         # Analyser le message
-        violations = await self.analyze_message(message)
+        violations = await self.analyze_message(config, message)
         
         if violations:
-            await self.handle_violations(message, violations)
+            await self.handle_violations(config, message, violations)
     
-    def is_exempt(self, member, channel):
+    def is_exempt(self, config, member, channel):
         """Vérifie si un membre/canal est exempté"""
         # Canaux ignorés
-        if channel.id in self.config['channels']['ignored']:
+        if channel.id in config['channels']['ignored']:
             return True
         
         # Utilisateurs whitelist
-        if member.id in self.config['whitelist']['users']:
+        if member.id in config['whitelist']['users']:
             return True
         
         # Rôles ignorés/whitelist
         for role in member.roles:
-            if role.id in self.config['roles']['ignored'] or role.id in self.config['whitelist']['roles']:
+            if role.id in config['roles']['ignored'] or role.id in config['whitelist']['roles']:
                 return True
         
         # Permissions de modération
@@ -160,46 +202,46 @@ class AutoMod(commands.Cog):
         
         return False
     
-    async def analyze_message(self, message):
+    async def analyze_message(self, config, message):
         """Analyse un message et retourne les violations"""
         violations = []
         content = message.content
         
         # Filtre de grossièretés
-        if self.config['filters']['profanity']['enabled']:
+        if config['filters']['profanity']['enabled']:
             if self.contains_profanity(content):
                 violations.append({
                     'type': 'profanity',
                     'reason': 'Langage inapproprié détecté',
-                    'action': self.config['filters']['profanity']['action']
+                    'action': config['filters']['profanity']['action']
                 })
         
         # Filtre de spam
-        if self.config['filters']['spam']['enabled']:
-            spam_violations = self.check_spam_content(content, message)
+        if config['filters']['spam']['enabled']:
+            spam_violations = self.check_spam_content(content, message, config['filters']['spam'])
             violations.extend(spam_violations)
         
         # Filtre de liens
-        if self.config['filters']['links']['enabled']:
-            link_violations = self.check_links(content)
+        if config['filters']['links']['enabled']:
+            link_violations = self.check_links(content, config['filters']['links'])
             violations.extend(link_violations)
         
         # Filtre Zalgo/caractères spéciaux
-        if self.config['filters']['zalgo']['enabled']:
+        if config['filters']['zalgo']['enabled']:
             if self.contains_zalgo(content):
                 violations.append({
                     'type': 'zalgo',
                     'reason': 'Caractères spéciaux/Zalgo détectés',
-                    'action': self.config['filters']['zalgo']['action']
+                    'action': config['filters']['zalgo']['action']
                 })
         
         # Filtre de texte répété
-        if self.config['filters']['repeated_text']['enabled']:
-            if self.contains_repeated_text(content):
+        if config['filters']['repeated_text']['enabled']:
+            if self.contains_repeated_text(content, config['filters']['repeated_text']['max_repeated_chars']):
                 violations.append({
                     'type': 'repeated_text',
                     'reason': 'Texte répétitif détecté',
-                    'action': self.config['filters']['repeated_text']['action']
+                    'action': config['filters']['repeated_text']['action']
                 })
         
         return violations
@@ -216,10 +258,9 @@ class AutoMod(commands.Cog):
         
         return False
     
-    def check_spam_content(self, content, message):
+    def check_spam_content(self, content, message, config):
         """Vérifie le contenu spam"""
         violations = []
-        config = self.config['filters']['spam']
         
         # Vérifier les mentions excessives
         mentions = len(message.mentions) + len(message.role_mentions)
@@ -252,10 +293,9 @@ class AutoMod(commands.Cog):
         
         return violations
     
-    def check_links(self, content):
+    def check_links(self, content, config):
         """Vérifie les liens suspects"""
         violations = []
-        config = self.config['filters']['links']
         
         # Détecter les URLs
         url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
@@ -296,9 +336,8 @@ class AutoMod(commands.Cog):
         zalgo_count = sum(content.count(char) for char in zalgo_chars)
         return zalgo_count > 5  # Seuil de détection
     
-    def contains_repeated_text(self, content):
+    def contains_repeated_text(self, content, max_repeated):
         """Détecte le texte répétitif"""
-        max_repeated = self.config['filters']['repeated_text']['max_repeated_chars']
         
         # Vérifier les caractères répétés
         for i in range(len(content) - max_repeated):
@@ -308,13 +347,22 @@ class AutoMod(commands.Cog):
         
         return False
     
-    async def handle_violations(self, message, violations):
+    def get_violations(self, config, guild_id, user_id):
+        """Violations d'un membre, None si son serveur les a déjà oubliées"""
+        user_data = self.user_violations.get((guild_id, user_id))
+        reset_after = config['punishments']['reset_violations_after']
+        if user_data is not None and (datetime.now() - user_data['last_violation']).total_seconds() >= reset_after:
+            return None
+        return user_data
+
+    async def handle_violations(self, config, message, violations):
         """Gère les violations détectées"""
-        user_id = message.author.id
+        tracker_key = (message.guild.id, message.author.id)
         
         # Initialiser le tracking des violations
-        if user_id not in self.user_violations:
-            self.user_violations[user_id] = {
+        user_data = self.get_violations(config, message.guild.id, message.author.id)
+        if user_data is None:
+            user_data = {
                 'count': 0,
                 'last_violation': datetime.now(),
                 'violations': []
@@ -322,15 +370,18 @@ class AutoMod(commands.Cog):
         
         # Ajouter les violations
         for violation in violations:
-            self.user_violations[user_id]['violations'].append({
+            user_data['violations'].append({
                 'type': violation['type'],
                 'reason': violation['reason'],
                 'timestamp': datetime.now(),
                 'message_id': message.id
             })
         
-        self.user_violations[user_id]['count'] += len(violations)
-        self.user_violations[user_id]['last_violation'] = datetime.now()
+        del user_data['violations'][:-50]  # Historique borné, le compteur garde le total
+        user_data['count'] += len(violations)
+        user_data['last_violation'] = datetime.now()
+        # Chaque récidive repousse l'oubli des violations
+        self.user_violations[tracker_key] = user_data
         
         # Supprimer le message si nécessaire
         if any(v['action'] == 'delete' for v in violations):
@@ -340,33 +391,33 @@ class AutoMod(commands.Cog):
                 pass
         
         # Appliquer les punitions
-        await self.apply_punishment(message.author, violations)
+        await self.apply_punishment(config, message.author, violations)
         
         # Logger les violations
-        await self.log_violations(message, violations)
+        await self.log_violations(config, message, violations)
     
-    async def apply_punishment(self, member, violations):
+    async def apply_punishment(self, config, member, violations):
         """Applique les punitions selon l'escalade"""
-        if not self.config['punishments']['escalation_enabled']:
+        if not config['punishments']['escalation_enabled']:
             # Appliquer la punition directe
             for violation in violations:
-                await self.execute_action(member, violation['action'], violation['reason'])
+                await self.execute_action(config, member, violation['action'], violation['reason'])
             return
         
         # Système d'escalade
-        user_data = self.user_violations[member.id]
+        user_data = self.user_violations.get((member.guild.id, member.id), {'count': 1})
         violation_count = user_data['count']
         
-        escalation_steps = self.config['punishments']['escalation_steps']
+        escalation_steps = config['punishments']['escalation_steps']
         
         # Déterminer l'étape d'escalade
         step_index = min(violation_count - 1, len(escalation_steps) - 1)
         action = escalation_steps[step_index]
         
         reason = f"Automodération - {violation_count} violation(s)"
-        await self.execute_action(member, action, reason)
+        await self.execute_action(config, member, action, reason)
     
-    async def execute_action(self, member, action, reason):
+    async def execute_action(self, config, member, action, reason):
         """Exécute une action de punition"""
         try:
             if action == "warn":
@@ -377,14 +428,14 @@ class AutoMod(commands.Cog):
                     self.bot.warnings[member.id] += 1
                 
             elif action == "mute":
-                mute_role_id = self.config['roles']['muted']
+                mute_role_id = config['roles']['muted']
                 if mute_role_id:
                     mute_role = member.guild.get_role(mute_role_id)
                     if mute_role:
                         await member.add_roles(mute_role, reason=reason)
                         
                         # Démute automatique
-                        duration = self.config['punishments']['mute_duration']
+                        duration = config['punishments']['mute_duration']
                         await asyncio.sleep(duration)
                         await member.remove_roles(mute_role, reason="Démute automatique")
                 
@@ -399,9 +450,9 @@ class AutoMod(commands.Cog):
         except Exception as e:
             logger.error(f"Erreur lors de l'exécution de {action}: {e}")
     
-    async def log_violations(self, message, violations):
-        """Log les violations dans le canal de logs"""
-        log_channel_id = self.config['channels']['logs']
+    async def log_violations(self, config, message, violations):
+        """Log les violations dans le canal de logs du serveur"""
+        log_channel_id = config['channels']['logs']
         if not log_channel_id:
             return
         
@@ -422,7 +473,7 @@ class AutoMod(commands.Cog):
         violations_text = "\n".join(f"• {v['reason']}" for v in violations)
         embed.add_field(name="⚠️ Violations", value=violations_text, inline=False)
         
-        user_data = self.user_violations.get(message.author.id, {})
+        user_data = self.user_violations.get((message.guild.id, message.author.id), {})
         embed.add_field(name="📊 Total violations", value=str(user_data.get('count', 0)), inline=True)
         
         try:
@@ -456,7 +507,7 @@ class AutoMod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def automod_status(self, ctx):
         """Affiche le statut de l'automodération"""
-        config = self.config
+        config = await self.settings.get(ctx.guild.id)
 
         embed = discord.Embed(
             title="📊 Statut Automodération",
@@ -466,7 +517,12 @@ class AutoMod(commands.Cog):
 
         status = "🟢 Activé" if config['enabled'] else "🔴 Désactivé"
         embed.add_field(name="🤖 Système", value=status, inline=True)
-        embed.add_field(name="👥 Violations trackées", value=str(len(self.user_violations)), inline=True)
+        guild_violations = [
+            user_data for (guild_id, user_id), _ in self.user_violations.items()
+            if guild_id == ctx.guild.id
+            and (user_data := self.get_violations(config, guild_id, user_id)) is not None
+        ]
+        embed.add_field(name="👥 Violations trackées", value=str(len(guild_violations)), inline=True)
 
         # Filtres actifs
         active_filters = []
@@ -482,7 +538,7 @@ class AutoMod(commands.Cog):
 
         # Statistiques récentes
         recent_violations = 0
-        for user_data in self.user_violations.values():
+        for user_data in guild_violations:
             if (datetime.now() - user_data['last_violation']).days < 1:
                 recent_violations += 1
 
@@ -494,11 +550,12 @@ class AutoMod(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def toggle_automod(self, ctx):
         """Active/désactive l'automodération"""
-        self.config['enabled'] = not self.config['enabled']
-        self.save_config()
+        config = await self.settings.get(ctx.guild.id)
+        config['enabled'] = not config['enabled']
+        self.save_config(ctx.guild.id, config, 'enabled')
 
-        status = "activée" if self.config['enabled'] else "désactivée"
-        color = 0x2ecc71 if self.config['enabled'] else 0xe74c3c
+        status = "activée" if config['enabled'] else "désactivée"
+        color = 0x2ecc71 if config['enabled'] else 0xe74c3c
 
         embed = discord.Embed(
             title=f"🤖 Automodération {status.title()}",
@@ -530,9 +587,10 @@ class AutoMod(commands.Cog):
             for channel in ctx.guild.channels:
                 await channel.set_permissions(muted_role, send_messages=False, add_reactions=False)
 
-        # Mettre à jour la config
-        self.config['roles']['muted'] = muted_role.id
-        self.save_config()
+        # Mettre à jour la config du serveur
+        config = await self.settings.get(ctx.guild.id)
+        config['roles']['muted'] = muted_role.id
+        self.save_config(ctx.guild.id, config, 'roles')
 
         embed.add_field(
             name="✅ Rôle Muted",
@@ -553,8 +611,9 @@ class AutoMod(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def set_automod_logs(self, ctx, channel: discord.TextChannel):
         """Configure le canal de logs d'automodération"""
-        self.config['channels']['logs'] = channel.id
-        self.save_config()
+        config = await self.settings.get(ctx.guild.id)
+        config['channels']['logs'] = channel.id
+        self.save_config(ctx.guild.id, config, 'channels')
 
         embed = discord.Embed(
             title="📝 Canal de logs configuré",
@@ -567,6 +626,8 @@ class AutoMod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def manage_filters(self, ctx, filter_name: str = None, action: str = None):
         """Gère les filtres d'automodération"""
+        config = await self.settings.get(ctx.guild.id)
+        filters = config['filters']
         if not filter_name:
             # Afficher tous les filtres
             embed = discord.Embed(
@@ -574,9 +635,9 @@ class AutoMod(commands.Cog):
                 color=0x3498db
             )
 
-            for name, config in self.config['filters'].items():
-                status = "🟢 Activé" if config['enabled'] else "🔴 Désactivé"
-                action_text = config.get('action', 'N/A')
+            for name, filter_config in filters.items():
+                status = "🟢 Activé" if filter_config['enabled'] else "🔴 Désactivé"
+                action_text = filter_config.get('action', 'N/A')
                 embed.add_field(
                     name=f"{name.title()}",
                     value=f"Statut: {status}\nAction: {action_text}",
@@ -593,10 +654,10 @@ class AutoMod(commands.Cog):
             await ctx.send(embed=embed)
             return
 
-        if filter_name not in self.config['filters']:
+        if filter_name not in filters:
             embed = discord.Embed(
                 title="❌ Filtre invalide",
-                description=f"Filtres disponibles: {', '.join(self.config['filters'].keys())}",
+                description=f"Filtres disponibles: {', '.join(filters.keys())}",
                 color=0xe74c3c
             )
             await ctx.send(embed=embed)
@@ -604,10 +665,10 @@ class AutoMod(commands.Cog):
 
         if action == 'toggle':
             # Basculer l'état du filtre
-            self.config['filters'][filter_name]['enabled'] = not self.config['filters'][filter_name]['enabled']
-            self.save_config()
+            filters[filter_name]['enabled'] = not filters[filter_name]['enabled']
+            self.save_config(ctx.guild.id, config, 'filters')
 
-            status = "activé" if self.config['filters'][filter_name]['enabled'] else "désactivé"
+            status = "activé" if filters[filter_name]['enabled'] else "désactivé"
             embed = discord.Embed(
                 title="✅ Filtre mis à jour",
                 description=f"Le filtre **{filter_name}** a été **{status}**.",
@@ -628,8 +689,8 @@ class AutoMod(commands.Cog):
             # Changer l'action du filtre
             valid_actions = ['delete', 'warn', 'mute', 'kick', 'ban']
             if action in valid_actions:
-                self.config['filters'][filter_name]['action'] = action
-                self.save_config()
+                filters[filter_name]['action'] = action
+                self.save_config(ctx.guild.id, config, 'filters')
 
                 embed = discord.Embed(
                     title="✅ Action mise à jour",
@@ -649,9 +710,10 @@ class AutoMod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def view_violations(self, ctx, member: discord.Member):
         """Affiche les violations d'un utilisateur"""
-        user_id = member.id
+        config = await self.settings.get(ctx.guild.id)
+        user_data = self.get_violations(config, ctx.guild.id, member.id)
 
-        if user_id not in self.user_violations:
+        if user_data is None:
             embed = discord.Embed(
                 title="✅ Aucune violation",
                 description=f"{member.mention} n'a aucune violation enregistrée.",
@@ -660,8 +722,6 @@ class AutoMod(commands.Cog):
             await ctx.send(embed=embed)
             return
 
-        user_data = self.user_violations[user_id]
-
         embed = discord.Embed(
             title=f"📊 Violations de {member.display_name}",
             color=0xf39c12,
@@ -689,6 +749,7 @@ class AutoMod(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def manage_automod_whitelist(self, ctx, action: str, target: discord.Member = None, role: discord.Role = None):
         """Gère la whitelist d'automodération"""
+        config = await self.settings.get(ctx.guild.id)
         if action not in ['add', 'remove', 'list']:
             embed = discord.Embed(
                 title="❌ Action invalide",
@@ -706,7 +767,7 @@ class AutoMod(commands.Cog):
 
             # Utilisateurs
             users = []
-            for user_id in self.config['whitelist']['users']:
+            for user_id in config['whitelist']['users']:
                 user = ctx.guild.get_member(user_id)
                 if user:
                     users.append(user.mention)
@@ -719,7 +780,7 @@ class AutoMod(commands.Cog):
 
             # Rôles
             roles = []
-            for role_id in self.config['whitelist']['roles']:
+            for role_id in config['whitelist']['roles']:
                 role = ctx.guild.get_role(role_id)
                 if role:
                     roles.append(role.mention)
@@ -752,19 +813,19 @@ class AutoMod(commands.Cog):
             return
 
         if action == 'add':
-            if target_id not in self.config['whitelist'][whitelist_key]:
-                self.config['whitelist'][whitelist_key].append(target_id)
+            if target_id not in config['whitelist'][whitelist_key]:
+                config['whitelist'][whitelist_key].append(target_id)
                 message = f"✅ {target_mention} ajouté à la whitelist"
             else:
                 message = f"ℹ️ {target_mention} est déjà dans la whitelist"
         else:  # remove
-            if target_id in self.config['whitelist'][whitelist_key]:
-                self.config['whitelist'][whitelist_key].remove(target_id)
+            if target_id in config['whitelist'][whitelist_key]:
+                config['whitelist'][whitelist_key].remove(target_id)
                 message = f"✅ {target_mention} retiré de la whitelist"
             else:
                 message = f"ℹ️ {target_mention} n'est pas dans la whitelist"
 
-        self.save_config()
+        self.save_config(ctx.guild.id, config, 'whitelist')
 
         embed = discord.Embed(
             title="🛡️ Whitelist mise à jour",
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import logging
 import re
 from datetime import datetime
@@ -14,24 +13,20 @@ class Customization(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.guild_settings = {}
-        self.load_guild_settings()
-    
-    def load_guild_settings(self):
+
+    async def cog_load(self):
+        """Charge les paramètres des serveurs depuis la base de données"""
+        await self.load_guild_settings()
+
+    async def load_guild_settings(self):
         """Charge les paramètres des serveurs"""
-        try:
-            with open('guild_settings.json', 'r', encoding='utf-8') as f:
-                self.guild_settings = json.load(f)
-        except FileNotFoundError:
-            self.guild_settings = {}
-            logger.info("Fichier de paramètres des serveurs créé")
-    
-    def save_guild_settings(self):
-        """Sauvegarde les paramètres des serveurs"""
-        try:
-            with open('guild_settings.json', 'w', encoding='utf-8') as f:
-                json.dump(self.guild_settings, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur lors de la sauvegarde des paramètres: {e}")
+        self.guild_settings = await self.bot.db.load('guild_settings')
+
+    def save_guild_settings(self, guild_id):
+        """Programme la sauvegarde des paramètres d'un serveur (une ligne)"""
+        guild_id = str(guild_id)
+        if guild_id in self.guild_settings:
+            self.bot.db.put('guild_settings', guild_id, self.guild_settings[guild_id])
     
     def get_guild_settings(self, guild_id):
         """Récupère les paramètres d'un serveur"""
@@ -75,9 +70,8 @@ class Customization(commands.Cog):
         self.bot.config['embed_color'] = hex_color
         
         # Sauvegarde
-        self.save_guild_settings()
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        self.save_guild_settings(ctx.guild.id)
+        await self.bot.save_config()
         
         # Démonstration avec la nouvelle couleur
         embed = discord.Embed(
@@ -117,7 +111,7 @@ class Customization(commands.Cog):
         guild_settings['prefix'] = new_prefix
         
         # Sauvegarde
-        self.save_guild_settings()
+        self.save_guild_settings(ctx.guild.id)
         
         embed = discord.Embed(
             title="✅ Préfixe mis à jour",
@@ -159,7 +153,7 @@ class Customization(commands.Cog):
         guild_settings['language'] = lang
         
         # Sauvegarde
-        self.save_guild_settings()
+        self.save_guild_settings(ctx.guild.id)
         
         # Messages selon la langue
         if lang == 'fr':
@@ -194,7 +188,7 @@ class Customization(commands.Cog):
             guild_settings['timezone'] = timezone
             
             # Sauvegarde
-            self.save_guild_settings()
+            self.save_guild_settings(ctx.guild.id)
             
             # Affichage de l'heure actuelle dans le nouveau fuseau
             now = datetime.now(tz)
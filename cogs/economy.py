@@ -1,184 +1,464 @@
 import discord
 from discord.ext import commands, tasks
-import json
 import random
 import asyncio
 import logging
+import math
+import time
 from datetime import datetime, timedelta
 
+from utils.accounts import Account
+from utils.economy_jobs import DEFAULT_JOBS, JOBS, job_settings
+from utils.guild_state import GuildStateCache
+from utils.ledger import Ledger
+from utils.locks import StripedLock
+from utils.ranking import RankingIndex
+
 logger = logging.getLogger('discord_bot.economy')
 
+JOB_CHUNK = 16384  # Comptes par tranche de calcul : la boucle reprend la main entre deux tranches
+JOB_REASONS = {
+    'bank_interest': "Intérêts bancaires",
+    'wealth_tax': "Impôt sur la fortune",
+    'streak_expiry': "Série quotidienne expirée"
+}
+
 class Economy(commands.Cog):
     """Système d'économie complet avec monnaie virtuelle"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.config = self.load_config()
-        self.user_data = self.load_user_data()
-        self.shop_items = self.load_shop_items()
-        self.daily_reset.start()
+        self.config = {}
+        self.shop_items = {}
+        # Comptes par serveur (namespace economy_users:<guild_id>), chargés à la demande
+        self.user_data = GuildStateCache(
+            bot.db, 'economy_users',
+            idle_timeout=bot.config.get('persistence', {}).get('guild_idle_timeout', 1800),
+            legacy='economy_users', seed=self.seed_guild_members, on_evict=self.on_guild_evicted,
+            loader=self.load_accounts
+        )
+        self.rankings = {}  # {guild_id: RankingIndex} par fortune (liquide + banque), construit au premier !baltop
+        # Un verrou par compte (réparti sur des bandes) : vérification et débit sont atomiques
+        self.locks = StripedLock()
+        # Registre des transactions : les soldes en base en sont la vue matérialisée
+        persistence_config = bot.config.get('persistence', {})
+        self.ledger = Ledger(
+            'data/ledger',
+            interval=persistence_config.get('flush_interval', 5),
+            checkpoint_interval=persistence_config.get('ledger_checkpoint_interval', 300)
+        )
+
+    async def cog_load(self):
+        """Charge la configuration et la boutique en parallèle"""
+        self.config, self.shop_items, self.job_runs = await asyncio.gather(
+            self.load_config(), self.load_shop_items(), self.bot.storage.load('economy_jobs.json', {})
+        )
+        self.user_data.start()
+        await self.replay_ledger(await self.bot.storage.run(self.ledger.open))
+        self.ledger.start(self.bot.db.flush)
+        self.scheduled_jobs.start()
+
+    async def cog_unload(self):
+        self.scheduled_jobs.cancel()
+        await self.ledger.stop()
+        await self.ledger.checkpoint(self.bot.db.flush)
+        await self.user_data.stop()
+
+    async def save_to_persistent_data(self):
+        """Transactions sur disque et soldes en base, puis point de contrôle"""
+        await self.ledger.checkpoint(self.bot.db.flush)
+
+    async def replay_ledger(self, records):
+        """Réapplique les transactions postérieures au dernier point de contrôle (idempotent)"""
+        applied = 0
+        for record in records:
+            user_data = await self.open_account(record['guild'], record['user'])
+            if user_data.get('ledger_seq', 0) >= record['seq']:
+                continue
+            user_data['balance'] = record['balance']
+            user_data['ledger_seq'] = record['seq']
+            self.save_user_data(record['guild'], record['user'])
+            self.update_ranking(record['guild'], record['user'], user_data)
+            applied += 1
+        if records:
+            logger.info(f"📒 Registre: {len(records)} transaction(s) après le point de contrôle, {applied} réappliquée(s)")
+
+    async def cog_check(self, ctx):
+        """Les comptes sont propres à chaque serveur"""
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        return True
         
-    def load_config(self):
+    async def load_config(self):
         """Charge la configuration de l'économie"""
-        try:
-            with open('economy_config.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            default_config = {
-                "currency": {
-                    "name": "coins",
-                    "symbol": "🪙",
-                    "starting_amount": 100
-                },
-                "daily": {
-                    "enabled": True,
-                    "min_amount": 50,
-                    "max_amount": 200,
-                    "streak_bonus": 10
-                },
-                "work": {
-                    "enabled": True,
-                    "cooldown": 3600,  # 1 heure
-                    "min_amount": 20,
-                    "max_amount": 100,
-                    "jobs": [
-                        {"name": "Développeur", "min": 80, "max": 150},
-                        {"name": "Designer", "min": 60, "max": 120},
-                        {"name": "Streamer", "min": 40, "max": 200},
-                        {"name": "Gamer Pro", "min": 30, "max": 180},
-                        {"name": "Modérateur", "min": 50, "max": 100}
-                    ]
-                },
-                "gambling": {
-                    "enabled": True,
-                    "slots": {
-                        "min_bet": 10,
-                        "max_bet": 500,
-                        "jackpot_chance": 0.01
-                    },
-                    "coinflip": {
-                        "min_bet": 5,
-                        "max_bet": 1000
-                    }
-                },
-                "shop": {
-                    "enabled": True,
-                    "tax_rate": 0.05
+        config = await self.bot.storage.load('economy_config.json')
+        if config is not None:
+            return config
+
+        default_config = {
+            "currency": {
+                "name": "coins",
+                "symbol": "🪙",
+                "starting_amount": 100
+            },
+            "daily": {
+                "enabled": True,
+                "min_amount": 50,
+                "max_amount": 200,
+                "streak_bonus": 10
+            },
+            "work": {
+                "enabled": True,
+                "cooldown": 3600,  # 1 heure
+                "min_amount": 20,
+                "max_amount": 100,
+                "jobs": [
+                    {"name": "Développeur", "min": 80, "max": 150},
+                    {"name": "Designer", "min": 60, "max": 120},
+                    {"name": "Streamer", "min": 40, "max": 200},
+                    {"name": "Gamer Pro", "min": 30, "max": 180},
+                    {"name": "Modérateur", "min": 50, "max": 100}
+                ]
+            },
+            "gambling": {
+                "enabled": True,
+                "slots": {
+                    "min_bet": 10,
+                    "max_bet": 500,
+                    "jackpot_chance": 0.01
                 },
-                "trading": {
-                    "enabled": True,
-                    "tax_rate": 0.02
+                "coinflip": {
+                    "min_bet": 5,
+                    "max_bet": 1000
                 }
-            }
-            self.save_config(default_config)
-            return default_config
+            },
+            "shop": {
+                "enabled": True,
+                "tax_rate": 0.05
+            },
+            "trading": {
+                "enabled": True,
+                "tax_rate": 0.02
+            },
+            "jobs": DEFAULT_JOBS
+        }
+        self.save_config(default_config)
+        return default_config
     
-    def load_user_data(self):
-        """Charge les données des utilisateurs"""
-        try:
-            with open('economy_users.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-    
-    def load_shop_items(self):
+    async def load_shop_items(self):
         """Charge les objets de la boutique"""
-        try:
-            with open('shop_items.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            default_items = {
-                "roles": [
-                    {"id": "vip", "name": "VIP", "price": 5000, "description": "Rôle VIP exclusif", "role_id": None},
-                    {"id": "premium", "name": "Premium", "price": 10000, "description": "Rôle Premium avec avantages", "role_id": None}
-                ],
-                "items": [
-                    {"id": "boost", "name": "Boost XP", "price": 500, "description": "Double l'XP pendant 1 heure", "duration": 3600},
-                    {"id": "protection", "name": "Protection", "price": 1000, "description": "Protection contre les vols pendant 24h", "duration": 86400},
-                    {"id": "multiplier", "name": "Multiplicateur", "price": 2000, "description": "Multiplie les gains par 2 pendant 30 min", "duration": 1800}
-                ],
-                "cosmetics": [
-                    {"id": "badge1", "name": "Badge Doré", "price": 3000, "description": "Badge doré pour votre profil", "emoji": "🏆"},
-                    {"id": "badge2", "name": "Badge Diamant", "price": 8000, "description": "Badge diamant ultra rare", "emoji": "💎"}
-                ]
-            }
-            self.save_shop_items(default_items)
-            return default_items
+        items = await self.bot.storage.load('shop_items.json')
+        if items is not None:
+            return items
+
+        default_items = {
+            "roles": [
+                {"id": "vip", "name": "VIP", "price": 5000, "description": "Rôle VIP exclusif", "role_id": None},
+                {"id": "premium", "name": "Premium", "price": 10000, "description": "Rôle Premium avec avantages", "role_id": None}
+            ],
+            "items": [
+                {"id": "boost", "name": "Boost XP", "price": 500, "description": "Double l'XP pendant 1 heure", "duration": 3600},
+                {"id": "protection", "name": "Protection", "price": 1000, "description": "Protection contre les vols pendant 24h", "duration": 86400},
+                {"id": "multiplier", "name": "Multiplicateur", "price": 2000, "description": "Multiplie les gains par 2 pendant 30 min", "duration": 1800}
+            ],
+            "cosmetics": [
+                {"id": "badge1", "name": "Badge Doré", "price": 3000, "description": "Badge doré pour votre profil", "emoji": "🏆"},
+                {"id": "badge2", "name": "Badge Diamant", "price": 8000, "description": "Badge diamant ultra rare", "emoji": "💎"}
+            ]
+        }
+        self.save_shop_items(default_items)
+        return default_items
     
     def save_config(self, config=None):
         """Sauvegarde la configuration"""
         if config is None:
             config = self.config
-        try:
-            with open('economy_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde config économie: {e}")
+        self.bot.storage.save_soon('economy_config.json', config)
     
-    def save_user_data(self):
-        """Sauvegarde les données utilisateurs"""
-        try:
-            with open('economy_users.json', 'w', encoding='utf-8') as f:
-                json.dump(self.user_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde données utilisateurs: {e}")
+    def seed_guild_members(self, guild_id, legacy):
+        """Copie les anciens comptes globaux des membres de ce serveur"""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return {}
+        return {user_id: data for user_id, data in legacy.items() if guild.get_member(int(user_id))}
+
+    async def load_accounts(self, guild_id):
+        """Comptes d'un serveur en objets compacts ; les comptes jamais utilisés sont supprimés"""
+        namespace = self.user_data.namespace(guild_id)
+        records = await self.bot.db.load(namespace)
+        if not records:
+            records = await self.user_data.seed_from_legacy(guild_id)
+
+        starting_amount = self.config['currency']['starting_amount']
+        accounts = {}
+        for user_id, data in records.items():
+            account = data if isinstance(data, Account) else Account.from_record(data)
+            if account.is_pristine(starting_amount):
+                # Créé par une simple consultation (anciennes versions) : rien à conserver
+                self.bot.db.delete(namespace, user_id)
+                continue
+            accounts[user_id] = account
+        if len(accounts) < len(records):
+            logger.info(f"🧹 Économie {guild_id}: {len(records) - len(accounts)} compte(s) jamais utilisé(s) supprimé(s)")
+        return accounts
+
+    def save_user_data(self, guild_id, user_id):
+        """Programme la sauvegarde du compte d'un utilisateur (une ligne)"""
+        user_id = str(user_id)
+        records = self.user_data.peek(guild_id)
+        if records is not None and user_id in records:
+            self.user_data.put(guild_id, user_id, records[user_id])
     
     def save_shop_items(self, items=None):
         """Sauvegarde les objets de la boutique"""
         if items is None:
             items = self.shop_items
-        try:
-            with open('shop_items.json', 'w', encoding='utf-8') as f:
-                json.dump(items, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde boutique: {e}")
+        self.bot.storage.save_soon('shop_items.json', items)
     
-    def get_user_data(self, user_id):
-        """Récupère les données d'un utilisateur"""
+    async def get_user_data(self, guild_id, user_id):
+        """Compte d'un utilisateur en lecture : un compte par défaut non enregistré s'il n'existe pas"""
+        records = await self.user_data.get(guild_id)
+        account = records.get(str(user_id))
+        if account is None:
+            return Account(self.config['currency']['starting_amount'])
+        return account
+
+    async def open_account(self, guild_id, user_id):
+        """Compte d'un utilisateur qui va être modifié (créé et classé au premier mouvement)"""
         user_id = str(user_id)
-        if user_id not in self.user_data:
-            self.user_data[user_id] = {
-                "balance": self.config['currency']['starting_amount'],
-                "bank": 0,
-                "daily_streak": 0,
-                "last_daily": None,
-                "last_work": None,
-                "inventory": {},
-                "active_effects": {},
-                "stats": {
-                    "total_earned": 0,
-                    "total_spent": 0,
-                    "work_count": 0,
-                    "gamble_wins": 0,
-                    "gamble_losses": 0
-                }
-            }
-        return self.user_data[user_id]
+        records = await self.user_data.get(guild_id)
+        account = records.get(user_id)
+        if account is None:
+            account = records[user_id] = Account(self.config['currency']['starting_amount'])
+            self.update_ranking(guild_id, user_id, account)
+        return account
+
+    def on_guild_evicted(self, guild_id, records):
+        """Le classement d'un serveur inactif est reconstruit à son prochain !baltop"""
+        self.rankings.pop(guild_id, None)
+
+    async def get_ranking(self, guild_id):
+        """Classement par fortune d'un serveur (construit une fois, puis mis à jour à chaque transaction)"""
+        guild_id = int(guild_id)
+        records = await self.user_data.get(guild_id)
+        ranking = self.rankings.get(guild_id)
+        if ranking is None:
+            ranking = RankingIndex({
+                user_id: data['balance'] + data.get('bank', 0) for user_id, data in records.items()
+            })
+            self.rankings[guild_id] = ranking
+        return ranking
+
+    def update_ranking(self, guild_id, user_id, user_data):
+        """Déplace un compte dans le classement de son serveur (O(log n))"""
+        ranking = self.rankings.get(int(guild_id))
+        if ranking is not None:
+            ranking.update(user_id, user_data['balance'] + user_data.get('bank', 0))
     
-    def add_money(self, user_id, amount, reason=""):
+    def record_transaction(self, guild_id, user_id, user_data, kind, amount, reason):
+        """Inscrit un mouvement au registre et programme l'écriture du solde"""
+        user_data['ledger_seq'] = self.ledger.append(kind, guild_id, user_id, amount, user_data['balance'], reason)
+        self.save_user_data(guild_id, user_id)
+        self.update_ranking(guild_id, user_id, user_data)
+
+    async def add_money(self, guild_id, user_id, amount, reason="", kind='earn'):
         """Ajoute de l'argent à un utilisateur"""
-        user_data = self.get_user_data(user_id)
-        user_data['balance'] += amount
-        user_data['stats']['total_earned'] += amount
-        self.save_user_data()
-        logger.info(f"Ajouté {amount} coins à {user_id} - {reason}")
+        async with self.locks.lock((int(guild_id), int(user_id))):
+            user_data = await self.open_account(guild_id, user_id)
+            self.credit(guild_id, user_id, user_data, amount, reason, kind)
     
-    def remove_money(self, user_id, amount, reason=""):
-        """Retire de l'argent à un utilisateur"""
-        user_data = self.get_user_data(user_id)
-        if user_data['balance'] >= amount:
-            user_data['balance'] -= amount
-            user_data['stats']['total_spent'] += amount
-            self.save_user_data()
-            logger.info(f"Retiré {amount} coins à {user_id} - {reason}")
+    async def debit_if_sufficient(self, guild_id, user_id, amount, reason="", kind='spend'):
+        """Retire de l'argent si le solde suffit (vérification et débit atomiques), renvoie True si débité"""
+        async with self.locks.lock((int(guild_id), int(user_id))):
+            if (await self.get_user_data(guild_id, user_id))['balance'] < amount:
+                return False
+            user_data = await self.open_account(guild_id, user_id)
+            self.debit(guild_id, user_id, user_data, amount, reason, kind)
             return True
-        return False
-    
-    @tasks.loop(hours=24)
-    async def daily_reset(self):
-        """Reset quotidien des cooldowns"""
-        logger.info("Reset quotidien de l'économie")
+
+    async def remove_money(self, guild_id, user_id, amount, reason="", kind='spend'):
+        """Retire de l'argent à un utilisateur (False si le solde est insuffisant)"""
+        return await self.debit_if_sufficient(guild_id, user_id, amount, reason, kind)
+
+    async def transfer(self, guild_id, sender_id, receiver_id, amount, reason="", fee=0):
+        """Virement atomique entre deux comptes d'un serveur (le destinataire reçoit amount - fee)"""
+        if amount <= 0 or int(sender_id) == int(receiver_id):
+            return False
+        async with self.locks.lock((int(guild_id), int(sender_id)), (int(guild_id), int(receiver_id))):
+            if (await self.get_user_data(guild_id, sender_id))['balance'] < amount:
+                return False
+            sender = await self.open_account(guild_id, sender_id)
+            receiver = await self.open_account(guild_id, receiver_id)
+            self.debit(guild_id, sender_id, sender, amount, reason, 'transfer')
+            self.credit(guild_id, receiver_id, receiver, amount - fee, reason, 'transfer')
+            return True
+
+    async def claim_daily(self, guild_id, user_id, now):
+        """Récompense quotidienne : vérification, crédit et date sous le même verrou.
+
+        Renvoie (montant, bonus de série, série), ou None si elle a déjà été récupérée.
+        """
+        config = self.config['daily']
+        async with self.locks.lock((int(guild_id), int(user_id))):
+            user_data = await self.open_account(guild_id, user_id)
+            last_daily = datetime.fromisoformat(user_data['last_daily']) if user_data['last_daily'] else None
+            if last_daily and (now - last_daily).days < 1:
+                return None
+            
+            # Bonus de série
+            if last_daily and (now - last_daily).days == 1:
+                user_data['daily_streak'] += 1
+            else:
+                user_data['daily_streak'] = 1
+            
+            streak_bonus = user_data['daily_streak'] * config['streak_bonus']
+            total_amount = random.randint(config['min_amount'], config['max_amount']) + streak_bonus
+            user_data['last_daily'] = now.isoformat()
+            self.credit(guild_id, user_id, user_data, total_amount, "Récompense quotidienne", 'earn')
+            return total_amount, streak_bonus, user_data['daily_streak']
+
+    async def claim_work(self, guild_id, user_id, now):
+        """Travail : cooldown, salaire et date sous le même verrou.
+
+        Renvoie (métier, salaire, multiplicateur actif), ou None pendant le cooldown.
+        """
+        async with self.locks.lock((int(guild_id), int(user_id))):
+            user_data = await self.open_account(guild_id, user_id)
+            if user_data['last_work']:
+                last_work = datetime.fromisoformat(user_data['last_work'])
+                if (now - last_work).seconds < self.config['work']['cooldown']:
+                    return None
+            
+            # Choisir un travail aléatoire
+            job = random.choice(self.config['work']['jobs'])
+            amount = random.randint(job['min'], job['max'])
+            
+            # Appliquer les multiplicateurs actifs
+            multiplier_active = False
+            if 'multiplier' in user_data.get('active_effects'):
+                effect = user_data.get('active_effects')['multiplier']
+                if now < datetime.fromisoformat(effect['expires']):
+                    amount *= 2
+                    multiplier_active = True
+                else:
+                    del user_data['active_effects']['multiplier']
+            
+            user_data['last_work'] = now.isoformat()
+            user_data['work_count'] += 1
+            self.credit(guild_id, user_id, user_data, amount, f"Travail: {job['name']}", 'earn')
+            return job, amount, multiplier_active
+
+    def credit(self, guild_id, user_id, user_data, amount, reason, kind):
+        """Crédite un compte déjà verrouillé"""
+        user_data['balance'] += amount
+        user_data['total_earned'] += amount
+        self.record_transaction(guild_id, user_id, user_data, kind, amount, reason)
+        logger.debug(f"Ajouté {amount} coins à {user_id} - {reason}")
+
+    def debit(self, guild_id, user_id, user_data, amount, reason, kind):
+        """Débite un compte déjà verrouillé dont le solde a été vérifié"""
+        user_data['balance'] -= amount
+        user_data['total_spent'] += amount
+        self.record_transaction(guild_id, user_id, user_data, kind, -amount, reason)
+        logger.debug(f"Retiré {amount} coins à {user_id} - {reason}")
     
+    @tasks.loop(minutes=10)
+    async def scheduled_jobs(self):
+        """Exécute les tâches planifiées arrivées à échéance (intérêts, impôt, séries)"""
+        now = time.time()
+        for name, settings in job_settings(self.config).items():
+            if not settings['enabled']:
+                continue
+            # Première fois : la tâche est planifiée à partir de maintenant
+            last_run = self.job_runs.setdefault(name, now)
+            if now - last_run < settings['interval_hours'] * 3600:
+                continue
+            try:
+                await self.run_job(name, settings)
+            except Exception as e:
+                logger.error(f"❌ Erreur tâche planifiée {name}: {e}")
+            self.job_runs[name] = now
+        self.bot.storage.save_soon('economy_jobs.json', self.job_runs)
+
+    async def run_job(self, name, settings):
+        """Applique une tâche à tous les comptes de tous les serveurs, tranche par tranche"""
+        started = time.perf_counter()
+        job = JOBS[name]
+        now = datetime.now()
+        accounts = changed = 0
+        for namespace in await self.bot.db.namespaces(f"{self.user_data.name}:"):
+            guild_id = int(namespace.rsplit(':', 1)[1])
+            async for user_ids, page in self.job_pages(guild_id, namespace):
+                if not page:
+                    continue
+                # Calcul et application d'une tranche sans await : aucun débit ne s'intercale
+                field, indices, deltas = job(page, settings, now)
+                if indices and field != 'daily_streak':
+                    # Beaucoup de comptes bougent : le classement sera reconstruit au prochain !baltop
+                    self.rankings.pop(guild_id, None)
+                self.apply_job(name, namespace, guild_id, user_ids, page, field, indices, deltas)
+                accounts += len(page)
+                changed += len(indices)
+
+                # Une transaction par tranche : la sérialisation ne bloque jamais la boucle longtemps
+                if indices:
+                    await self.bot.db.flush()
+                else:
+                    await asyncio.sleep(0)
+
+        await self.ledger.commit()
+        logger.info(
+            f"⏱️ Tâche {name}: {changed:,} compte(s) modifié(s) sur {accounts:,} "
+            f"en {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return changed
+
+    async def job_pages(self, guild_id, namespace):
+        """Tranches (user_ids, comptes) d'un serveur pour une tâche planifiée.
+
+        Un serveur en mémoire est parcouru dans son cache ; les autres sont lus
+        en base page par page, sans être chargés dans le cache.
+        """
+        records = self.user_data.peek(guild_id)
+        if records is not None:
+            # Deux listes parallèles plutôt qu'un tuple par compte : rien à suivre pour le ramasse-miettes
+            user_ids, accounts = list(records), list(records.values())
+            for start in range(0, len(user_ids), JOB_CHUNK):
+                yield user_ids[start:start + JOB_CHUNK], accounts[start:start + JOB_CHUNK]
+            return
+
+        async for rows in self.bot.db.scan(namespace, JOB_CHUNK):
+            records = self.user_data.peek(guild_id)
+            if records is not None:
+                # Serveur chargé entre deux pages : ses comptes en mémoire font foi
+                rows = [(user_id, records[user_id]) for user_id, _ in rows if user_id in records]
+            yield [user_id for user_id, _ in rows], [account for _, account in rows]
+
+    def apply_job(self, name, namespace, guild_id, user_ids, page, field, indices, deltas):
+        """Applique le résultat d'une tranche : un seul lot d'écritures et un seul ajout au registre"""
+        updates = {}
+        for position, index in enumerate(indices):
+            account = page[index]
+            if not isinstance(account, Account):
+                # Ligne lue en base (serveur hors mémoire) : convertie seulement si elle change
+                account = page[index] = Account.from_record(account)
+            setattr(account, field, 0 if deltas is None else getattr(account, field) + deltas[position])
+            updates[user_ids[index]] = account
+
+        if field == 'balance' and indices:
+            entries = []
+            for position, index in enumerate(indices):
+                account, amount = page[index], deltas[position]
+                if amount < 0:
+                    account.total_spent -= amount
+                else:
+                    account.total_earned += amount
+                entries.append(('spend' if amount < 0 else 'earn', user_ids[index], amount, account.balance))
+            first_seq = self.ledger.append_many(guild_id, entries, JOB_REASONS[name])
+            for offset, index in enumerate(indices):
+                page[index].ledger_seq = first_seq + offset
+        self.bot.db.put_batch(namespace, updates)
+
     # Commandes d'économie
     @commands.command(name='balance', aliases=['bal', 'money'])
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -187,7 +467,7 @@ class Economy(commands.Cog):
         if member is None:
             member = ctx.author
         
-        user_data = self.get_user_data(member.id)
+        user_data = await self.get_user_data(ctx.guild.id, member.id)
         currency = self.config['currency']
         
         embed = discord.Embed(
@@ -211,14 +491,21 @@ class Economy(commands.Cog):
             value=f"{user_data['balance'] + user_data['bank']:,} {currency['name']}",
             inline=True
         )
+
+        ranking = await self.get_ranking(ctx.guild.id)
+        rank = ranking.rank(member.id)
+        embed.add_field(
+            name="🏆 Rang",
+            value=f"#{rank} sur {len(ranking):,}" if rank is not None else "Non classé (aucune transaction)",
+            inline=True
+        )
         
         # Statistiques
-        stats = user_data['stats']
         embed.add_field(
             name="📊 Statistiques",
-            value=f"Gagné: {stats['total_earned']:,}\n"
-                  f"Dépensé: {stats['total_spent']:,}\n"
-                  f"Travaux: {stats['work_count']}",
+            value=f"Gagné: {user_data['total_earned']:,}\n"
+                  f"Dépensé: {user_data['total_spent']:,}\n"
+                  f"Travaux: {user_data['work_count']}",
             inline=False
         )
         
@@ -237,46 +524,25 @@ class Economy(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        user_data = self.get_user_data(ctx.author.id)
         now = datetime.now()
+        claim = await self.claim_daily(ctx.guild.id, ctx.author.id, now)
         
-        # Vérifier si l'utilisateur a déjà récupéré sa récompense aujourd'hui
-        if user_data['last_daily']:
-            last_daily = datetime.fromisoformat(user_data['last_daily'])
-            if (now - last_daily).days < 1:
-                next_daily = last_daily + timedelta(days=1)
-                time_left = next_daily - now
-                hours, remainder = divmod(time_left.seconds, 3600)
-                minutes, _ = divmod(remainder, 60)
-                
-                embed = discord.Embed(
-                    title="⏰ Récompense déjà récupérée",
-                    description=f"Revenez dans {hours}h {minutes}m",
-                    color=0xf39c12
-                )
-                await ctx.send(embed=embed)
-                return
-        
-        # Calculer la récompense
-        config = self.config['daily']
-        base_amount = random.randint(config['min_amount'], config['max_amount'])
-        
-        # Bonus de série
-        if user_data['last_daily']:
-            last_daily = datetime.fromisoformat(user_data['last_daily'])
-            if (now - last_daily).days == 1:
-                user_data['daily_streak'] += 1
-            else:
-                user_data['daily_streak'] = 1
-        else:
-            user_data['daily_streak'] = 1
-        
-        streak_bonus = user_data['daily_streak'] * config['streak_bonus']
-        total_amount = base_amount + streak_bonus
+        # Récompense déjà récupérée aujourd'hui
+        if claim is None:
+            last_daily = datetime.fromisoformat((await self.get_user_data(ctx.guild.id, ctx.author.id))['last_daily'])
+            time_left = last_daily + timedelta(days=1) - now
+            hours, remainder = divmod(time_left.seconds, 3600)
+            minutes, _ = divmod(remainder, 60)
+            
+            embed = discord.Embed(
+                title="⏰ Récompense déjà récupérée",
+                description=f"Revenez dans {hours}h {minutes}m",
+                color=0xf39c12
+            )
+            await ctx.send(embed=embed)
+            return
         
-        # Donner la récompense
-        self.add_money(ctx.author.id, total_amount, "Récompense quotidienne")
-        user_data['last_daily'] = now.isoformat()
+        total_amount, streak_bonus, streak = claim
         
         embed = discord.Embed(
             title="🎁 Récompense quotidienne récupérée !",
@@ -292,7 +558,7 @@ class Economy(commands.Cog):
         )
         embed.add_field(
             name="🔥 Série",
-            value=f"{user_data['daily_streak']} jour(s)",
+            value=f"{streak} jour(s)",
             inline=True
         )
         
@@ -318,47 +584,25 @@ class Economy(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        user_data = self.get_user_data(ctx.author.id)
         now = datetime.now()
+        claim = await self.claim_work(ctx.guild.id, ctx.author.id, now)
         
-        # Vérifier le cooldown
-        if user_data['last_work']:
-            last_work = datetime.fromisoformat(user_data['last_work'])
-            cooldown = self.config['work']['cooldown']
-            if (now - last_work).seconds < cooldown:
-                time_left = cooldown - (now - last_work).seconds
-                hours, remainder = divmod(time_left, 3600)
-                minutes, _ = divmod(remainder, 60)
-                
-                embed = discord.Embed(
-                    title="⏰ Vous êtes fatigué",
-                    description=f"Reposez-vous encore {hours}h {minutes}m",
-                    color=0xf39c12
-                )
-                await ctx.send(embed=embed)
-                return
-        
-        # Choisir un travail aléatoire
-        jobs = self.config['work']['jobs']
-        job = random.choice(jobs)
-        amount = random.randint(job['min'], job['max'])
-        
-        # Appliquer les multiplicateurs actifs
-        if 'multiplier' in user_data['active_effects']:
-            effect = user_data['active_effects']['multiplier']
-            if datetime.now() < datetime.fromisoformat(effect['expires']):
-                amount *= 2
-                multiplier_active = True
-            else:
-                del user_data['active_effects']['multiplier']
-                multiplier_active = False
-        else:
-            multiplier_active = False
+        # Encore en cooldown
+        if claim is None:
+            last_work = datetime.fromisoformat((await self.get_user_data(ctx.guild.id, ctx.author.id))['last_work'])
+            time_left = self.config['work']['cooldown'] - (now - last_work).seconds
+            hours, remainder = divmod(time_left, 3600)
+            minutes, _ = divmod(remainder, 60)
+            
+            embed = discord.Embed(
+                title="⏰ Vous êtes fatigué",
+                description=f"Reposez-vous encore {hours}h {minutes}m",
+                color=0xf39c12
+            )
+            await ctx.send(embed=embed)
+            return
         
-        # Donner la récompense
-        self.add_money(ctx.author.id, amount, f"Travail: {job['name']}")
-        user_data['last_work'] = now.isoformat()
-        user_data['stats']['work_count'] += 1
+        job, amount, multiplier_active = claim
         
         embed = discord.Embed(
             title="💼 Travail terminé !",
@@ -421,9 +665,8 @@ class Economy(commands.Cog):
             await ctx.send(embed=embed)
             return
 
-        # Vérifier le solde
-        user_data = self.get_user_data(ctx.author.id)
-        if user_data['balance'] < bet:
+        # Retirer la mise (vérification du solde comprise)
+        if not await self.debit_if_sufficient(ctx.guild.id, ctx.author.id, bet, "Mise aux machines à sous", kind='bet'):
             embed = discord.Embed(
                 title="❌ Solde insuffisant",
                 description=f"Vous avez besoin de {bet:,} {currency['name']}",
@@ -431,9 +674,7 @@ class Economy(commands.Cog):
             )
             await ctx.send(embed=embed)
             return
-
-        # Retirer la mise
-        self.remove_money(ctx.author.id, bet, "Mise aux machines à sous")
+        user_data = await self.open_account(ctx.guild.id, ctx.author.id)
 
         # Symboles des machines à sous
         symbols = ['🍒', '🍋', '🍊', '🍇', '⭐', '💎', '7️⃣']
@@ -471,10 +712,11 @@ class Economy(commands.Cog):
 
         # Donner les gains
         if winnings > 0:
-            self.add_money(ctx.author.id, winnings, "Gains machines à sous")
-            user_data['stats']['gamble_wins'] += 1
+            await self.add_money(ctx.guild.id, ctx.author.id, winnings, "Gains machines à sous", kind='payout')
+            user_data['gamble_wins'] += 1
         else:
-            user_data['stats']['gamble_losses'] += 1
+            user_data['gamble_losses'] += 1
+        self.save_user_data(ctx.guild.id, ctx.author.id)
 
         # Créer l'embed
         embed = discord.Embed(
@@ -564,18 +806,15 @@ class Economy(commands.Cog):
             await ctx.send(embed=embed)
             return
 
-        # Vérifier le solde
-        user_data = self.get_user_data(ctx.author.id)
-        if user_data['balance'] < bet:
+        # Retirer la mise (vérification du solde comprise)
+        if not await self.debit_if_sufficient(ctx.guild.id, ctx.author.id, bet, "Mise pile ou face", kind='bet'):
             embed = discord.Embed(
                 title="❌ Solde insuffisant",
                 color=0xe74c3c
             )
             await ctx.send(embed=embed)
             return
-
-        # Retirer la mise
-        self.remove_money(ctx.author.id, bet, "Mise pile ou face")
+        user_data = await self.open_account(ctx.guild.id, ctx.author.id)
 
         # Lancer la pièce
         result = random.choice(['pile', 'face'])
@@ -584,11 +823,12 @@ class Economy(commands.Cog):
         # Calculer les gains
         if won:
             winnings = bet * 2
-            self.add_money(ctx.author.id, winnings, "Gains pile ou face")
-            user_data['stats']['gamble_wins'] += 1
+            await self.add_money(ctx.guild.id, ctx.author.id, winnings, "Gains pile ou face", kind='payout')
+            user_data['gamble_wins'] += 1
         else:
             winnings = 0
-            user_data['stats']['gamble_losses'] += 1
+            user_data['gamble_losses'] += 1
+        self.save_user_data(ctx.guild.id, ctx.author.id)
 
         # Créer l'embed
         embed = discord.Embed(
@@ -631,5 +871,91 @@ class Economy(commands.Cog):
 
         await ctx.send(embed=embed)
 
+    @commands.command(name='baltop', aliases=['richest'])
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    async def baltop(self, ctx, page: int = 1):
+        """Classement des membres les plus riches du serveur (liquide + banque)"""
+        page = max(page, 1)
+        per_page = 10
+        start_idx = (page - 1) * per_page
+        ranking = await self.get_ranking(ctx.guild.id)
+        page_users = ranking.page(start_idx, per_page)
+        currency = self.config['currency']
+
+        if not page_users:
+            embed = discord.Embed(
+                title="❌ Page vide",
+                description="Cette page du classement est vide.",
+                color=0xe74c3c
+            )
+            await ctx.send(embed=embed)
+            return
+
+        names = await self.bot.member_names.resolve(ctx.guild, [int(user_id) for user_id, _ in page_users])
+        lines = []
+        for i, (user_id, wealth) in enumerate(page_users, start=start_idx + 1):
+            medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else "🏅"
+            name = names.get(int(user_id), f"<@{user_id}>")
+            lines.append(f"{medal} **#{i}** {name} • {wealth:,} {currency['name']} {currency['symbol']}")
+
+        embed = discord.Embed(
+            title="💰 Classement des Fortunes",
+            description=f"Page {page} • Top {start_idx + 1}-{start_idx + len(page_users)}\n\n" + "\n".join(lines),
+            color=0xf1c40f
+        )
+        footer = f"Page {page}/{math.ceil(len(ranking) / per_page)} • {len(ranking)} comptes"
+        own_rank = ranking.rank(ctx.author.id)
+        if own_rank is not None:
+            footer += f" • Votre rang: #{own_rank}"
+        embed.set_footer(text=footer)
+        await ctx.send(embed=embed)
+
+    @commands.command(name='pay', aliases=['give'])
+    @commands.cooldown(1, 3, commands.BucketType.user)
+    async def pay(self, ctx, member: discord.Member, amount: int):
+        """Donne de l'argent à un autre membre (taxe de transfert déduite)"""
+        trading = self.config.get('trading', {})
+        currency = self.config['currency']
+        if not trading.get('enabled', True):
+            embed = discord.Embed(
+                title="❌ Transferts désactivés",
+                color=0xe74c3c
+            )
+            await ctx.send(embed=embed)
+            return
+
+        if amount <= 0 or member.bot or member.id == ctx.author.id:
+            embed = discord.Embed(
+                title="❌ Transfert invalide",
+                description="Le montant doit être positif et le destinataire un autre membre.",
+                color=0xe74c3c
+            )
+            await ctx.send(embed=embed)
+            return
+
+        fee = int(amount * trading.get('tax_rate', 0))
+        if not await self.transfer(ctx.guild.id, ctx.author.id, member.id, amount,
+                                   f"Transfert {ctx.author.id} → {member.id}", fee=fee):
+            embed = discord.Embed(
+                title="❌ Solde insuffisant",
+                description=f"Vous avez besoin de {amount:,} {currency['name']}",
+                color=0xe74c3c
+            )
+            await ctx.send(embed=embed)
+            return
+
+        embed = discord.Embed(
+            title="💸 Transfert effectué",
+            description=f"{ctx.author.mention} → {member.mention}",
+            color=0x2ecc71,
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="💰 Reçu", value=f"{amount - fee:,} {currency['name']} {currency['symbol']}", inline=True)
+        if fee:
+            embed.add_field(name="🏛️ Taxe", value=f"{fee:,} {currency['name']}", inline=True)
+        user_data = await self.get_user_data(ctx.guild.id, ctx.author.id)
+        embed.add_field(name="💳 Nouveau solde", value=f"{user_data['balance']:,} {currency['name']}", inline=False)
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Economy(bot))
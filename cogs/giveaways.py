@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands, tasks
-import json
 import random
 import asyncio
 import logging
@@ -28,41 +27,28 @@ class Giveaways(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.active_giveaways = self.load_giveaways()
-        self.events = self.load_events()
+        self.active_giveaways = {}
+        self.events = {}
+
+    async def cog_load(self):
+        """Charge les giveaways et événements puis démarre la vérification"""
+        self.active_giveaways = await self.bot.db.load('giveaways')
+        self.events = await self.bot.db.load('events')
         self.check_giveaways.start()
-        
-    def load_giveaways(self):
-        """Charge les giveaways actifs"""
-        try:
-            with open('giveaways.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-    
-    def load_events(self):
-        """Charge les événements programmés"""
-        try:
-            with open('events.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-    
-    def save_giveaways(self):
-        """Sauvegarde les giveaways"""
-        try:
-            with open('giveaways.json', 'w', encoding='utf-8') as f:
-                json.dump(self.active_giveaways, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde giveaways: {e}")
-    
-    def save_events(self):
-        """Sauvegarde les événements"""
-        try:
-            with open('events.json', 'w', encoding='utf-8') as f:
-                json.dump(self.events, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde événements: {e}")
+
+    def save_giveaway(self, giveaway_id):
+        """Programme la sauvegarde d'un giveaway (ou sa suppression s'il n'est plus actif)"""
+        if giveaway_id in self.active_giveaways:
+            self.bot.db.put('giveaways', giveaway_id, self.active_giveaways[giveaway_id])
+        else:
+            self.bot.db.delete('giveaways', giveaway_id)
+
+    def save_event(self, event_id):
+        """Programme la sauvegarde d'un événement"""
+        if event_id in self.events:
+            self.bot.db.put('events', event_id, self.events[event_id])
+        else:
+            self.bot.db.delete('events', event_id)
     
     def parse_duration(self, duration_str):
         """Parse une durée (ex: 1h30m, 2d, 30s)"""
@@ -169,7 +155,7 @@ class Giveaways(commands.Cog):
             
             # Supprimer le giveaway des actifs
             del self.active_giveaways[giveaway_id]
-            self.save_giveaways()
+            self.save_giveaway(giveaway_id)
             
         except Exception as e:
             logger.error(f"Erreur fin giveaway {giveaway_id}: {e}")
@@ -226,7 +212,7 @@ class Giveaways(commands.Cog):
                     break
             
             await interaction.edit_original_response(embed=embed)
-            self.save_giveaways()
+            self.save_giveaway(giveaway_id)
     
     @commands.command(name='giveaway', aliases=['gstart'])
     @commands.has_permissions(manage_guild=True)
@@ -285,7 +271,7 @@ class Giveaways(commands.Cog):
             'participants': [],
             'requirements': {}
         }
-        self.save_giveaways()
+        self.save_giveaway(giveaway_id)
         
         # Supprimer le message de commande
         try:
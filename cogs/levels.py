@@ -1,10 +1,27 @@
+import asyncio
 import discord
-from discord.ext import commands
-import json
+from discord.ext import commands, tasks
+import io
 import logging
 import math
+import os
 import random
-from datetime import datetime, timedelta
+import re
+import shutil
+import tempfile
+import time
+
+import aiohttp
+from typing import Literal, Optional
+
+from utils.expiring import ExpiringMap
+from utils.guild_state import GuildStateCache
+from utils.ranking import RankingIndex
+from utils.role_sync import RoleSyncQueue
+from utils.xp_transfer import (
+    GLOBAL_XP, RowReader, XPImportError, detect_format, export_snapshot, validate_file
+)
+from utils.xpstore import MAX_MESSAGES, MAX_XP, XPStore, XPStoreError
 
 logger = logging.getLogger('discord_bot.levels')
 
@@ -13,26 +30,201 @@ class Levels(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.xp_data = {}
-        self.last_message = {}  # Pour éviter le spam XP
-        self.load_xp_data()
-    
-    def load_xp_data(self):
-        """Charge les données XP depuis le fichier"""
+        self.last_message = ExpiringMap(60, name='levels.last_message')  # Anti-spam XP : 1 minute par membre
+        # XP par serveur (namespace levels:<guild_id>), chargée au premier message du serveur.
+        # En mémoire : un XPStore compact par serveur, rechargé depuis son instantané data/xp/<guild_id>.xpa
+        self.xp_data = GuildStateCache(
+            bot.db, 'levels',
+            idle_timeout=bot.config.get('persistence', {}).get('guild_idle_timeout', 1800),
+            legacy='levels', seed=self.seed_guild_members,
+            on_evict=self.on_guild_evicted, loader=self.load_guild_xp
+        )
+        self.rankings = {}  # {guild_id: RankingIndex}, construit au premier !rank / !leaderboard
+        # Pages de !leaderboard déjà formatées : {(guild_id, page): (entrées, texte)}
+        self.leaderboard_pages = ExpiringMap(600, resolution=10, name='levels.leaderboard_pages')
+
+        # XP gagnée pas encore appliquée : {(guild_id, user_id): [xp, messages, auteur, salon]}
+        levels_config = bot.config.get('levels', {})
+        self.pending_xp = {}
+        self.xp_batch_size = levels_config.get('xp_batch_size', 500)
+        self.xp_flush_interval = levels_config.get('xp_flush_interval', 2)
+        self.early_flush = None  # Lot appliqué avant l'intervalle quand xp_batch_size est atteint
+        self.snapshot_dir = levels_config.get('snapshot_dir', 'data/xp')
+        self.snapshot_every = levels_config.get('snapshot_every', 10000)
+
+        # XP vocale : sessions des membres actifs en vocal {(guild_id, user_id): [depuis, membre, salon]},
+        # créditées toutes les voice_tick_interval secondes
+        self.voice_sessions = {}
+        self.pending_voice = {}  # {(guild_id, user_id): [secondes, sessions]} pas encore sauvegardés
+        self.voice_xp_per_minute = levels_config.get('voice_xp_per_minute', 10)
+        self.voice_tick_interval = levels_config.get('voice_tick_interval', 60)
+        # Temps passé en vocal par serveur (namespace voice:<guild_id>)
+        self.voice_time = GuildStateCache(
+            bot.db, 'voice', idle_timeout=bot.config.get('persistence', {}).get('guild_idle_timeout', 1800)
+        )
+
+        # Rôles de récompense par serveur (namespace level_rewards:<guild_id>, {niveau: role_id}),
+        # appliqués par une file qui regroupe les modifications de chaque membre
+        self.reward_roles = GuildStateCache(
+            bot.db, 'level_rewards', idle_timeout=bot.config.get('persistence', {}).get('guild_idle_timeout', 1800)
+        )
+        self.role_sync = RoleSyncQueue(
+            rate_per_guild=levels_config.get('role_edits_per_second', 2), reason="Récompenses de niveau"
+        )
+        self.download_session = None  # Session HTTP des imports, créée au premier !xpimport
+
+    async def cog_load(self):
+        """Démarre l'application de l'XP par lots, l'XP vocale et l'éviction des serveurs inactifs"""
+        self.xp_data.start()
+        self.voice_time.start()
+        self.reward_roles.start()
+        self.role_sync.start()
+        self.xp_flusher.change_interval(seconds=self.xp_flush_interval)
+        self.xp_flusher.start()
+        self.voice_tick.change_interval(seconds=self.voice_tick_interval)
+        self.voice_tick.start()
+        if self.bot.is_ready():
+            self.scan_voice_channels()
+
+    async def cog_unload(self):
+        self.xp_flusher.cancel()
+        self.voice_tick.cancel()
+        if self.early_flush is not None:
+            # Le lot a déjà été retiré de pending_xp : le laisser s'appliquer
+            await self.early_flush
+            self.early_flush = None
+        # XP vocale et messages en attente, puis instantanés : rien n'est perdu au rechargement ni à l'arrêt
+        await self.save_to_persistent_data()
+        await self.xp_data.stop()
+        await self.voice_time.stop()
+        await self.reward_roles.stop()
+        await self.role_sync.stop()
+        if self.download_session is not None:
+            await self.download_session.close()
+
+    async def cog_check(self, ctx):
+        """Les niveaux sont propres à chaque serveur"""
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        return True
+
+    async def cog_before_invoke(self, ctx):
+        """Les commandes voient l'XP à jour, y compris les gains pas encore appliqués"""
+        await self.flush_xp()
+
+    def seed_guild_members(self, guild_id, legacy):
+        """Copie l'ancienne XP globale des membres de ce serveur"""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return {}
+        return {user_id: data for user_id, data in legacy.items() if guild.get_member(int(user_id))}
+
+    def snapshot_path(self, guild_id):
+        return os.path.join(self.snapshot_dir, f"{guild_id}.xpa")
+
+    async def load_guild_xp(self, guild_id):
+        """Charge l'XP d'un serveur : instantané projeté en mémoire + lignes modifiées depuis.
+
+        La base reste la référence ; sans instantané (ou s'il est illisible),
+        le namespace complet est relu et un nouvel instantané est écrit.
+        """
+        namespace = self.xp_data.namespace(guild_id)
         try:
-            with open('xp_data.json', 'r', encoding='utf-8') as f:
-                self.xp_data = json.load(f)
+            store = await self.bot.storage.run(XPStore.open, self.snapshot_path(guild_id))
         except FileNotFoundError:
-            self.xp_data = {}
-            logger.info("Fichier XP créé")
-    
-    def save_xp_data(self):
-        """Sauvegarde les données XP"""
-        try:
-            with open('xp_data.json', 'w', encoding='utf-8') as f:
-                json.dump(self.xp_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur lors de la sauvegarde XP: {e}")
+            store = None
+        except (OSError, XPStoreError) as e:
+            logger.warning(f"⚠️ Instantané XP du serveur {guild_id} ignoré: {e}")
+            store = None
+
+        if store is not None:
+            for user_id, data in (await self.bot.db.load_since(namespace, store.snapshot_time)).items():
+                store.set(user_id, data.get('xp', 0), data.get('messages', 0))
+            return store
+
+        records = await self.bot.db.load(namespace)
+        if not records and guild_id == GLOBAL_XP:
+            records = await self.aggregate_global_xp()
+        elif not records:
+            # L'ancienne XP globale est comptée une seule fois dans le total (aggregate_global_xp),
+            # la copie vers un serveur n'y ajoute rien
+            records = await self.xp_data.seed_from_legacy(guild_id)
+        store = XPStore.from_records(records)
+        if len(store):
+            await self.save_snapshot(guild_id, store)
+        return store
+
+    async def aggregate_global_xp(self):
+        """Construit le total global une seule fois.
+
+        Total = ancienne XP globale (namespace `levels`, comptée une fois) +
+        XP gagnée sur chaque serveur. Un membre copié depuis l'ancienne XP
+        vers N serveurs ne compte que ce qu'il a gagné sur chacun depuis.
+        """
+        legacy = await self.bot.db.load(self.xp_data.legacy)
+        totals = {user_id: [data.get('xp', 0), data.get('messages', 0)] for user_id, data in legacy.items()}
+        global_namespace = self.xp_data.namespace(GLOBAL_XP)
+        for namespace in await self.bot.db.namespaces(self.xp_data.namespace('')):
+            if namespace == global_namespace:
+                continue
+            seeded = await self.bot.db.get('meta', f"seeded:{namespace}")
+            for user_id, data in (await self.bot.db.load(namespace)).items():
+                base = legacy.get(user_id, {}) if seeded else {}
+                total = totals.setdefault(user_id, [0, 0])
+                total[0] += max(0, data.get('xp', 0) - base.get('xp', 0))
+                total[1] += max(0, data.get('messages', 0) - base.get('messages', 0))
+
+        records = {user_id: self.make_record(xp, messages) for user_id, (xp, messages) in totals.items()}
+        if records:
+            await self.bot.db.put_many(global_namespace, records)
+            logger.info(f"🌍 Classement global construit: {len(records)} membre(s)")
+        return records
+
+    def encode_snapshot(self, store):
+        return store.serialize(time.time())
+
+    async def save_snapshot(self, guild_id, store):
+        """Écrit l'instantané d'un serveur (sérialisé sur la boucle, écrit sur le thread d'E/S)"""
+        store.changes = 0
+        await self.bot.storage.save(self.snapshot_path(guild_id), store, encoder=self.encode_snapshot)
+
+    def save_snapshot_soon(self, guild_id, store):
+        store.changes = 0
+        self.bot.storage.save_soon(self.snapshot_path(guild_id), store, encoder=self.encode_snapshot)
+
+    def on_guild_evicted(self, guild_id, store):
+        """Serveur retiré de la mémoire : instantané à jour et libération de son classement"""
+        if store.changes:
+            self.save_snapshot_soon(guild_id, store)
+        self.rankings.pop(guild_id, None)
+
+    def make_record(self, xp, messages):
+        """Enregistrement XP (format des lignes de la base et des affichages)"""
+        return {'xp': xp, 'level': self.get_level_from_xp(xp), 'messages': messages}
+
+    def save_xp_data(self, guild_id, user_id):
+        """Programme la sauvegarde des données XP d'un utilisateur (une ligne)"""
+        store = self.xp_data.peek(guild_id)
+        entry = store.get(user_id) if store is not None else None
+        if entry is not None:
+            self.xp_data.put(guild_id, user_id, self.make_record(*entry))
+            self.update_ranking(guild_id, user_id, entry[0])
+
+    async def get_ranking(self, guild_id):
+        """Index de classement d'un serveur (construit une fois, puis mis à jour à chaque gain)"""
+        guild_id = int(guild_id)
+        store = await self.xp_data.get(guild_id)
+        ranking = self.rankings.get(guild_id)
+        if ranking is None:
+            ranking = RankingIndex({user_id: xp for user_id, xp, _ in store.items()})
+            self.rankings[guild_id] = ranking
+        return ranking
+
+    def update_ranking(self, guild_id, user_id, xp):
+        """Déplace un membre dans le classement de son serveur (O(log n))"""
+        ranking = self.rankings.get(int(guild_id))
+        if ranking is not None:
+            ranking.update(user_id, xp)
     
     def get_level_from_xp(self, xp):
         """Calcule le niveau basé sur l'XP"""
@@ -42,83 +234,241 @@ class Levels(commands.Cog):
         """Calcule l'XP nécessaire pour un niveau"""
         return level * level * 100
     
-    def get_user_data(self, user_id):
-        """Récupère les données d'un utilisateur"""
-        user_id = str(user_id)
-        if user_id not in self.xp_data:
-            self.xp_data[user_id] = {
-                'xp': 0,
-                'level': 0,
-                'messages': 0
-            }
-        return self.xp_data[user_id]
+    async def get_user_data(self, guild_id, user_id):
+        """Récupère les données d'un utilisateur sur un serveur (copie pour affichage)"""
+        store = await self.xp_data.get(guild_id)
+        return self.make_record(*(store.get(user_id) or (0, 0)))
     
     @commands.Cog.listener()
     async def on_message(self, message):
-        """Donne de l'XP pour chaque message"""
+        """Donne de l'XP pour chaque message (accumulée, appliquée par lots)"""
         if message.author.bot:
             return
         
         if message.guild is None:
             return
         
-        user_id = str(message.author.id)
-        now = datetime.now()
-        
-        # Vérification anti-spam (1 minute entre les gains XP)
-        if user_id in self.last_message:
-            if now - self.last_message[user_id] < timedelta(minutes=1):
-                return
-        
-        self.last_message[user_id] = now
+        key = (message.guild.id, str(message.author.id))
         
-        # Récupération des données utilisateur
-        user_data = self.get_user_data(message.author.id)
-        old_level = user_data['level']
+        # Vérification anti-spam (1 minute entre les gains XP), l'entrée expire d'elle-même
+        if not self.last_message.check_and_set(key):
+            return
         
         # Gain d'XP aléatoire (15-25 XP par message)
-        xp_gain = random.randint(15, 25)
-        user_data['xp'] += xp_gain
-        user_data['messages'] += 1
-        
-        # Calcul du nouveau niveau
-        new_level = self.get_level_from_xp(user_data['xp'])
-        user_data['level'] = new_level
+        self.queue_xp(key, random.randint(15, 25), 1, message.author, message.channel)
+
+    def queue_xp(self, key, xp_gain, messages, author, channel):
+        """Ajoute un gain au compteur en attente (appliqué par le prochain lot)"""
+        pending = self.pending_xp.get(key)
+        if pending is None:
+            self.pending_xp[key] = [xp_gain, messages, author, channel]
+            if len(self.pending_xp) >= self.xp_batch_size and (self.early_flush is None or self.early_flush.done()):
+                self.early_flush = asyncio.get_running_loop().create_task(self.xp_flusher())
+        else:
+            pending[0] += xp_gain
+            pending[1] += messages
+            pending[2], pending[3] = author, channel
+
+    def voice_eligible(self, member, channel):
+        """Un membre gagne de l'XP vocale s'il écoute et parle avec au moins une autre personne"""
+        voice = member.voice
+        if member.bot or voice is None or voice.channel != channel:
+            return False
+        if voice.self_mute or voice.self_deaf or channel == member.guild.afk_channel:
+            return False
+        # Un membre encore listé dans le salon peut déjà avoir quitté le vocal (voice à None)
+        listeners = [
+            other for other in channel.members
+            if not other.bot and other.voice is not None and not other.voice.self_deaf
+        ]
+        return len(listeners) >= 2
+
+    def refresh_voice_channel(self, channel):
+        """Ouvre ou ferme les sessions des membres d'un salon (coût : taille du salon)"""
+        now = time.monotonic()
+        for member in channel.members:
+            key = (member.guild.id, str(member.id))
+            session = self.voice_sessions.get(key)
+            if self.voice_eligible(member, channel):
+                if session is None:
+                    self.voice_sessions[key] = [now, member, channel]
+                    self.pending_voice.setdefault(key, [0.0, 0])[1] += 1
+            elif session is not None:
+                self.end_voice_session(key, now)
+
+    def end_voice_session(self, key, now=None):
+        session = self.voice_sessions.pop(key, None)
+        if session is not None:
+            self.credit_voice(key, session, time.monotonic() if now is None else now)
+
+    def scan_voice_channels(self):
+        """Reprend les sessions des membres déjà en vocal (démarrage, rechargement du cog)"""
+        for guild in self.bot.guilds:
+            for channel in guild.voice_channels + guild.stage_channels:
+                self.refresh_voice_channel(channel)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.scan_voice_channels()
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """Met à jour les sessions des salons concernés, l'XP est créditée par voice_tick"""
+        if member.bot:
+            return
+
+        channels = [after.channel]
+        if after.channel != before.channel:
+            self.end_voice_session((member.guild.id, str(member.id)))
+            channels.append(before.channel)
+        for channel in channels:
+            if channel is not None:
+                self.refresh_voice_channel(channel)
+
+    def credit_voice(self, key, session, now):
+        """Crédite le temps écoulé depuis le dernier passage : XP en attente et temps vocal"""
+        elapsed = now - session[0]
+        session[0] = now
+        xp_gain = round(elapsed * self.voice_xp_per_minute / 60)
+        if xp_gain > 0:
+            self.queue_xp(key, xp_gain, 0, session[1], session[2])
+        self.pending_voice.setdefault(key, [0.0, 0])[0] += elapsed
+
+    @tasks.loop(seconds=60)
+    async def voice_tick(self):
+        """Crédite l'XP vocale de toutes les sessions actives en un seul passage"""
+        try:
+            await self.award_voice_xp()
+        except Exception as e:
+            logger.error(f"Erreur XP vocale: {e}")
+
+    async def award_voice_xp(self):
+        now = time.monotonic()
+        for key, session in self.voice_sessions.items():
+            self.credit_voice(key, session, now)
+
+        # Sauvegarde des totaux (une ligne par membre actif depuis le dernier passage)
+        pending, self.pending_voice = self.pending_voice, {}
+        for (guild_id, user_id), (seconds, sessions) in pending.items():
+            records = await self.voice_time.get(guild_id)
+            record = records.setdefault(user_id, {'seconds': 0, 'sessions': 0})
+            record['seconds'] += round(seconds)
+            record['sessions'] += sessions
+            self.voice_time.put(guild_id, user_id, record)
+        return len(pending)
+
+    @tasks.loop(seconds=2)
+    async def xp_flusher(self):
+        """Applique régulièrement l'XP accumulée"""
+        try:
+            await self.flush_xp()
+        except Exception as e:
+            logger.error(f"Erreur application de l'XP: {e}")
+
+        # Instantané des serveurs très actifs : le prochain chargement relira peu de lignes
+        for guild_id in self.xp_data.loaded():
+            store = self.xp_data.peek(guild_id)
+            if store is not None and store.changes >= self.snapshot_every:
+                self.save_snapshot_soon(guild_id, store)
+
+    async def flush_xp(self):
+        """Applique l'XP accumulée : une écriture et une détection de level up par membre"""
+        if not self.pending_xp:
+            return 0
+
+        pending, self.pending_xp = self.pending_xp, {}
+        level_ups = []
+        for (guild_id, user_id), (xp_gain, messages, author, channel) in pending.items():
+            store = await self.xp_data.get(guild_id)
+            global_store = await self.xp_data.get(GLOBAL_XP)
+            old_xp, _ = store.get(user_id) or (0, 0)
+            new_xp = store.add(user_id, xp_gain, messages)
+            global_store.add(user_id, xp_gain, messages)
+
+            # Sauvegarde des enregistrements de l'utilisateur (regroupée par le flusher de la base)
+            self.save_xp_data(guild_id, user_id)
+            self.save_xp_data(GLOBAL_XP, user_id)
+
+            if self.get_level_from_xp(new_xp) > self.get_level_from_xp(old_xp):
+                level_ups.append((guild_id, author, channel, self.make_record(*store.get(user_id))))
+
+        for guild_id, author, channel, user_data in level_ups:
+            await self.announce_level_up(author, channel, user_data)
+            await self.sync_member_rewards(guild_id, author, user_data['level'])
+
+        return len(pending)
+
+    async def announce_level_up(self, member, channel, user_data):
+        """Annonce un passage de niveau dans le dernier salon où le membre a parlé"""
+        new_level = user_data['level']
+        embed = discord.Embed(
+            title="🎉 Level Up !",
+            description=f"Félicitations {member.mention} !\nTu es maintenant **niveau {new_level}** !",
+            color=0xf1c40f
+        )
+        embed.set_thumbnail(url=member.display_avatar.url)
+        embed.add_field(name="💎 XP Total", value=f"{user_data['xp']:,}", inline=True)
+        embed.add_field(name="📨 Messages", value=f"{user_data['messages']:,}", inline=True)
         
-        # Vérification de level up
-        if new_level > old_level:
-            embed = discord.Embed(
-                title="🎉 Level Up !",
-                description=f"Félicitations {message.author.mention} !\nTu es maintenant **niveau {new_level}** !",
-                color=0xf1c40f
-            )
-            embed.set_thumbnail(url=message.author.display_avatar.url)
-            embed.add_field(name="💎 XP Total", value=f"{user_data['xp']:,}", inline=True)
-            embed.add_field(name="📨 Messages", value=f"{user_data['messages']:,}", inline=True)
-            
-            # Vérification des récompenses
-            reward = self.get_level_reward(new_level)
-            if reward:
-                embed.add_field(name="🎁 Récompense", value=reward, inline=False)
-            
-            await message.channel.send(embed=embed)
-            logger.info(f"{message.author.name} a atteint le niveau {new_level}")
+        # Vérification des récompenses
+        reward = await self.get_level_reward(member.guild.id, new_level)
+        if reward:
+            embed.add_field(name="🎁 Récompense", value=reward, inline=False)
         
-        # Sauvegarde périodique
-        if random.randint(1, 10) == 1:  # 10% de chance
-            self.save_xp_data()
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            logger.warning(f"Annonce de level up impossible pour {member.name}: {e}")
+        logger.info(f"{member.name} a atteint le niveau {new_level}")
+
+    async def save_to_persistent_data(self):
+        """Méthode appelée par le bot (sauvegarde, arrêt) : applique l'XP en attente"""
+        await self.award_voice_xp()
+        await self.flush_xp()
+        for guild_id in self.xp_data.loaded():
+            store = self.xp_data.peek(guild_id)
+            if store is not None and store.changes:
+                await self.save_snapshot(guild_id, store)
     
-    def get_level_reward(self, level):
-        """Retourne la récompense pour un niveau donné"""
-        rewards = {
-            5: "🏆 Rôle **Membre Actif**",
-            10: "⭐ Rôle **Membre Dévoué**",
-            15: "💎 Rôle **Membre VIP**",
-            20: "👑 Rôle **Membre Légendaire**",
-            25: "🌟 Rôle **Membre Mythique**",
-            30: "🔥 Rôle **Membre Divin**"
-        }
-        return rewards.get(level)
+    async def get_level_reward(self, guild_id, level):
+        """Retourne la récompense (rôle) configurée pour un niveau donné"""
+        rewards = await self.reward_roles.get(guild_id)
+        role_id = rewards.get(str(level))
+        return f"Rôle <@&{role_id}>" if role_id else None
+
+    def reward_changes(self, rewards, level):
+        """Rôles à avoir / à ne pas avoir pour un niveau (les récompenses se cumulent)"""
+        add = {role_id for reward_level, role_id in rewards.items() if int(reward_level) <= level}
+        remove = {role_id for reward_level, role_id in rewards.items() if int(reward_level) > level}
+        return add, remove - add
+
+    async def sync_member_rewards(self, guild_id, member, level):
+        """Programme la mise à jour des rôles de récompense d'un membre"""
+        rewards = await self.reward_roles.get(guild_id)
+        if rewards:
+            add, remove = self.reward_changes(rewards, level)
+            self.role_sync.request(member, add, remove)
+
+    async def reconcile_rewards(self, guild):
+        """Réaligne les rôles de récompense de tous les membres (après un changement de configuration).
+
+        Seuls les membres dont les rôles diffèrent sont mis en file ; la file
+        espace ensuite les appels à l'API.
+        """
+        rewards = await self.reward_roles.get(guild.id)
+        store = await self.xp_data.get(guild.id)
+        queued = 0
+        for index, member in enumerate(guild.members):
+            if not member.bot:
+                entry = store.get(member.id)
+                add, remove = self.reward_changes(rewards, self.get_level_from_xp(entry[0]) if entry else 0)
+                current = {role.id for role in member.roles}
+                if add - current or remove & current:
+                    self.role_sync.request(member, add, remove)
+                    queued += 1
+            if index % 1000 == 999:
+                await asyncio.sleep(0)  # Ne pas bloquer la boucle sur les gros serveurs
+        return queued
     
     @commands.command(name='rank')
     @commands.cooldown(1, 10, commands.BucketType.user)
@@ -127,7 +477,7 @@ class Levels(commands.Cog):
         if not member:
             member = ctx.author
         
-        user_data = self.get_user_data(member.id)
+        user_data = await self.get_user_data(ctx.guild.id, member.id)
         current_level = user_data['level']
         current_xp = user_data['xp']
         
@@ -138,14 +488,13 @@ class Levels(commands.Cog):
         needed_xp = next_level_xp - current_level_xp
         
         # Calcul du rang
-        sorted_users = sorted(self.xp_data.items(), key=lambda x: x[1]['xp'], reverse=True)
-        rank = next((i + 1 for i, (uid, _) in enumerate(sorted_users) if uid == str(member.id)), "N/A")
+        ranking = await self.get_ranking(ctx.guild.id)
+        rank = ranking.rank(member.id) or "N/A"
         
         embed = discord.Embed(
             title=f"📊 Rang de {member.display_name}",
             color=int(self.bot.config['embed_color'], 16)
         )
-        embed.set_thumbnail(url=member.display_avatar.url)
         
         embed.add_field(name="🏆 Rang", value=f"#{rank}", inline=True)
         embed.add_field(name="⭐ Niveau", value=f"{current_level}", inline=True)
@@ -154,29 +503,49 @@ class Levels(commands.Cog):
         embed.add_field(name="📈 Progression", value=f"{progress_xp:,}/{needed_xp:,} XP", inline=True)
         embed.add_field(name="📨 Messages", value=f"{user_data['messages']:,}", inline=True)
         embed.add_field(name="🎯 Prochain niveau", value=f"Niveau {current_level + 1}", inline=True)
+
+        voice_record = (await self.voice_time.get(ctx.guild.id)).get(str(member.id))
+        if voice_record:
+            hours, minutes = divmod(voice_record['seconds'] // 60, 60)
+            embed.add_field(name="🎙️ Temps en vocal", value=f"{hours}h{minutes:02d}", inline=True)
         
         # Barre de progression
         progress_percent = (progress_xp / needed_xp) * 100 if needed_xp > 0 else 100
-        progress_bar = "█" * int(progress_percent / 10) + "░" * (10 - int(progress_percent / 10))
-        embed.add_field(name="📊 Barre de progression", value=f"`{progress_bar}` {progress_percent:.1f}%", inline=False)
-        
-        await ctx.send(embed=embed)
+        card = await self.render_rank_card(member, current_level, int(progress_percent), ranking.rank(member.id))
+        if card is None:
+            embed.set_thumbnail(url=member.display_avatar.url)
+            progress_bar = "█" * int(progress_percent / 10) + "░" * (10 - int(progress_percent / 10))
+            embed.add_field(name="📊 Barre de progression", value=f"`{progress_bar}` {progress_percent:.1f}%", inline=False)
+            await ctx.send(embed=embed)
+            return
+
+        embed.set_image(url="attachment://rank.png")
+        await ctx.send(embed=embed, file=discord.File(io.BytesIO(card), filename="rank.png"))
+
+    async def render_rank_card(self, member, level, percent, rank):
+        """Carte de rang en image (PNG), None si les cartes sont désactivées ou le rendu échoue"""
+        cards = getattr(self.bot, 'cards', None)
+        if cards is None or not cards.available:
+            return None
+        try:
+            return await cards.rank_card(member, level, percent, rank, int(self.bot.config['embed_color'], 16))
+        except Exception as e:
+            logger.error(f"❌ Erreur rendu de la carte de rang de {member}: {e}")
+            return None
     
     @commands.command(name='leaderboard', aliases=['lb', 'top'])
-    @commands.cooldown(1, 30, commands.BucketType.guild)
-    async def show_leaderboard(self, ctx, page: int = 1):
-        """Affiche le classement des niveaux"""
+    async def show_leaderboard(self, ctx, scope: Optional[Literal['global']] = None, page: int = 1):
+        """Affiche le classement des niveaux du serveur (`!leaderboard global` : tous serveurs confondus)"""
         if page < 1:
             page = 1
         
-        # Tri des utilisateurs par XP
-        sorted_users = sorted(self.xp_data.items(), key=lambda x: x[1]['xp'], reverse=True)
+        # Classement des membres du serveur (ou total global), maintenu à chaque gain d'XP
+        ranking = await self.get_ranking(GLOBAL_XP if scope == 'global' else ctx.guild.id)
         
         # Pagination
         per_page = 10
         start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        page_users = sorted_users[start_idx:end_idx]
+        page_users = ranking.page(start_idx, per_page)
         
         if not page_users:
             embed = discord.Embed(
@@ -188,51 +557,67 @@ class Levels(commands.Cog):
             return
         
         embed = discord.Embed(
-            title="🏆 Classement des Niveaux",
+            title="🌍 Classement Global" if scope == 'global' else "🏆 Classement des Niveaux",
             description=f"Page {page} • Top {start_idx + 1}-{start_idx + len(page_users)}",
             color=0xf1c40f
         )
         
-        leaderboard_text = ""
-        for i, (user_id, data) in enumerate(page_users, start=start_idx + 1):
-            try:
-                user = self.bot.get_user(int(user_id))
-                if user:
-                    medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else "🏅"
-                    leaderboard_text += f"{medal} **#{i}** {user.display_name}\n"
-                    leaderboard_text += f"   ⭐ Niveau {data['level']} • 💎 {data['xp']:,} XP\n\n"
-            except:
-                continue
-        
-        if leaderboard_text:
-            embed.description += f"\n\n{leaderboard_text}"
+        leaderboard_text = await self.leaderboard_page_text(
+            None if scope == 'global' else ctx.guild, GLOBAL_XP if scope == 'global' else ctx.guild.id,
+            page, start_idx, page_users
+        )
+        embed.description += f"\n\n{leaderboard_text}"
         
-        total_pages = math.ceil(len(sorted_users) / per_page)
-        embed.set_footer(text=f"Page {page}/{total_pages} • {len(sorted_users)} membres classés")
+        total_pages = math.ceil(len(ranking) / per_page)
+        embed.set_footer(text=f"Page {page}/{total_pages} • {len(ranking)} membres classés")
         
         await ctx.send(embed=embed)
 
+    async def leaderboard_page_text(self, guild, ranking_id, page, start_idx, page_users):
+        """Texte d'une page du classement, réutilisé tant que les entrées de la page sont identiques"""
+        cache_key = (ranking_id, page)
+        cached = self.leaderboard_pages.get(cache_key)
+        if cached is not None and cached[0] == page_users:
+            return cached[1]
+
+        names = await self.bot.member_names.resolve(guild, [int(user_id) for user_id, _ in page_users])
+        lines = []
+        for i, (user_id, xp) in enumerate(page_users, start=start_idx + 1):
+            medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else "🏅"
+            name = names.get(int(user_id), f"<@{user_id}>")
+            lines.append(f"{medal} **#{i}** {name}\n   ⭐ Niveau {self.get_level_from_xp(xp)} • 💎 {xp:,} XP\n")
+        text = "\n".join(lines)
+
+        # Une page avec des noms encore inconnus sera recalculée à la prochaine consultation
+        if len(names) == len(page_users):
+            self.leaderboard_pages[cache_key] = (page_users, text)
+        return text
+
     @commands.command(name='setxp')
     @commands.has_permissions(administrator=True)
     async def set_xp(self, ctx, member: discord.Member, amount: int):
         """Définit l'XP d'un utilisateur (admin seulement)"""
-        if amount < 0:
+        if not 0 <= amount <= MAX_XP:
             embed = discord.Embed(
                 title="❌ Erreur",
-                description="L'XP ne peut pas être négative.",
+                description=f"L'XP doit être comprise entre 0 et {MAX_XP:,}.",
                 color=0xe74c3c
             )
             await ctx.send(embed=embed)
             return
 
-        user_data = self.get_user_data(member.id)
-        old_xp = user_data['xp']
-        old_level = user_data['level']
+        store = await self.xp_data.get(ctx.guild.id)
+        global_store = await self.xp_data.get(GLOBAL_XP)
+        old_xp, _ = store.get(member.id) or (0, 0)
+        old_level = self.get_level_from_xp(old_xp)
 
-        user_data['xp'] = amount
-        user_data['level'] = self.get_level_from_xp(amount)
+        store.set(member.id, amount)
+        user_data = self.make_record(*store.get(member.id))
 
-        self.save_xp_data()
+        global_store.add(member.id, user_data['xp'] - old_xp)
+        self.save_xp_data(ctx.guild.id, member.id)
+        self.save_xp_data(GLOBAL_XP, member.id)
+        await self.sync_member_rewards(ctx.guild.id, member, user_data['level'])
 
         embed = discord.Embed(
             title="✅ XP modifiée",
@@ -249,17 +634,27 @@ class Levels(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def add_xp(self, ctx, member: discord.Member, amount: int):
         """Ajoute de l'XP à un utilisateur (admin seulement)"""
-        user_data = self.get_user_data(member.id)
-        old_xp = user_data['xp']
-        old_level = user_data['level']
+        store = await self.xp_data.get(ctx.guild.id)
+        global_store = await self.xp_data.get(GLOBAL_XP)
+        old_xp, _ = store.get(member.id) or (0, 0)
+        old_level = self.get_level_from_xp(old_xp)
 
-        user_data['xp'] += amount
-        if user_data['xp'] < 0:
-            user_data['xp'] = 0
+        if old_xp + amount > MAX_XP:
+            embed = discord.Embed(
+                title="❌ Erreur",
+                description=f"L'XP ne peut pas dépasser {MAX_XP:,} ({member.mention} a déjà {old_xp:,} XP).",
+                color=0xe74c3c
+            )
+            await ctx.send(embed=embed)
+            return
 
-        user_data['level'] = self.get_level_from_xp(user_data['xp'])
+        store.set(member.id, max(0, old_xp + amount))
+        user_data = self.make_record(*store.get(member.id))
 
-        self.save_xp_data()
+        global_store.add(member.id, user_data['xp'] - old_xp)
+        self.save_xp_data(ctx.guild.id, member.id)
+        self.save_xp_data(GLOBAL_XP, member.id)
+        await self.sync_member_rewards(ctx.guild.id, member, user_data['level'])
 
         embed = discord.Embed(
             title="✅ XP ajoutée",
@@ -282,27 +677,252 @@ class Levels(commands.Cog):
         )
 
         rewards_text = ""
-        rewards = {
-            5: "🏆 Rôle **Membre Actif**",
-            10: "⭐ Rôle **Membre Dévoué**",
-            15: "💎 Rôle **Membre VIP**",
-            20: "👑 Rôle **Membre Légendaire**",
-            25: "🌟 Rôle **Membre Mythique**",
-            30: "🔥 Rôle **Membre Divin**"
-        }
-
-        for level, reward in rewards.items():
-            rewards_text += f"**Niveau {level}** : {reward}\n"
+        rewards = await self.reward_roles.get(ctx.guild.id)
+
+        for level, role_id in sorted(rewards.items(), key=lambda item: int(item[0])):
+            rewards_text += f"**Niveau {level}** : Rôle <@&{role_id}>\n"
+        if not rewards_text:
+            rewards_text = "Aucune récompense configurée (`!levelreward add <niveau> @rôle`)."
 
         embed.description += f"\n\n{rewards_text}"
         embed.add_field(
             name="💡 Comment gagner de l'XP ?",
-            value="• Envoyez des messages (15-25 XP par message)\n• Participez aux discussions\n• Restez actif sur le serveur",
+            value="• Envoyez des messages (15-25 XP par message)\n"
+                  f"• Discutez en vocal ({self.voice_xp_per_minute} XP par minute, micro et son actifs, à plusieurs)\n"
+                  "• Restez actif sur le serveur",
             inline=False
         )
         embed.set_footer(text="Utilisez !rank pour voir votre progression")
 
         await ctx.send(embed=embed)
 
+    @commands.group(name='levelreward', aliases=['lvlreward'], invoke_without_command=True)
+    @commands.has_permissions(manage_roles=True)
+    async def level_reward(self, ctx):
+        """Configure les rôles de récompense par niveau"""
+        embed = discord.Embed(
+            title="🎁 Rôles de récompense",
+            description="`!levelreward add <niveau> @rôle` - Ajouter une récompense\n"
+                        "`!levelreward remove <niveau>` - Retirer une récompense\n"
+                        "`!levelreward auto` - Utiliser les rôles « Niveau N » existants\n"
+                        "`!levelreward sync` - Réappliquer les récompenses à tous les membres\n"
+                        "`!rewards` - Voir les récompenses",
+            color=int(self.bot.config['embed_color'], 16)
+        )
+        await ctx.send(embed=embed)
+
+    @level_reward.command(name='add')
+    @commands.has_permissions(manage_roles=True)
+    async def level_reward_add(self, ctx, level: int, role: discord.Role):
+        """Associe un rôle à un niveau"""
+        if level < 1 or role >= ctx.guild.me.top_role or role.managed:
+            embed = discord.Embed(
+                title="❌ Erreur",
+                description="Niveau invalide, ou rôle impossible à attribuer par le bot.",
+                color=0xe74c3c
+            )
+            await ctx.send(embed=embed)
+            return
+
+        rewards = await self.reward_roles.get(ctx.guild.id)
+        rewards[str(level)] = role.id
+        self.reward_roles.put(ctx.guild.id, str(level), role.id)
+        await self.send_reconciled(ctx, f"{role.mention} attribué à partir du niveau **{level}**")
+
+    @level_reward.command(name='remove')
+    @commands.has_permissions(manage_roles=True)
+    async def level_reward_remove(self, ctx, level: int):
+        """Retire la récompense d'un niveau (le rôle est retiré aux membres)"""
+        rewards = await self.reward_roles.get(ctx.guild.id)
+        role_id = rewards.get(str(level))
+        if role_id is None:
+            await ctx.send(f"❌ Aucune récompense au niveau {level}.")
+            return
+
+        self.reward_roles.delete(ctx.guild.id, str(level))
+        # Le rôle retiré de la configuration n'est plus géré : on le retire aux membres qui l'ont
+        role = ctx.guild.get_role(role_id)
+        for member in role.members if role else []:
+            self.role_sync.request(member, remove={role_id})
+        await self.send_reconciled(ctx, f"Récompense du niveau **{level}** retirée")
+
+    @level_reward.command(name='auto')
+    @commands.has_permissions(manage_roles=True)
+    async def level_reward_auto(self, ctx):
+        """Utilise les rôles « Niveau N » (créés par l'onboarding) comme récompenses"""
+        rewards = await self.reward_roles.get(ctx.guild.id)
+        found = []
+        for role in ctx.guild.roles:
+            match = re.search(r'Niveau (\d+)', role.name)
+            if match and not role.managed and role < ctx.guild.me.top_role:
+                rewards[match.group(1)] = role.id
+                self.reward_roles.put(ctx.guild.id, match.group(1), role.id)
+                found.append(role.mention)
+
+        if not found:
+            await ctx.send("❌ Aucun rôle « Niveau N » attribuable trouvé.")
+            return
+        await self.send_reconciled(ctx, f"Récompenses configurées : {', '.join(found)}")
+
+    @level_reward.command(name='sync')
+    @commands.has_permissions(manage_roles=True)
+    async def level_reward_sync(self, ctx):
+        """Réapplique les récompenses à tous les membres"""
+        await self.send_reconciled(ctx, "Synchronisation des récompenses")
+
+    async def send_reconciled(self, ctx, message):
+        """Réconcilie les rôles du serveur puis confirme la modification"""
+        queued = await self.reconcile_rewards(ctx.guild)
+        embed = discord.Embed(
+            title="✅ Récompenses mises à jour",
+            description=f"{message}\n\n🔄 {queued} membre(s) à mettre à jour "
+                        f"(environ {queued * self.role_sync.interval:.0f} s)",
+            color=0x2ecc71
+        )
+        await ctx.send(embed=embed)
+        logger.info(f"Récompenses de niveau modifiées par {ctx.author.name} sur {ctx.guild.name}: {message}")
+
+    @commands.command(name='xpexport')
+    @commands.has_permissions(administrator=True)
+    async def export_xp(self, ctx, fmt: Literal['ndjson', 'csv'] = 'ndjson'):
+        """Exporte l'XP du serveur en fichier NDJSON ou CSV (admin seulement)"""
+        store = await self.xp_data.get(ctx.guild.id)
+        if not len(store):
+            await ctx.send("❌ Aucune XP à exporter sur ce serveur.")
+            return
+
+        # Copie compacte cohérente, convertie hors de la boucle ; compressée si trop grosse pour Discord
+        snapshot = store.serialize(time.time())
+        compressed = len(store) * 60 > ctx.guild.filesize_limit
+        directory = await self.bot.storage.run(tempfile.mkdtemp)
+        path = os.path.join(directory, f"xp_{ctx.guild.id}.{fmt}" + (".gz" if compressed else ""))
+        try:
+            rows = await self.bot.storage.run(export_snapshot, snapshot, path, fmt)
+            if await self.bot.storage.run(os.path.getsize, path) > ctx.guild.filesize_limit:
+                await ctx.send("❌ Export trop volumineux pour Discord : utilisez `python -m utils.xp_transfer export`.")
+                return
+            await ctx.send(f"📤 {rows:,} membre(s) exporté(s)", file=discord.File(path))
+        finally:
+            await self.bot.storage.run(shutil.rmtree, directory, True)
+        logger.info(f"XP de {ctx.guild.name} exportée par {ctx.author.name} ({rows} membres)")
+
+    @commands.command(name='xpimport')
+    @commands.has_permissions(administrator=True)
+    async def import_xp(self, ctx, mode: Literal['set', 'add'] = 'set'):
+        """Importe l'XP depuis un fichier NDJSON/CSV joint (`add` : ajoute au lieu de remplacer)"""
+        if not ctx.message.attachments:
+            await ctx.send("❌ Joignez un fichier `.ndjson` ou `.csv` (colonnes user_id, xp, messages).")
+            return
+
+        attachment = ctx.message.attachments[0]
+        try:
+            fmt = detect_format(attachment.filename)
+        except XPImportError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        status = await ctx.send(embed=self.import_embed("⏳ Téléchargement du fichier...", 0x3498db))
+        directory = await self.bot.storage.run(tempfile.mkdtemp)
+        path = os.path.join(directory, os.path.basename(attachment.filename))
+        try:
+            await self.download_attachment(attachment, path)
+
+            # Première passe : aucune modification si une seule ligne est invalide
+            await status.edit(embed=self.import_embed("🔍 Validation du fichier...", 0x3498db))
+            rows, error_count, errors = await self.bot.storage.run(validate_file, path, fmt)
+            if error_count:
+                details = "\n".join(f"Ligne {line} : {message}" for line, message in errors)
+                await status.edit(embed=self.import_embed(
+                    f"❌ {error_count} ligne(s) invalide(s), rien n'a été importé\n\n{details}"[:4000], 0xe74c3c
+                ))
+                return
+
+            imported, capped = await self.apply_import(ctx.guild, path, fmt, mode == 'add', status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            await status.edit(embed=self.import_embed(f"❌ Téléchargement impossible : {e}", 0xe74c3c))
+            return
+        finally:
+            await self.bot.storage.run(shutil.rmtree, directory, True)
+
+        report = f"✅ {imported:,} membre(s) importé(s)"
+        if capped:
+            report += f"\n⚠️ {capped:,} membre(s) plafonné(s) à {MAX_XP:,} XP / {MAX_MESSAGES:,} messages"
+        await status.edit(embed=self.import_embed(report, 0x2ecc71))
+        logger.info(f"XP de {ctx.guild.name} importée par {ctx.author.name} ({imported} membres, mode {mode})")
+
+        if await self.reward_roles.get(ctx.guild.id):
+            await self.reconcile_rewards(ctx.guild)
+
+    def import_embed(self, description, color):
+        return discord.Embed(title="📥 Import d'XP", description=description, color=color)
+
+    def http_session(self):
+        """Session HTTP partagée des imports (créée au premier téléchargement)"""
+        if self.download_session is None or self.download_session.closed:
+            # Pas de limite totale : un gros fichier prend le temps qu'il faut tant que les octets arrivent
+            self.download_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60)
+            )
+        return self.download_session
+
+    async def download_attachment(self, attachment, path, chunk_size=1 << 16):
+        """Télécharge une pièce jointe par morceaux vers un fichier (jamais entière en mémoire).
+
+        Chaque morceau est écrit par le thread de stockage avant de lire le
+        suivant : la mémoire reste d'un morceau quelle que soit la taille.
+        """
+        f = await self.bot.storage.run(open, path, 'wb')
+        try:
+            async with self.http_session().get(attachment.url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    await self.bot.storage.run(f.write, chunk)
+        finally:
+            await self.bot.storage.run(f.close)
+
+    async def apply_import(self, guild, path, fmt, add, status=None, batch_size=5000):
+        """Applique un fichier validé par lots : stores en mémoire, puis une transaction par lot.
+
+        Renvoie (membres importés, membres plafonnés à MAX_XP / MAX_MESSAGES en mode ajout).
+        """
+        await self.flush_xp()
+        store = await self.xp_data.get(guild.id)
+        global_store = await self.xp_data.get(GLOBAL_XP)
+        reader = await self.bot.storage.run(RowReader, path, fmt)
+        last_report = time.monotonic()
+        capped = 0
+        try:
+            while True:
+                batch = await self.bot.storage.run(reader.read, batch_size)
+                if not batch:
+                    break
+
+                for user_id, xp, messages in batch:
+                    old_xp, old_messages = store.get(user_id) or (0, 0)
+                    if add:
+                        xp, messages = xp + old_xp, messages + old_messages
+                        if xp > MAX_XP or messages > MAX_MESSAGES:
+                            # Somme au-delà des limites du stockage : plafonnée et signalée
+                            xp, messages = min(xp, MAX_XP), min(messages, MAX_MESSAGES)
+                            capped += 1
+                    store.set(user_id, xp, messages)
+
+                    total_xp, total_messages = global_store.get(user_id) or (0, 0)
+                    global_store.set(
+                        user_id, max(0, total_xp + xp - old_xp), max(0, total_messages + messages - old_messages)
+                    )
+                    self.save_xp_data(guild.id, user_id)
+                    self.save_xp_data(GLOBAL_XP, user_id)
+                await self.bot.db.flush()
+
+                if status is not None and time.monotonic() - last_report >= 2:
+                    last_report = time.monotonic()
+                    await status.edit(embed=self.import_embed(
+                        f"⏳ {reader.rows:,} membre(s) importé(s) ({reader.progress():.0%})", 0x3498db
+                    ))
+        finally:
+            await self.bot.storage.run(reader.close)
+        return reader.rows, capped
+
 async def setup(bot):
     await bot.add_cog(Levels(bot))
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import logging
 from datetime import datetime, timedelta
 import asyncio
@@ -13,82 +12,82 @@ class Logs(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.config = self.load_config()
+        self.config = {}
         self.log_cache = []  # Cache pour les logs récents
+
+    async def cog_load(self):
+        """Charge la configuration des logs"""
+        self.config = await self.load_config()
         
-    def load_config(self):
+    async def load_config(self):
         """Charge la configuration des logs"""
-        try:
-            with open('logs_config.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            default_config = {
+        config = await self.bot.storage.load('logs_config.json')
+        if config is not None:
+            return config
+
+        default_config = {
+            "enabled": True,
+            "channels": {
+                "general": None,
+                "moderation": None,
+                "member": None,
+                "message": None,
+                "voice": None,
+                "server": None
+            },
+            "webhooks": {
+                "general": None,
+                "moderation": None,
+                "member": None,
+                "message": None,
+                "voice": None,
+                "server": None
+            },
+            "events": {
+                "member_join": True,
+                "member_leave": True,
+                "member_update": True,
+                "member_ban": True,
+                "member_unban": True,
+                "message_delete": True,
+                "message_edit": True,
+                "message_bulk_delete": True,
+                "voice_join": True,
+                "voice_leave": True,
+                "voice_move": True,
+                "role_create": True,
+                "role_delete": True,
+                "role_update": True,
+                "channel_create": True,
+                "channel_delete": True,
+                "channel_update": True,
+                "guild_update": True,
+                "emoji_update": True,
+                "invite_create": True,
+                "invite_delete": True
+            },
+            "filters": {
+                "ignore_bots": True,
+                "ignore_webhooks": True,
+                "min_message_length": 0,
+                "ignored_channels": [],
+                "ignored_users": [],
+                "ignored_roles": []
+            },
+            "archive": {
                 "enabled": True,
-                "channels": {
-                    "general": None,
-                    "moderation": None,
-                    "member": None,
-                    "message": None,
-                    "voice": None,
-                    "server": None
-                },
-                "webhooks": {
-                    "general": None,
-                    "moderation": None,
-                    "member": None,
-                    "message": None,
-                    "voice": None,
-                    "server": None
-                },
-                "events": {
-                    "member_join": True,
-                    "member_leave": True,
-                    "member_update": True,
-                    "member_ban": True,
-                    "member_unban": True,
-                    "message_delete": True,
-                    "message_edit": True,
-                    "message_bulk_delete": True,
-                    "voice_join": True,
-                    "voice_leave": True,
-                    "voice_move": True,
-                    "role_create": True,
-                    "role_delete": True,
-                    "role_update": True,
-                    "channel_create": True,
-                    "channel_delete": True,
-                    "channel_update": True,
-                    "guild_update": True,
-                    "emoji_update": True,
-                    "invite_create": True,
-                    "invite_delete": True
-                },
-                "filters": {
-                    "ignore_bots": True,
-                    "ignore_webhooks": True,
-                    "min_message_length": 0,
-                    "ignored_channels": [],
-                    "ignored_users": [],
-                    "ignored_roles": []
-                },
-                "archive": {
-                    "enabled": True,
-                    "days_to_keep": 30,
-                    "auto_cleanup": True
-                }
+                "days_to_keep": 30,
+                "auto_cleanup": True
             }
-            self.save_config(default_config)
-            return default_config
+        }
+        self.save_config(default_config)
+        return default_config
     
     def save_config(self, config=None):
         """Sauvegarde la configuration"""
         if config is None:
             config = self.config
-        try:
-            with open('logs_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde config logs: {e}")
+        self.bot.storage.save_soon('logs_config.json', config)
     
     def should_log_event(self, event_type, **kwargs):
         """Vérifie si un événement doit être loggé"""
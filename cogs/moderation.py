@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import asyncio
 import logging
 from datetime import datetime, timedelta
@@ -16,7 +15,7 @@ class Moderation(commands.Cog):
     async def log_action(self, action, moderator, target, reason=None, duration=None):
         """Envoie un log de l'action de modération"""
         try:
-            logs_channel_id = self.bot.config['channels']['logs']
+            logs_channel_id = await self.bot.get_guild_channel_id(moderator.guild.id, 'logs')
             if not logs_channel_id:
                 return
             
@@ -481,8 +480,7 @@ class Moderation(commands.Cog):
 
             # Sauvegarde l'ID du rôle
             self.bot.config['roles']['muted'] = muted_role.id
-            with open('config.json', 'w', encoding='utf-8') as f:
-                json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+            await self.bot.save_config()
 
         try:
             await member.add_roles(muted_role, reason=f"Par {ctx.author}: {reason}")
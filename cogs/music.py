@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 import asyncio
-import json
 import logging
 from datetime import datetime
 import re
@@ -143,23 +142,22 @@ class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.players = {}  # {guild_id: MusicPlayer}
-        self.playlists = self.load_playlists()
-        
-    def load_playlists(self):
+        self.playlists = {}
+
+    async def cog_load(self):
+        """Charge les playlists depuis la base de données"""
+        self.playlists = await self.load_playlists()
+
+    async def load_playlists(self):
         """Charge les playlists sauvegardées"""
-        try:
-            with open('playlists.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-    
-    def save_playlists(self):
-        """Sauvegarde les playlists"""
-        try:
-            with open('playlists.json', 'w', encoding='utf-8') as f:
-                json.dump(self.playlists, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde playlists: {e}")
+        return await self.bot.db.load('playlists')
+
+    def save_playlist(self, playlist_id):
+        """Programme la sauvegarde d'une playlist (une ligne)"""
+        if playlist_id in self.playlists:
+            self.bot.db.put('playlists', playlist_id, self.playlists[playlist_id])
+        else:
+            self.bot.db.delete('playlists', playlist_id)
     
     def get_player(self, guild):
         """Récupère ou crée un lecteur pour un serveur"""
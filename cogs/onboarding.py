@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import logging
 from datetime import datetime
 
@@ -881,11 +880,7 @@ class Onboarding(commands.Cog):
 
         # Configuration des autres systèmes
         if welcome_channel:
-            self.bot.config['channels']['welcome'] = welcome_channel.id
-
-        # Sauvegarder la config
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+            await self.bot.set_guild_channel(guild.id, 'welcome', welcome_channel.id)
 
         # Message de succès final
         final_embed = discord.Embed(
@@ -1023,9 +1018,7 @@ class Onboarding(commands.Cog):
         await self.setup_community_choice(ctx, choice_channel)
 
         # Configuration du bienvenue
-        self.bot.config['channels']['welcome'] = welcome_channel.id
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.set_guild_channel(ctx.guild.id, 'welcome', welcome_channel.id)
 
         # Message de confirmation final
         final_embed = discord.Embed(
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import logging
 
 logger = logging.getLogger('discord_bot.role_selection')
@@ -10,7 +9,8 @@ class RoleSelection(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.role_message_id = None
+        self.role_message_ids = {}  # {guild_id: message_id}
+        self.legacy_role_message_id = None  # Ancien message unique, rattaché à son serveur à la première réaction
         self.role_messages = {}  # {message_id: {emoji: role_id}}
 
         # Charger la configuration depuis les données persistantes
@@ -20,7 +20,10 @@ class RoleSelection(commands.Cog):
         """Charge la configuration depuis les données persistantes"""
         if hasattr(self.bot, 'get_persistent_data'):
             config = self.bot.get_persistent_data('roles', 'config', {})
-            self.role_message_id = config.get('role_message_id')
+            self.role_message_ids.update(
+                {int(k): v for k, v in config.get('role_message_ids', {}).items()}
+            )
+            self.legacy_role_message_id = config.get('role_message_id', self.legacy_role_message_id)
             self.role_messages = config.get('role_messages', {})
             # Convertir les clés string en int pour message_id
             self.role_messages = {int(k): v for k, v in self.role_messages.items()}
@@ -29,7 +32,8 @@ class RoleSelection(commands.Cog):
         """Sauvegarde la configuration dans les données persistantes"""
         if hasattr(self.bot, 'set_persistent_data'):
             config = {
-                'role_message_id': self.role_message_id,
+                'role_message_ids': self.role_message_ids,
+                'role_message_id': self.legacy_role_message_id,
                 'role_messages': self.role_messages
             }
             self.bot.set_persistent_data('roles', 'config', config)
@@ -42,19 +46,30 @@ class RoleSelection(commands.Cog):
         """Méthode appelée par le bot pour sauvegarder les données"""
         self.save_configuration()
     
-    @commands.Cog.listener()
-    async def on_ready(self):
-        """Récupère l'ID du message de sélection de rôles au démarrage"""
+    async def cog_load(self):
+        """Récupère les IDs des messages de sélection de rôles au démarrage"""
         try:
-            # Charger l'ID du message depuis un fichier de données persistantes
-            try:
-                with open('data/role_message.json', 'r') as f:
-                    data = json.load(f)
-                    self.role_message_id = data.get('message_id')
-            except FileNotFoundError:
-                pass
+            # Charger les IDs des messages depuis un fichier de données persistantes
+            data = await self.bot.storage.load('data/role_message.json', {})
+            self.role_message_ids.update({int(k): v for k, v in data.get('messages', {}).items()})
+            self.legacy_role_message_id = data.get('message_id', self.legacy_role_message_id)
         except Exception as e:
             logger.error(f"Erreur lors du chargement des données de rôles: {e}")
+
+    def is_role_message(self, payload):
+        """Vérifie si la réaction porte sur le message de sélection de rôles de son serveur"""
+        if payload.guild_id is None:
+            return False
+        if self.role_message_ids.get(payload.guild_id) == payload.message_id:
+            return True
+
+        # L'ancien message unique appartient au serveur où l'on réagit : le rattacher
+        if self.legacy_role_message_id is not None and payload.message_id == self.legacy_role_message_id:
+            self.role_message_ids[payload.guild_id] = payload.message_id
+            self.legacy_role_message_id = None
+            self.save_configuration()
+            return True
+        return False
     
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
@@ -64,7 +79,7 @@ class RoleSelection(commands.Cog):
             return
         
         # Vérifie si c'est le bon message
-        if payload.message_id != self.role_message_id:
+        if not self.is_role_message(payload):
             return
         
         try:
@@ -110,7 +125,7 @@ class RoleSelection(commands.Cog):
             return
         
         # Vérifie si c'est le bon message
-        if payload.message_id != self.role_message_id:
+        if not self.is_role_message(payload):
             return
         
         try:
@@ -155,8 +170,8 @@ class RoleSelection(commands.Cog):
         if not channel:
             channel = ctx.channel
         
-        # Mise à jour de la configuration
-        self.bot.config['channels']['role_selection'] = channel.id
+        # Mise à jour de la configuration du serveur
+        await self.bot.set_guild_channel(ctx.guild.id, 'role_selection', channel.id)
         
         # Création de l'embed
         embed = discord.Embed(
@@ -179,20 +194,12 @@ class RoleSelection(commands.Cog):
         for emoji in selectable_roles.keys():
             await message.add_reaction(emoji)
         
-        # Sauvegarde l'ID du message
-        self.role_message_id = message.id
+        # Sauvegarde l'ID du message pour ce serveur
+        self.role_message_ids[ctx.guild.id] = message.id
         
-        # Crée le dossier data s'il n'existe pas
-        import os
-        os.makedirs('data', exist_ok=True)
-        
-        # Sauvegarde dans un fichier
-        with open('data/role_message.json', 'w') as f:
-            json.dump({'message_id': message.id}, f)
-        
-        # Sauvegarde de la configuration
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        # Sauvegarde dans un fichier (le dossier data est créé si besoin)
+        await self.bot.storage.save('data/role_message.json', {'messages': self.role_message_ids})
+        self.save_configuration()
         
         embed_confirm = discord.Embed(
             title="✅ Configuration terminée",
@@ -213,8 +220,7 @@ class RoleSelection(commands.Cog):
         }
         
         # Sauvegarde de la configuration
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
         
         embed = discord.Embed(
             title="✅ Rôle ajouté",
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import logging
 from datetime import datetime
 import asyncio
@@ -61,68 +60,61 @@ class Suggestions(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.config = self.load_config()
-        self.suggestions = self.load_suggestions()
+        self.config = {}
+        self.suggestions = {}
+
+    async def cog_load(self):
+        """Charge la configuration et les suggestions en parallèle"""
+        self.config, self.suggestions = await asyncio.gather(self.load_config(), self.load_suggestions())
         
-    def load_config(self):
+    async def load_config(self):
         """Charge la configuration des suggestions"""
-        try:
-            with open('suggestions_config.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            default_config = {
+        config = await self.bot.storage.load('suggestions_config.json')
+        if config is not None:
+            return config
+
+        default_config = {
+            "enabled": True,
+            "channels": {
+                "suggestions": None,
+                "approved": None,
+                "rejected": None
+            },
+            "settings": {
+                "anonymous_suggestions": False,
+                "auto_thread": True,
+                "require_reason_for_rejection": True,
+                "min_suggestion_length": 10,
+                "max_suggestion_length": 1000,
+                "cooldown_minutes": 5
+            },
+            "roles": {
+                "suggestion_manager": None,
+                "can_suggest": []
+            },
+            "voting": {
                 "enabled": True,
-                "channels": {
-                    "suggestions": None,
-                    "approved": None,
-                    "rejected": None
-                },
-                "settings": {
-                    "anonymous_suggestions": False,
-                    "auto_thread": True,
-                    "require_reason_for_rejection": True,
-                    "min_suggestion_length": 10,
-                    "max_suggestion_length": 1000,
-                    "cooldown_minutes": 5
-                },
-                "roles": {
-                    "suggestion_manager": None,
-                    "can_suggest": []
-                },
-                "voting": {
-                    "enabled": True,
-                    "show_vote_count": True,
-                    "allow_vote_change": True
-                }
+                "show_vote_count": True,
+                "allow_vote_change": True
             }
-            self.save_config(default_config)
-            return default_config
+        }
+        self.save_config(default_config)
+        return default_config
     
-    def load_suggestions(self):
+    async def load_suggestions(self):
         """Charge les suggestions"""
-        try:
-            with open('suggestions.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        return await self.bot.db.load('suggestions')
     
     def save_config(self, config=None):
         """Sauvegarde la configuration"""
         if config is None:
             config = self.config
-        try:
-            with open('suggestions_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde config suggestions: {e}")
+        self.bot.storage.save_soon('suggestions_config.json', config)
     
-    def save_suggestions(self):
-        """Sauvegarde les suggestions"""
-        try:
-            with open('suggestions.json', 'w', encoding='utf-8') as f:
-                json.dump(self.suggestions, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde suggestions: {e}")
+    def save_suggestion(self, suggestion_id):
+        """Programme la sauvegarde d'une suggestion (une ligne)"""
+        if suggestion_id in self.suggestions:
+            self.bot.db.put('suggestions', suggestion_id, self.suggestions[suggestion_id])
     
     def can_manage_suggestions(self, member):
         """Vérifie si un membre peut gérer les suggestions"""
@@ -183,7 +175,7 @@ class Suggestions(commands.Cog):
         
         # Mettre à jour l'embed
         await self.update_suggestion_embed(interaction, suggestion_id)
-        self.save_suggestions()
+        self.save_suggestion(suggestion_id)
     
     async def handle_manage(self, interaction, suggestion_id, action):
         """Gère les actions de modération sur les suggestions"""
@@ -226,7 +218,7 @@ class Suggestions(commands.Cog):
         
         # Mettre à jour l'embed
         await self.update_suggestion_embed(interaction, suggestion_id)
-        self.save_suggestions()
+        self.save_suggestion(suggestion_id)
     
     async def update_suggestion_embed(self, interaction, suggestion_id):
         """Met à jour l'embed d'une suggestion"""
@@ -421,7 +413,7 @@ class Suggestions(commands.Cog):
         suggestion_data['message_id'] = suggestion_message.id
         suggestion_data['channel_id'] = suggestions_channel.id
         self.suggestions[suggestion_id] = suggestion_data
-        self.save_suggestions()
+        self.save_suggestion(suggestion_id)
         
         # Confirmer à l'utilisateur
         embed = discord.Embed(
@@ -463,7 +455,7 @@ class RejectReasonModal(discord.ui.Modal):
             suggestion['rejection_reason'] = self.reason.value
             
             await cog.update_suggestion_embed(interaction, self.suggestion_id)
-            cog.save_suggestions()
+            cog.save_suggestion(self.suggestion_id)
             
             await interaction.response.send_message("❌ Suggestion rejetée avec raison.", ephemeral=True)
 
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import logging
 from datetime import datetime
 
@@ -66,7 +65,7 @@ class CreateTicketView(discord.ui.View):
         
         # Récupère la catégorie des tickets
         bot = interaction.client
-        tickets_category_id = bot.config['channels']['tickets_category']
+        tickets_category_id = await bot.get_guild_channel_id(guild.id, 'tickets_category')
         tickets_category = None
         
         if tickets_category_id:
@@ -78,9 +77,7 @@ class CreateTicketView(discord.ui.View):
                 name="🎫 Tickets",
                 reason="Catégorie pour les tickets de support"
             )
-            bot.config['channels']['tickets_category'] = tickets_category.id
-            with open('config.json', 'w', encoding='utf-8') as f:
-                json.dump(bot.config, f, indent=2, ensure_ascii=False)
+            await bot.set_guild_channel(guild.id, 'tickets_category', tickets_category.id)
         
         # Crée le canal de ticket
         overwrites = {
@@ -127,7 +124,7 @@ class CreateTicketView(discord.ui.View):
             tickets_cog.save_configuration()
 
         # Log la création du ticket
-        logs_channel_id = bot.config['channels']['logs']
+        logs_channel_id = await bot.get_guild_channel_id(guild.id, 'logs')
         if logs_channel_id:
             logs_channel = guild.get_channel(logs_channel_id)
             if logs_channel:
@@ -180,9 +177,9 @@ class Tickets(commands.Cog):
         self.load_configuration()
 
         # Restaurer les vues des boutons si nécessaire
-        ticket_channel_id = self.bot.config['channels'].get('tickets')
-        if ticket_channel_id:
-            for guild in self.bot.guilds:
+        for guild in self.bot.guilds:
+            ticket_channel_id = await self.bot.get_guild_channel_id(guild.id, 'tickets')
+            if ticket_channel_id:
                 channel = guild.get_channel(ticket_channel_id)
                 if channel:
                     # Ajouter la vue persistante pour les boutons
@@ -241,9 +238,7 @@ class Tickets(commands.Cog):
         message = await channel.send(embed=embed, view=view)
 
         # Sauvegarder la configuration
-        self.bot.config['channels']['tickets'] = channel.id
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.set_guild_channel(ctx.guild.id, 'tickets', channel.id)
 
         # Sauvegarder dans les données persistantes
         self.save_configuration()
@@ -22,9 +22,8 @@ class Welcome(commands.Cog):
     def save_configuration(self):
         """Sauvegarde la configuration dans les données persistantes"""
         if hasattr(self.bot, 'set_persistent_data'):
+            # Les salons sont configurés par serveur (bot.set_guild_channel), plus ici
             config = {
-                'welcome_channel': self.bot.config['channels'].get('welcome'),
-                'goodbye_channel': self.bot.config['channels'].get('goodbye'),
                 'welcome_message': self.bot.config.get('welcome_message'),
                 'goodbye_message': self.bot.config.get('goodbye_message')
             }
@@ -49,7 +48,7 @@ class Welcome(commands.Cog):
                 logger.info(f"Rôle 'Non Vérifié' attribué à {member.name}")
 
             # Récupération du canal de bienvenue depuis la config
-            welcome_channel_id = self.bot.config['channels']['welcome']
+            welcome_channel_id = await self.bot.get_guild_channel_id(member.guild.id, 'welcome')
 
             if not welcome_channel_id:
                 logger.warning("Canal de bienvenue non configuré")
@@ -109,7 +108,7 @@ class Welcome(commands.Cog):
                 logger.info(f"Warnings supprimés pour {member.name} (a quitté le serveur)")
 
             # Message d'au revoir
-            goodbye_channel_id = self.bot.config['channels'].get('goodbye')
+            goodbye_channel_id = await self.bot.get_guild_channel_id(member.guild.id, 'goodbye')
             if goodbye_channel_id:
                 goodbye_channel = self.bot.get_channel(goodbye_channel_id)
                 if goodbye_channel:
@@ -132,7 +131,7 @@ class Welcome(commands.Cog):
                     logger.info(f"Message d'au revoir envoyé pour {member.name}")
 
             # Log dans le canal de logs
-            logs_channel_id = self.bot.config['channels'].get('logs')
+            logs_channel_id = await self.bot.get_guild_channel_id(member.guild.id, 'logs')
             if logs_channel_id:
                 logs_channel = self.bot.get_channel(logs_channel_id)
                 if logs_channel:
@@ -162,13 +161,8 @@ class Welcome(commands.Cog):
         if not channel:
             channel = ctx.channel
         
-        # Mise à jour de la configuration
-        self.bot.config['channels']['welcome'] = channel.id
-        
-        # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        # Mise à jour de la configuration du serveur
+        await self.bot.set_guild_channel(ctx.guild.id, 'welcome', channel.id)
         
         embed = discord.Embed(
             title="✅ Configuration mise à jour",
@@ -186,9 +180,7 @@ class Welcome(commands.Cog):
         self.bot.config['messages']['welcome_description'] = message
 
         # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
 
         embed = discord.Embed(
             title="✅ Message de bienvenue mis à jour",
@@ -205,15 +197,8 @@ class Welcome(commands.Cog):
         if not channel:
             channel = ctx.channel
 
-        # Mise à jour de la configuration
-        if 'goodbye' not in self.bot.config['channels']:
-            self.bot.config['channels']['goodbye'] = None
-        self.bot.config['channels']['goodbye'] = channel.id
-
-        # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        # Mise à jour de la configuration du serveur
+        await self.bot.set_guild_channel(ctx.guild.id, 'goodbye', channel.id)
 
         embed = discord.Embed(
             title="✅ Configuration mise à jour",
@@ -233,9 +218,7 @@ class Welcome(commands.Cog):
         self.bot.config['messages']['goodbye_description'] = message
 
         # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
 
         embed = discord.Embed(
             title="✅ Message d'au revoir mis à jour",
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import json
 import logging
 from datetime import datetime
 
@@ -544,8 +543,7 @@ class Onboarding(commands.Cog):
 
         # Configuration du bienvenue
         self.bot.config['channels']['welcome'] = welcome_channel.id
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
 
         # Message de confirmation final
         final_embed = discord.Embed(
@@ -0,0 +1,26 @@
+"""Outils partagés par les tests et les benchmarks"""
+import os
+from types import SimpleNamespace
+
+from utils.database import Database, SQLiteBackend
+from utils.storage import AsyncStorage
+
+
+class BenchBot:
+    """Bot minimal : les vrais cogs et la vraie persistance, sans connexion Discord"""
+
+    def __init__(self, directory, flush_interval):
+        self.config = {'embed_color': '0x3498db', 'persistence': {}}
+        self.db = Database(SQLiteBackend(os.path.join(directory, 'bot_data.db')), flush_interval=flush_interval)
+        self.storage = AsyncStorage()
+        self.user = SimpleNamespace(id=0)
+        self.guilds = []
+
+    def is_ready(self):
+        return False
+
+    def get_guild(self, guild_id):
+        return None
+
+    def get_user(self, user_id):
+        return None
@@ -0,0 +1,32 @@
+"""Découpage des sauvegardes : coupures définies par le contenu"""
+import random
+import unittest
+
+from utils import backup
+from utils.backup import MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, split_chunks
+
+
+class SplitChunksTest(unittest.TestCase):
+    def setUp(self):
+        self.data = random.Random(5).randbytes(300 * 1024)
+
+    def test_chunks_cover_data_within_bounds(self):
+        chunks = list(split_chunks(self.data))
+        self.assertEqual(b''.join(chunks), self.data)
+        self.assertTrue(all(MIN_CHUNK_SIZE <= len(chunk) <= MAX_CHUNK_SIZE for chunk in chunks[:-1]))
+
+    def test_insertion_only_changes_nearby_chunks(self):
+        # Sans fin de ligne (JSON compact, msgpack) : l'ancien découpage par lignes donnait un seul morceau
+        before = set(split_chunks(self.data))
+        middle = len(self.data) // 2
+        after = list(split_chunks(self.data[:middle] + b'{"balance":1}' + self.data[middle:]))
+        self.assertLessEqual(sum(chunk not in before for chunk in after), 2)
+
+    @unittest.skipIf(backup.np is None, "NumPy non installé")
+    def test_numpy_and_python_cut_at_same_positions(self):
+        for data in (self.data, b'\0' * 100000, b'{"a":1}' * 20000):
+            self.assertEqual(list(backup._split_numpy(data)), list(backup._split_python(data)))
+
+
+if __name__ == '__main__':
+    unittest.main()
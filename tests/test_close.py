@@ -0,0 +1,158 @@
+"""Fermeture pendant une écriture en cours : rien n'est perdu ni écrit en double"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from discord.ext import commands
+
+from utils import journal, ledger, persistence
+from utils.codec import read_file
+from utils.database import Database, SQLiteBackend
+from utils.journal import Journal
+from utils.ledger import Ledger
+from utils.persistence import WriteBehindStore
+from utils.xpstore import XPStore
+
+
+class SlowWrites:
+    """Enveloppe une écriture disque : lente, et compte celles en cours (au plus `overlap` à la fois)"""
+
+    def __init__(self, write):
+        self.write = write
+        self.in_flight = self.overlap = 0
+        self.started = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            self.in_flight += 1
+            self.overlap = max(self.overlap, self.in_flight)
+        self.started.set()
+        time.sleep(0.2)
+        try:
+            self.write(*args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class CloseDuringWriteTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data.json')
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def wait_started(self, writes):
+        while not writes.started.is_set():
+            await asyncio.sleep(0.01)
+
+    async def test_store_close_waits_for_inflight_write(self):
+        data = {'value': 1}
+        store = WriteBehindStore(interval=0.01)
+        store.register('data', self.path, lambda: dict(data))
+        writes = SlowWrites(persistence.atomic_write)
+        with mock.patch.object(persistence, 'atomic_write', writes):
+            store.start()
+            store.mark_dirty('data', 'value')
+            await self.wait_started(writes)
+            data['value'] = 2
+            store.mark_dirty('data', 'value')
+            await store.close()
+            # Une seule écriture à la fois dans data.json.tmp, toutes terminées
+            self.assertEqual((writes.in_flight, writes.overlap), (0, 1))
+        self.assertEqual(read_file(self.path), {'value': 2})
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    async def test_journal_close_keeps_inflight_records(self):
+        state = {}
+        log = Journal(self.path, interval=0.01)
+        log.attach(lambda: dict(state))
+        writes = SlowWrites(journal._append_lines)
+        with mock.patch.object(journal, '_append_lines', writes):
+            log.start()
+            state['a'] = 1
+            log.append({'op': 'set', 'key': 'a', 'value': 1})
+            await self.wait_started(writes)
+            state['b'] = 2
+            log.append({'op': 'set', 'key': 'b', 'value': 2})
+            await log.close()
+            self.assertEqual((writes.in_flight, writes.overlap), (0, 1))
+        self.assertEqual(read_file(self.path), {'a': 1, 'b': 2})
+        self.assertEqual(log.records_written, 2)
+
+    async def test_ledger_stop_keeps_inflight_transactions(self):
+        log = Ledger(os.path.join(self.directory.name, 'ledger'), interval=0.01, checkpoint_interval=3600)
+        log.open()
+        writes = SlowWrites(journal._append_lines)
+
+        async def flush():
+            pass
+
+        with mock.patch.object(ledger, '_append_lines', writes):
+            log.start(flush)
+            log.append('earn', 1, 42, 100, 100)
+            await self.wait_started(writes)
+            log.append('earn', 1, 42, 50, 150)
+            await log.stop()
+            await log.commit()
+            self.assertEqual((writes.in_flight, writes.overlap), (0, 1))
+        self.assertEqual(log.committed_seq, 2)
+        self.assertEqual([record['balance'] for record in log.records()], [100, 150])
+
+
+class BotCloseTest(unittest.IsolatedAsyncioTestCase):
+    """bot.close() décharge les cogs avant de fermer la base et le stockage"""
+
+    async def asyncSetUp(self):
+        self.origin = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        shutil.copy('config.json', self.directory.name)
+        os.chdir(self.directory.name)  # config.json, bot.log, base et registre du bot
+
+    async def asyncTearDown(self):
+        os.chdir(self.origin)
+        self.directory.cleanup()
+
+    async def test_pending_xp_and_ledger_checkpoint_survive_close(self):
+        import bot as bot_module
+
+        bot = bot_module.CommunityBot()
+        with mock.patch.object(bot, 'load_cogs', return_value=None):
+            await bot.setup_hook()
+        await bot.load_extension('cogs.levels')
+        await bot.load_extension('cogs.economy')
+
+        class LateActivity(commands.Cog):
+            """Sauvegardé après Levels et Economy : XP et transaction arrivées pendant l'arrêt"""
+
+            async def save_to_persistent_data(self):
+                levels = bot.get_cog('Levels')
+                levels.xp_batch_size = 1  # Lot appliqué tout de suite par une tâche (early_flush)
+                levels.queue_xp((1, '42'), 25, 1, None, None)
+                await bot.get_cog('Economy').add_money(1, 42, 10, "test")
+
+        await bot.add_cog(LateActivity())
+        # Seul cog_unload peut encore appliquer l'XP et écrire le point de contrôle
+        await bot.close()
+
+        self.assertEqual(read_file(os.path.join('data', 'ledger', 'checkpoint.json'))['seq'], 1)
+        # Instantané écrit au déchargement : le prochain chargement n'a rien à relire en base
+        self.assertEqual(XPStore.open(os.path.join('data', 'xp', '1.xpa')).get('42'), (25, 1))
+        db = Database(SQLiteBackend(bot.db.backend.path), flush_interval=60)
+        await db.connect()
+        try:
+            self.assertEqual((await db.get('levels:1', '42'))['xp'], 25)
+            self.assertEqual((await db.get('economy_users:1', '42'))['ledger_seq'], 1)
+        finally:
+            await db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""!daily et !work simultanés d'un même membre : une seule récompense"""
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from cogs.economy import Economy
+from tests.helpers import BenchBot
+
+GUILD_ID = 1
+MEMBER = 42
+
+
+class ConcurrentClaimTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)  # Configuration et registre du cog
+        self.bot = BenchBot(self.directory.name, flush_interval=60)
+        await self.bot.db.connect()
+        self.economy = Economy(self.bot)
+        await self.economy.cog_load()
+        self.economy.scheduled_jobs.cancel()
+
+    async def asyncTearDown(self):
+        await self.economy.cog_unload()
+        await self.bot.storage.close()
+        await self.bot.db.close()
+        os.chdir(self.origin)
+        self.directory.cleanup()
+
+    async def test_concurrent_daily_credits_once(self):
+        now = datetime.now()
+        claims = await asyncio.gather(*(self.economy.claim_daily(GUILD_ID, MEMBER, now) for _ in range(10)))
+        credited = [claim for claim in claims if claim is not None]
+        self.assertEqual(len(credited), 1)
+        account = await self.economy.get_user_data(GUILD_ID, MEMBER)
+        self.assertEqual(account['balance'], self.economy.config['currency']['starting_amount'] + credited[0][0])
+        self.assertEqual(account['daily_streak'], 1)
+
+    async def test_concurrent_work_pays_once(self):
+        now = datetime.now()
+        claims = await asyncio.gather(*(self.economy.claim_work(GUILD_ID, MEMBER, now) for _ in range(10)))
+        self.assertEqual(sum(claim is not None for claim in claims), 1)
+        self.assertEqual((await self.economy.get_user_data(GUILD_ID, MEMBER))['work_count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Total global de l'XP construit depuis l'ancienne XP globale (namespace `levels`)"""
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from cogs.levels import Levels
+from tests.helpers import BenchBot
+from utils.xp_transfer import GLOBAL_XP
+
+MEMBER = '42'
+LEGACY = {MEMBER: {'xp': 1000, 'level': 3, 'messages': 10}}
+
+
+class GlobalXPTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)  # Instantanés data/xp/ du cog
+        self.bot = BenchBot(self.directory.name, flush_interval=60)
+        # Le membre fait partie des serveurs 1 et 2
+        guilds = {gid: SimpleNamespace(id=gid, get_member=lambda uid: object() if str(uid) == MEMBER else None)
+                  for gid in (1, 2)}
+        self.bot.get_guild = guilds.get
+        await self.bot.db.connect()
+        await self.bot.db.put_many('levels', LEGACY)
+        self.levels = Levels(self.bot)
+
+    async def asyncTearDown(self):
+        await self.bot.storage.close()
+        await self.bot.db.close()
+        os.chdir(self.origin)
+        self.directory.cleanup()
+
+    async def global_xp(self):
+        return (await self.levels.xp_data.get(GLOBAL_XP)).get(MEMBER)
+
+    async def test_seeded_guilds_before_global(self):
+        for guild_id in (1, 2):
+            self.assertEqual((await self.levels.xp_data.get(guild_id)).get(MEMBER), (1000, 10))
+        self.assertEqual(await self.global_xp(), (1000, 10))
+
+    async def test_global_before_seeded_guilds(self):
+        self.assertEqual(await self.global_xp(), (1000, 10))
+        for guild_id in (1, 2):
+            await self.levels.xp_data.get(guild_id)
+        self.assertEqual(await self.global_xp(), (1000, 10))
+        self.assertEqual(self.bot.db.pending_count, 0)
+
+    async def test_xp_earned_after_seeding_is_counted(self):
+        await self.levels.xp_data.get(1)
+        store = await self.levels.xp_data.get(2)
+        store.add(MEMBER, 50, 1)
+        self.levels.save_xp_data(2, MEMBER)
+        await self.bot.db.flush()
+        self.levels.xp_data.evict_idle(now=float('inf'))
+        self.assertEqual(await self.global_xp(), (1050, 11))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Configuration d'automodération et d'anti-raid propre à chaque serveur"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from cogs.antiraid import AntiRaid
+from cogs.automod import AutoMod
+from tests.helpers import BenchBot
+
+LOGS_CHANNEL = 500  # Salon de logs de l'ancienne configuration globale, sur le serveur 1
+
+
+def fake_guild(guild_id):
+    channels = {LOGS_CHANNEL} if guild_id == 1 else set()
+    return SimpleNamespace(
+        id=guild_id, name=f"serveur{guild_id}",
+        get_channel=lambda channel_id: object() if channel_id in channels else None,
+        get_role=lambda role_id: None
+    )
+
+
+def fake_member(guild_id, user_id):
+    return SimpleNamespace(
+        id=user_id, guild=fake_guild(guild_id), name=f"membre{user_id}", mention=f"<@{user_id}>",
+        created_at=datetime(2020, 1, 1), joined_at=datetime.now(), display_avatar=SimpleNamespace(url=""),
+        default_avatar=None
+    )
+
+
+class GuildConfigTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.bot = BenchBot(self.directory.name, flush_interval=60)
+        self.bot.get_guild = fake_guild
+        await self.bot.db.connect()
+
+    async def asyncTearDown(self):
+        await self.bot.storage.close()
+        await self.bot.db.close()
+        os.chdir(self.origin)
+        self.directory.cleanup()
+
+    async def load_automod(self):
+        automod = AutoMod(self.bot)
+        await automod.cog_load()
+        return automod
+
+    async def test_automod_settings_are_per_guild(self):
+        automod = await self.load_automod()
+        config = await automod.settings.get(1)
+        config['enabled'] = False
+        automod.save_config(1, config, 'enabled')
+        await automod.cog_unload()
+        await self.bot.db.flush()
+
+        # Une nouvelle instance relit chaque serveur depuis son namespace
+        automod = await self.load_automod()
+        self.assertFalse((await automod.settings.get(1))['enabled'])
+        self.assertTrue((await automod.settings.get(2))['enabled'])
+        await automod.cog_unload()
+
+    async def test_legacy_config_keeps_only_the_guild_channels(self):
+        self.bot.db.put('config', 'automod', {'enabled': False, 'channels': {'logs': LOGS_CHANNEL, 'ignored': []}})
+        automod = await self.load_automod()
+
+        first, second = await automod.settings.get(1), await automod.settings.get(2)
+        self.assertEqual(first['channels']['logs'], LOGS_CHANNEL)
+        self.assertIsNone(second['channels']['logs'])
+        self.assertFalse(second['enabled'])
+        # Sections absentes de l'ancienne ligne : valeurs par défaut
+        self.assertTrue(second['filters']['spam']['enabled'])
+        await automod.cog_unload()
+
+    async def test_join_tracker_is_per_guild(self):
+        antiraid = AntiRaid(self.bot)
+        await antiraid.cog_load()
+        for user_id in range(4):
+            await antiraid.on_member_join(fake_member(1, user_id))
+            await antiraid.on_member_join(fake_member(2, 100 + user_id))
+
+        self.assertEqual(len(antiraid.join_tracker[1]), 4)
+        self.assertEqual([member.id for _, member in antiraid.join_tracker[2]], [100, 101, 102, 103])
+        self.assertFalse(antiraid.raid_guilds)
+
+        # Les joins de plus de 5 minutes quittent le tracker
+        antiraid.prune_joins(antiraid.join_tracker[1], datetime.now() + timedelta(minutes=6))
+        self.assertFalse(antiraid.join_tracker[1])
+        await antiraid.cog_unload()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""Journal d'écriture anticipée : reprise après un commit interrompu par un crash"""
+import os
+import tempfile
+import unittest
+
+from utils.journal import Journal
+
+
+def apply(state, record):
+    state[record['key']] = record['value']
+
+
+class TornJournalTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.directory.name, 'state.json')
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_records_after_a_torn_commit_are_replayed(self):
+        journal = Journal(self.snapshot_path)
+        journal.load({}, apply)
+        journal.append({'key': 'a', 'value': 1})
+        await journal.commit()
+        with open(journal.log_path, 'ab') as f:
+            f.write(b'1234abcd {"key": "b", "va')  # Crash au milieu du commit suivant
+
+        journal = Journal(self.snapshot_path)
+        self.assertEqual(journal.load({}, apply), {'a': 1})
+        journal.append({'key': 'c', 'value': 3})
+        await journal.commit()
+
+        self.assertEqual(Journal(self.snapshot_path).load({}, apply), {'a': 1, 'c': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Registre de l'économie : reprise après un commit interrompu par un crash"""
+import os
+import tempfile
+import unittest
+
+from utils.ledger import Ledger
+
+
+class TornSegmentTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ledger')
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def run_once(self, *amounts):
+        ledger = Ledger(self.path)
+        replay = ledger.open()
+        for amount in amounts:
+            ledger.append('earn', 1, 42, amount, amount)
+        await ledger.commit()
+        return ledger, replay
+
+    async def test_records_after_a_torn_commit_are_replayed(self):
+        await self.run_once(10)
+
+        # Crash pendant le premier commit du démarrage suivant : segment 2 réduit à une ligne tronquée
+        torn = os.path.join(self.path, f"{2:012d}.log")
+        with open(torn, 'wb') as f:
+            f.write(b'1234abcd {"seq": 2, "ti')
+
+        # Le démarrage d'après reprend le même nom de segment
+        ledger, replay = await self.run_once(20, 30)
+        self.assertEqual([record['seq'] for record in replay], [1])
+        self.assertEqual(ledger.segments()[-1], torn)
+
+        _, replay = await self.run_once()
+        self.assertEqual([record['seq'] for record in replay], [1, 2, 3])
+        self.assertEqual([record['amount'] for record in replay], [10, 20, 30])
+
+
+if __name__ == '__main__':
+    unittest.main()
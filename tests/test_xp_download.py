@@ -0,0 +1,66 @@
+"""Téléchargement du fichier de !xpimport : par morceaux, mémoire constante"""
+import os
+import tempfile
+import tracemalloc
+import unittest
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from cogs.levels import Levels
+from tests.helpers import BenchBot
+
+SIZE = 16 * 1024 * 1024
+CHUNK = b"0123456789abcdef" * 4096  # 64 Kio
+
+
+async def serve_file(request):
+    response = web.StreamResponse(headers={'Content-Length': str(SIZE)})
+    await response.prepare(request)
+    for _ in range(SIZE // len(CHUNK)):
+        await response.write(CHUNK)
+    await response.write_eof()
+    return response
+
+
+class DownloadAttachmentTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.bot = BenchBot(self.directory.name, flush_interval=60)
+        self.levels = Levels(self.bot)
+
+        app = web.Application()
+        app.router.add_get('/xp.ndjson', serve_file)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.attachment = SimpleNamespace(url=f"http://127.0.0.1:{port}/xp.ndjson")
+
+    async def asyncTearDown(self):
+        await self.levels.download_session.close()
+        await self.runner.cleanup()
+        await self.bot.storage.close()
+        self.directory.cleanup()
+
+    async def test_download_streams_to_disk(self):
+        path = os.path.join(self.directory.name, 'xp.ndjson')
+        await self.levels.download_attachment(self.attachment, path)
+        self.assertEqual(os.path.getsize(path), SIZE)
+        session = self.levels.download_session
+
+        # Deuxième import : même session, et le fichier n'est jamais entier en mémoire
+        tracemalloc.start()
+        try:
+            await self.levels.download_attachment(self.attachment, path)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertIs(self.levels.download_session, session)
+        self.assertEqual(os.path.getsize(path), SIZE)
+        self.assertLess(peak, SIZE // 4)  # Serveur de test compris, environ 1,5 Mio quelle que soit la taille
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Limites des tableaux de XPStore et fusion des nouveaux membres à l'instantané"""
+import unittest
+
+from utils.xpstore import MAX_MESSAGES, MAX_XP, XPStore
+
+
+class XPStoreLimitsTest(unittest.TestCase):
+    def setUp(self):
+        self.store = XPStore.from_records({'1': {'xp': 100, 'messages': 2}})
+
+    def test_values_above_limits_are_clamped(self):
+        self.store.set(1, 10 ** 20, 10 ** 12)  # Membre déjà dans les tableaux
+        self.store.set(2, 10 ** 20)  # Nouveau membre
+        self.store.add(2, 10 ** 20, 10 ** 12)
+        self.store.add(3, -50)
+        self.assertEqual(self.store.get(1), (MAX_XP, MAX_MESSAGES))
+        self.assertEqual(self.store.get(2), (MAX_XP, MAX_MESSAGES))
+        self.assertEqual(self.store.get(3), (0, 0))
+        restored = XPStore.from_buffer(self.store.serialize(0.0))
+        self.assertEqual(restored.get(2), (MAX_XP, MAX_MESSAGES))
+
+    def test_serialize_merges_new_members_into_arrays(self):
+        for user_id in (5, 0, 3):
+            self.store.add(user_id, 10, 1)
+        data = self.store.serialize(0.0)
+        self.assertEqual(self.store._extra, {})
+        self.assertEqual(list(self.store._ids), [0, 1, 3, 5])
+        self.assertEqual(self.store.add(3, 5), 15)  # Désormais dans les tableaux
+        self.assertEqual(XPStore.from_buffer(data).get(3), (10, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
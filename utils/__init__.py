@@ -0,0 +1 @@
+"""Utilitaires partagés par le bot et les cogs (persistance, stockage, structures de données)"""
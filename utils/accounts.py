@@ -0,0 +1,96 @@
+"""Comptes de l'économie : attributs compacts et valeurs par défaut partagées.
+
+Un compte est un objet à `__slots__` (~140 octets) au lieu d'un dict avec
+un dict de statistiques, un inventaire et des effets imbriqués (plus d'un
+kilo-octet). Les statistiques sont des attributs comme les autres ;
+l'inventaire et les effets actifs pointent vers un dict vide partagé en
+lecture seule jusqu'à la première écriture (copie à l'écriture).
+
+L'accès reste celui d'un dict (`compte['balance']`) :
+    compte['inventory']        dict modifiable du compte (créé au besoin)
+    compte.get('inventory')    vue en lecture seule, ne crée rien
+
+En base, seuls le solde et les champs différents des valeurs par défaut
+sont écrits :
+    {"balance": 1250, "daily_streak": 3, "last_daily": "2024-06-01T12:00:00", "ledger_seq": 42}
+Les anciens enregistrements (statistiques dans "stats") restent lisibles.
+"""
+from types import MappingProxyType
+
+STATS = ('total_earned', 'total_spent', 'work_count', 'gamble_wins', 'gamble_losses')
+SCALARS = ('balance', 'bank', 'daily_streak', 'ledger_seq') + STATS
+DATES = ('last_daily', 'last_work')
+CONTAINERS = ('inventory', 'active_effects')
+FIELDS = frozenset(SCALARS + DATES + CONTAINERS)
+
+OPTIONAL = SCALARS[1:] + DATES + CONTAINERS  # Écrits en base seulement s'ils ne sont pas vides
+EMPTY = MappingProxyType({})
+
+
+class Account:
+    """Compte d'un membre sur un serveur"""
+
+    __slots__ = SCALARS + DATES + CONTAINERS
+
+    def __init__(self, balance=0):
+        self.balance = balance
+        self.bank = self.daily_streak = self.ledger_seq = 0
+        self.total_earned = self.total_spent = self.work_count = self.gamble_wins = self.gamble_losses = 0
+        self.last_daily = self.last_work = None
+        self.inventory = self.active_effects = None  # None : dict vide partagé (EMPTY)
+
+    @classmethod
+    def from_record(cls, record):
+        """Compte depuis un enregistrement en base (nouveau format ou ancien dict complet)"""
+        account = cls(record.get('balance') or 0)
+        stats = record.get('stats')
+        if stats:
+            record = {**stats, **record}
+        for field in OPTIONAL:
+            value = record.get(field)
+            if value:
+                setattr(account, field, value)
+        return account
+
+    def to_record(self):
+        """Enregistrement compact : le solde et les champs non vides seulement"""
+        record = {'balance': self.balance}
+        for field in OPTIONAL:
+            value = getattr(self, field)
+            if value:
+                record[field] = value
+        return record
+
+    def is_pristine(self, starting_amount):
+        """Vrai si le compte n'a jamais servi (solde de départ, rien d'autre)"""
+        return self.to_record() == {'balance': starting_amount}
+
+    def __getitem__(self, field):
+        if field not in FIELDS:
+            raise KeyError(field)
+        value = getattr(self, field)
+        if value is None and field in CONTAINERS:
+            # Copie à l'écriture : l'appelant reçoit un dict propre au compte
+            value = {}
+            setattr(self, field, value)
+        return value
+
+    def __setitem__(self, field, value):
+        if field not in FIELDS:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field):
+        return field in FIELDS
+
+    def get(self, field, default=None):
+        """Lecture sans effet de bord (inventaire et effets en lecture seule)"""
+        if field not in FIELDS:
+            return default
+        value = getattr(self, field)
+        if field in CONTAINERS:
+            return EMPTY if value is None else MappingProxyType(value)
+        return value
+
+    def __repr__(self):
+        return f"Account({self.to_record()!r})"
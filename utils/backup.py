@@ -0,0 +1,395 @@
+"""Sauvegardes incrémentales dédupliquées (stockage adressé par contenu).
+
+Chaque fichier est découpé en morceaux identifiés par leur SHA-256 ; un morceau
+déjà présent dans le magasin n'est jamais réécrit. Les coupures sont choisies
+par une empreinte glissante sur le contenu (et non sur les lignes) : JSON
+compact et msgpack se découpent comme du JSON indenté, et une insertion ne
+décale que le morceau qui la contient. Une sauvegarde est un simple
+manifeste listant les morceaux de chaque fichier : son coût dépend des
+modifications de la journée, pas de la taille totale des données.
+
+Utilisation :
+    python -m utils.backup list
+    python -m utils.backup verify <sauvegarde>
+    python -m utils.backup restore <sauvegarde> [--target DOSSIER] [--file FICHIER]
+    python -m utils.backup restore --at "2024-01-15 12:00" [--target DOSSIER]
+    python -m utils.backup gc [--days 7]
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+
+from utils.codec import read_file
+from utils.persistence import atomic_write, encode_json
+
+try:
+    import zstandard
+except ImportError:  # zstd optionnel, gzip sinon
+    zstandard = None
+
+try:
+    import numpy as np
+except ImportError:  # Empreintes calculées en Python pur, mêmes coupures
+    np = None
+
+logger = logging.getLogger('discord_bot.backup')
+
+# Découpage défini par le contenu (Gear hash, comme FastCDC) : l'empreinte d'une
+# position ne dépend que des 32 octets qui la précèdent ; on coupe quand ses bits
+# de poids fort masqués sont à 0, soit des morceaux d'environ 5 Kio en moyenne.
+# Une insertion ne déplace que les coupures du morceau modifié.
+MIN_CHUNK_SIZE = 1024
+MAX_CHUNK_SIZE = 64 * 1024
+HASH_WINDOW = 32
+BOUNDARY_MASK = ((1 << 12) - 1) << (HASH_WINDOW - 12)
+# Table fixe (les coupures doivent rester identiques d'une version à l'autre)
+GEAR = tuple(int.from_bytes(hashlib.sha256(bytes([value])).digest()[:4], 'little') for value in range(256))
+SCAN_BLOCK = 4 * 1024 * 1024  # Octets traités à la fois par NumPy (~12 octets de mémoire par octet)
+
+# Découpage fixe pour les bases de données (aligné sur les pages SQLite)
+BLOCK_SIZE = 64 * 1024
+BINARY_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# Fichiers de données sauvegardés (relatifs à la racine du bot)
+DATA_PATTERNS = ('*.json', '*.json.log', 'data/**/*')
+# Les bases SQLite sont copiées via leur API de sauvegarde, jamais lues directement ;
+# les instantanés XP (.xpa) se reconstruisent depuis la base
+EXCLUDED_SUFFIXES = ('.tmp', '-wal', '-shm', '-journal', '.xpa') + BINARY_EXTENSIONS
+# Caches retéléchargeables (avatars des cartes de rang)
+EXCLUDED_DIRS = (os.path.join('data', 'cards') + os.sep,)
+
+CODECS = {'gz': (lambda data: gzip.compress(data, compresslevel=6), gzip.decompress)}
+if zstandard is not None:
+    CODECS['zst'] = (
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data)
+    )
+DEFAULT_CODEC = 'zst' if zstandard is not None else 'gz'
+
+
+class BackupError(Exception):
+    """Sauvegarde introuvable, incomplète ou corrompue"""
+
+
+def collect_data_files(root='.'):
+    """Liste les fichiers de données à sauvegarder (chemins relatifs)"""
+    files = set()
+    for pattern in DATA_PATTERNS:
+        for path in glob.glob(os.path.join(root, pattern), recursive=True):
+            relative = os.path.relpath(path, root)
+            if os.path.isfile(path) and not path.endswith(EXCLUDED_SUFFIXES) and not relative.startswith(EXCLUDED_DIRS):
+                files.add(relative)
+    return sorted(files)
+
+
+def _boundaries_numpy(data):
+    """Positions (fin exclue) où l'empreinte glissante vaut 0 sous le masque"""
+    gear = np.array(GEAR, dtype=np.uint32)
+    for offset in range(0, len(data), SCAN_BLOCK):
+        # Les 31 octets précédents complètent la fenêtre de la première position du bloc
+        context = min(offset, HASH_WINDOW - 1)
+        values = gear[np.frombuffer(data, dtype=np.uint8, count=min(SCAN_BLOCK, len(data) - offset) + context,
+                                    offset=offset - context)]
+        # Somme des GEAR[octet] << âge sur la fenêtre, par doublements (5 passes au lieu de 31)
+        hashes = values
+        width = 1
+        while width < HASH_WINDOW:
+            shifted = np.zeros_like(hashes)
+            shifted[width:] = hashes[:-width] << np.uint32(width)
+            hashes = hashes + shifted
+            width *= 2
+        yield from (np.flatnonzero((hashes[context:] & np.uint32(BOUNDARY_MASK)) == 0) + offset + 1).tolist()
+
+
+def _split_numpy(data):
+    start = 0
+    for position in _boundaries_numpy(data):
+        while position - start > MAX_CHUNK_SIZE:
+            yield start, start + MAX_CHUNK_SIZE
+            start += MAX_CHUNK_SIZE
+        if position - start >= MIN_CHUNK_SIZE:
+            yield start, position
+            start = position
+    while len(data) - start > MAX_CHUNK_SIZE:
+        yield start, start + MAX_CHUNK_SIZE
+        start += MAX_CHUNK_SIZE
+    if start < len(data):
+        yield start, len(data)
+
+
+def _split_python(data):
+    start = 0
+    while len(data) - start > MIN_CHUNK_SIZE:
+        end = min(start + MAX_CHUNK_SIZE, len(data))
+        cut = end
+        # Les positions avant MIN_CHUNK_SIZE ne peuvent pas couper : seule la fenêtre qui les précède compte
+        fingerprint = 0
+        for position in range(start + MIN_CHUNK_SIZE - HASH_WINDOW, end):
+            fingerprint = ((fingerprint << 1) + GEAR[data[position]]) & 0xFFFFFFFF
+            if fingerprint & BOUNDARY_MASK == 0 and position + 1 - start >= MIN_CHUNK_SIZE:
+                cut = position + 1
+                break
+        yield start, cut
+        start = cut
+    if start < len(data):
+        yield start, len(data)
+
+
+def split_chunks(data, binary=False):
+    """Découpe des octets en morceaux (blocs fixes pour les bases, sinon selon le contenu)"""
+    if binary:
+        for start in range(0, len(data), BLOCK_SIZE):
+            yield data[start:start + BLOCK_SIZE]
+        return
+
+    for start, end in (_split_numpy if np is not None else _split_python)(data):
+        yield data[start:end]
+
+
+class BackupStore:
+    """Magasin de sauvegardes : backups/chunks/<xx>/<sha256>.<codec> + backups/manifests/<nom>.json
+
+    Toutes les méthodes sont bloquantes : le bot les exécute sur son thread d'E/S.
+    """
+
+    def __init__(self, root='backups', codec=DEFAULT_CODEC):
+        self.root = root
+        self.codec = codec
+        self.chunks_dir = os.path.join(root, 'chunks')
+        self.manifests_dir = os.path.join(root, 'manifests')
+
+    # --- Morceaux ---
+
+    def _chunk_path(self, digest, codec):
+        return os.path.join(self.chunks_dir, digest[:2], f"{digest}.{codec}")
+
+    def _find_chunk(self, digest):
+        for codec in CODECS:
+            path = self._chunk_path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def _store_chunk(self, chunk):
+        """Stocke un morceau s'il est nouveau, renvoie (sha256, octets écrits)"""
+        digest = hashlib.sha256(chunk).hexdigest()
+        path, _ = self._find_chunk(digest)
+        if path is not None:
+            return digest, 0
+
+        compress, _ = CODECS[self.codec]
+        data = compress(chunk)
+        atomic_write(self._chunk_path(digest, self.codec), data)
+        return digest, len(data)
+
+    def _read_chunk(self, digest):
+        path, codec = self._find_chunk(digest)
+        if path is None:
+            raise BackupError(f"Morceau manquant: {digest}")
+
+        with open(path, 'rb') as f:
+            _, decompress = CODECS[codec]
+            chunk = decompress(f.read())
+
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise BackupError(f"Morceau corrompu: {digest}")
+        return chunk
+
+    # --- Sauvegardes ---
+
+    def create(self, files, metadata=None, name=None):
+        """Sauvegarde des fichiers ; files : {nom dans la sauvegarde: chemin source}"""
+        started = time.time()
+        name = name or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        manifest = {
+            'name': name,
+            'created': started,
+            'codec': self.codec,
+            'metadata': metadata or {},
+            'files': {}
+        }
+        stats = {'files': 0, 'total_bytes': 0, 'chunks': 0, 'new_chunks': 0, 'stored_bytes': 0}
+
+        for archive_name, source in sorted(files.items()):
+            try:
+                with open(source, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+
+            chunks = []
+            for chunk in split_chunks(data, binary=archive_name.endswith(BINARY_EXTENSIONS)):
+                digest, written = self._store_chunk(chunk)
+                chunks.append(digest)
+                stats['chunks'] += 1
+                if written:
+                    stats['new_chunks'] += 1
+                    stats['stored_bytes'] += written
+
+            manifest['files'][archive_name] = {
+                'size': len(data),
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'chunks': chunks
+            }
+            stats['files'] += 1
+            stats['total_bytes'] += len(data)
+
+        stats['duration'] = round(time.time() - started, 3)
+        manifest['stats'] = stats
+        atomic_write(os.path.join(self.manifests_dir, f"{name}.json"), encode_json(manifest))
+        return manifest
+
+    def list_manifests(self):
+        """Manifestes du plus ancien au plus récent"""
+        manifests = []
+        for path in glob.glob(os.path.join(self.manifests_dir, '*.json')):
+            try:
+                manifests.append(read_file(path))
+            except Exception as e:
+                logger.error(f"❌ Manifeste illisible {path}: {e}")
+        return sorted(manifests, key=lambda m: m['created'])
+
+    def load_manifest(self, name):
+        try:
+            return read_file(os.path.join(self.manifests_dir, f"{name}.json"))
+        except FileNotFoundError:
+            raise BackupError(f"Sauvegarde introuvable: {name}")
+
+    def find_at(self, when):
+        """Dernière sauvegarde effectuée avant une date (restauration à un instant donné)"""
+        candidates = [m for m in self.list_manifests() if m['created'] <= when.timestamp()]
+        if not candidates:
+            raise BackupError(f"Aucune sauvegarde antérieure au {when:%d/%m/%Y %H:%M}")
+        return candidates[-1]
+
+    def _assemble(self, entry):
+        data = b''.join(self._read_chunk(digest) for digest in entry['chunks'])
+        if len(data) != entry['size'] or hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise BackupError("Contenu reconstitué différent de l'original")
+        return data
+
+    def verify(self, name):
+        """Vérifie que chaque fichier d'une sauvegarde se reconstitue à l'identique"""
+        manifest = self.load_manifest(name)
+        errors = {}
+        for archive_name, entry in manifest['files'].items():
+            try:
+                self._assemble(entry)
+            except BackupError as e:
+                errors[archive_name] = str(e)
+        return errors
+
+    def restore(self, name, target='.', only=None):
+        """Restaure une sauvegarde (vérifiée) dans un dossier, renvoie les fichiers écrits"""
+        manifest = self.load_manifest(name)
+        entries = manifest['files']
+        if only:
+            entries = {n: e for n, e in entries.items() if n in only}
+
+        # Tout reconstituer et vérifier avant d'écrire le moindre fichier
+        restored = {archive_name: self._assemble(entry) for archive_name, entry in entries.items()}
+        for archive_name, data in restored.items():
+            atomic_write(os.path.join(target, archive_name), data)
+        return sorted(restored)
+
+    def gc(self, retention_days, keep_min=1):
+        """Supprime les sauvegardes expirées puis les morceaux qui ne sont plus référencés"""
+        manifests = self.list_manifests()
+        cutoff = time.time() - retention_days * 86400
+        # Toujours garder les `keep_min` sauvegardes les plus récentes
+        candidates = manifests[:-keep_min] if keep_min else manifests
+        expired = [m for m in candidates if m['created'] < cutoff]
+
+        for manifest in expired:
+            os.remove(os.path.join(self.manifests_dir, f"{manifest['name']}.json"))
+
+        expired_names = {m['name'] for m in expired}
+        referenced = set()
+        for manifest in manifests:
+            if manifest['name'] not in expired_names:
+                for entry in manifest['files'].values():
+                    referenced.update(entry['chunks'])
+
+        chunks_deleted = 0
+        bytes_freed = 0
+        for path in glob.glob(os.path.join(self.chunks_dir, '*', '*')):
+            digest = os.path.basename(path).split('.', 1)[0]
+            if digest not in referenced:
+                bytes_freed += os.path.getsize(path)
+                os.remove(path)
+                chunks_deleted += 1
+
+        return len(expired), chunks_deleted, bytes_freed
+
+    def disk_usage(self):
+        """Taille totale du magasin (octets, nombre de morceaux)"""
+        total = 0
+        count = 0
+        for path in glob.glob(os.path.join(self.chunks_dir, '*', '*')):
+            total += os.path.getsize(path)
+            count += 1
+        return total, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestion des sauvegardes incrémentales du bot")
+    parser.add_argument('--root', default='backups', help="Dossier des sauvegardes")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help="Lister les sauvegardes")
+
+    verify_parser = subparsers.add_parser('verify', help="Vérifier une sauvegarde")
+    verify_parser.add_argument('name')
+
+    restore_parser = subparsers.add_parser('restore', help="Restaurer une sauvegarde")
+    restore_parser.add_argument('name', nargs='?')
+    restore_parser.add_argument('--at', help="Restaurer l'état à une date (AAAA-MM-JJ HH:MM)")
+    restore_parser.add_argument('--target', default='restore', help="Dossier de destination")
+    restore_parser.add_argument('--file', action='append', help="Ne restaurer que ce fichier")
+
+    gc_parser = subparsers.add_parser('gc', help="Supprimer les sauvegardes expirées")
+    gc_parser.add_argument('--days', type=int, default=7)
+
+    args = parser.parse_args()
+    store = BackupStore(args.root)
+
+    try:
+        if args.command == 'list':
+            for manifest in store.list_manifests():
+                stats = manifest['stats']
+                print(f"{manifest['name']}  {stats['files']} fichiers  "
+                      f"{stats['total_bytes']:,} octets  +{stats['stored_bytes']:,} octets stockés")
+
+        elif args.command == 'verify':
+            errors = store.verify(args.name)
+            for archive_name, error in errors.items():
+                print(f"❌ {archive_name}: {error}")
+            print("✅ Sauvegarde intègre" if not errors else f"❌ {len(errors)} fichier(s) invalide(s)")
+            raise SystemExit(1 if errors else 0)
+
+        elif args.command == 'restore':
+            if args.at:
+                name = store.find_at(datetime.strptime(args.at, "%Y-%m-%d %H:%M"))['name']
+            elif args.name:
+                name = args.name
+            else:
+                parser.error("indiquer une sauvegarde ou --at")
+            restored = store.restore(name, args.target, only=args.file)
+            print(f"✅ {len(restored)} fichier(s) de {name} restauré(s) dans {args.target}/")
+
+        elif args.command == 'gc':
+            manifests, chunks, freed = store.gc(args.days)
+            print(f"🧹 {manifests} sauvegarde(s) et {chunks} morceau(x) supprimés ({freed:,} octets libérés)")
+
+    except BackupError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
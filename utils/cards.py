@@ -0,0 +1,231 @@
+"""Cartes de rang en image (Pillow), rendues dans un pool de processus.
+
+Le dessin est du calcul pur : il tourne dans des processus séparés, jamais
+sur la boucle d'événements. Les avatars sont téléchargés par une session
+HTTP partagée et gardés en cache (LRU en mémoire + fichiers dans
+data/cards/avatars). Une carte rendue est gardée en mémoire tant que son
+contenu visible (niveau, pourcentage, rang, pseudo, avatar) ne change pas.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow absent : les commandes gardent leur affichage texte
+    Image = None
+
+logger = logging.getLogger('discord_bot.cards')
+
+CARD_SIZE = (934, 282)
+AVATAR_SIZE = 180
+BACKGROUND = (35, 39, 42)
+TRACK = (72, 75, 78)
+TEXT = (255, 255, 255)
+MUTED = (185, 187, 190)
+
+_fonts = {}
+
+
+def _font(size):
+    """Police mise en cache par processus (DejaVu si présente, sinon police intégrée de Pillow)"""
+    font = _fonts.get(size)
+    if font is None:
+        try:
+            font = ImageFont.truetype('DejaVuSans.ttf', size)
+        except OSError:
+            font = ImageFont.load_default(size=size)
+        _fonts[size] = font
+    return font
+
+
+def _circle_avatar(avatar):
+    size = AVATAR_SIZE
+    if avatar:
+        try:
+            image = Image.open(io.BytesIO(avatar)).convert('RGBA').resize((size, size))
+        except OSError:
+            image = None
+    else:
+        image = None
+    if image is None:
+        image = Image.new('RGBA', (size, size), TRACK)
+
+    mask = Image.new('L', (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size - 1, size - 1), fill=255)
+    image.putalpha(mask)
+    return image
+
+
+def render_rank_card(card, avatar):
+    """Dessine une carte de rang, renvoie le PNG (exécuté dans un processus du pool).
+
+    `card` : {'name', 'level', 'percent', 'rank', 'color'} ; `avatar` : octets
+    de l'image ou None.
+    """
+    width, height = CARD_SIZE
+    image = Image.new('RGBA', CARD_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    color = tuple(card['color'])
+
+    margin = (height - AVATAR_SIZE) // 2
+    circle = _circle_avatar(avatar)
+    image.paste(circle, (margin, margin), circle)
+    draw.ellipse(
+        (margin - 4, margin - 4, margin + AVATAR_SIZE + 4, margin + AVATAR_SIZE + 4), outline=color, width=4
+    )
+
+    left = margin * 2 + AVATAR_SIZE
+    right = width - margin
+    draw.text((left, 60), card['name'][:24], font=_font(40), fill=TEXT)
+
+    rank = f"#{card['rank']}" if card['rank'] else "N/A"
+    status = f"RANG {rank}   NIVEAU {card['level']}"
+    draw.text((right, 68), status, font=_font(30), fill=color, anchor='ra')
+
+    # Barre de progression vers le niveau suivant
+    bar_top, bar_bottom = 170, 210
+    radius = (bar_bottom - bar_top) // 2
+    draw.rounded_rectangle((left, bar_top, right, bar_bottom), radius=radius, fill=TRACK)
+    filled = left + (right - left) * min(card['percent'], 100) / 100
+    if filled - left >= radius * 2:
+        draw.rounded_rectangle((left, bar_top, filled, bar_bottom), radius=radius, fill=color)
+    draw.text((right, bar_top - 10), f"{card['percent']}%", font=_font(26), fill=MUTED, anchor='rb')
+
+    output = io.BytesIO()
+    image.convert('RGB').save(output, format='PNG', optimize=False)
+    return output.getvalue()
+
+
+class LRUCache:
+    """Cache clé → valeur borné en nombre d'entrées (la plus ancienne utilisée sort)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def nbytes(self):
+        return sum(len(value) for value in self._data.values())
+
+
+class CardRenderer:
+    """Rendu des cartes : pool de processus, session HTTP partagée et caches d'avatars et de cartes"""
+
+    def __init__(self, storage, cache_dir='data/cards', workers=2, avatar_cache_size=256, card_cache_size=512):
+        self.storage = storage
+        self.avatar_dir = os.path.join(cache_dir, 'avatars')
+        self.workers = workers
+        self.avatars = LRUCache(avatar_cache_size)
+        self.cards = LRUCache(card_cache_size)
+        self._pool = None
+        self._session = None
+
+        # Statistiques
+        self.hits = 0
+        self.renders = 0
+        self.render_time = 0.0
+        self.avatar_downloads = 0
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn : pas de copie de la boucle ni des threads du bot dans les processus de rendu
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+
+    def session(self):
+        """Session HTTP partagée (créée au premier téléchargement)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        return self._session
+
+    async def avatar(self, user):
+        """Avatar 256 px d'un utilisateur : mémoire, puis disque, puis CDN Discord (None si indisponible)"""
+        asset = user.display_avatar
+        key = asset.key
+        data = self.avatars.get(key)
+        if data is not None:
+            return data
+
+        path = os.path.join(self.avatar_dir, f"{key}.png")
+        try:
+            data = await self.storage.run(_read_bytes, path)
+        except FileNotFoundError:
+            try:
+                async with self.session().get(asset.replace(size=256, format='png').url) as response:
+                    response.raise_for_status()
+                    data = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️ Avatar de {user} indisponible: {e}")
+                return None
+            self.avatar_downloads += 1
+            self.storage.save_soon(path, data, encoder=bytes)
+
+        self.avatars.put(key, data)
+        return data
+
+    async def render(self, func, key, card, avatar):
+        """Rend une carte dans le pool (ou la sert depuis le cache), renvoie le PNG"""
+        data = self.cards.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self._executor(), func, card, avatar)
+        self.renders += 1
+        self.render_time += time.perf_counter() - started
+        self.cards.put(key, data)
+        return data
+
+    async def rank_card(self, member, level, percent, rank, color):
+        """Carte de rang d'un membre (PNG), mise en cache par contenu affiché"""
+        key = ('rank', member.id, member.display_avatar.key, member.display_name, level, percent, rank, color)
+        data = self.cards.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        card = {'name': member.display_name, 'level': level, 'percent': percent, 'rank': rank,
+                'color': ((color >> 16) & 0xff, (color >> 8) & 0xff, color & 0xff)}
+        return await self.render(render_rank_card, key, card, await self.avatar(member))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,160 @@
+"""Sérialisation des fichiers d'état du bot.
+
+Formats disponibles :
+    json          JSON indenté, lisible et modifiable à la main (par défaut)
+    json-compact  JSON sans indentation
+    msgpack       binaire compact (module `msgpack` requis)
+
+Compression optionnelle : zlib, ou zstd si le module `zstandard` est installé.
+orjson est utilisé automatiquement quand il est installé.
+
+Les fichiers binaires ou compressés commencent par un en-tête (MAGIC + format
++ compression) ; un fichier sans en-tête est lu comme du JSON. Le format est
+donc détecté à la lecture et les anciens fichiers restent lisibles quel que
+soit le codec configuré.
+"""
+import json
+import logging
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger('discord_bot.codec')
+
+MAGIC = b'NZC1'  # Jamais un début de JSON valide
+FORMAT_IDS = {'json': 0, 'json-compact': 1, 'msgpack': 2}
+COMPRESSION_IDS = {None: 0, 'zlib': 1, 'zstd': 2}
+
+
+class CodecError(Exception):
+    """Format inconnu ou dépendance manquante"""
+
+
+def dumps_json(data, indent=False):
+    """JSON en UTF-8 (orjson si disponible, sinon la bibliothèque standard)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(data, option=option)
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # Entiers > 64 bits, clés mixtes... : la bibliothèque standard les gère
+
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads_json(raw):
+    """Lit du JSON depuis des octets ou une chaîne"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+    return json.loads(raw)
+
+
+def _compress(data, compression):
+    if compression == 'zlib':
+        return zlib.compress(data, 1)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decompress(data, compression):
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise CodecError("Fichier compressé avec zstd mais le module zstandard n'est pas installé")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def decode(raw):
+    """Désérialise des octets en détectant leur format"""
+    if not raw.startswith(MAGIC):
+        return loads_json(raw)
+
+    format_id, compression_id = raw[len(MAGIC)], raw[len(MAGIC) + 1]
+    try:
+        format_name = next(name for name, value in FORMAT_IDS.items() if value == format_id)
+        compression = next(name for name, value in COMPRESSION_IDS.items() if value == compression_id)
+    except StopIteration:
+        raise CodecError(f"En-tête inconnu (format {format_id}, compression {compression_id})")
+
+    payload = _decompress(raw[len(MAGIC) + 2:], compression)
+    if format_name == 'msgpack':
+        if msgpack is None:
+            raise CodecError("Fichier msgpack mais le module msgpack n'est pas installé")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    return loads_json(payload)
+
+
+def read_file(path):
+    """Lit et désérialise un fichier d'état (tout format)"""
+    with open(path, 'rb') as f:
+        return decode(f.read())
+
+
+class Codec:
+    """Sérialiseur configurable pour les fichiers d'état"""
+
+    def __init__(self, format='json', compression=None):
+        if format not in FORMAT_IDS:
+            raise CodecError(f"Format inconnu: {format}")
+        if compression not in COMPRESSION_IDS:
+            raise CodecError(f"Compression inconnue: {compression}")
+        if format == 'msgpack' and msgpack is None:
+            raise CodecError("Le format msgpack nécessite le module msgpack")
+        if compression == 'zstd' and zstandard is None:
+            raise CodecError("La compression zstd nécessite le module zstandard")
+
+        self.format = format
+        self.compression = compression
+
+    @classmethod
+    def from_config(cls, config):
+        """Crée le codec de la section `persistence` (repli sur JSON si indisponible)"""
+        try:
+            return cls(config.get('codec', 'json'), config.get('compression'))
+        except CodecError as e:
+            logger.warning(f"⚠️ {e}, utilisation du JSON par défaut")
+            return cls()
+
+    def describe(self):
+        name = self.format
+        if self.format != 'msgpack' and orjson is not None:
+            name += " (orjson)"
+        if self.compression:
+            name += f" + {self.compression}"
+        return name
+
+    def encode(self, data):
+        """Sérialise des données selon le format configuré"""
+        if self.format == 'msgpack':
+            payload = msgpack.packb(data, use_bin_type=True)
+        else:
+            payload = dumps_json(data, indent=self.format == 'json')
+
+        # JSON non compressé : pas d'en-tête, le fichier reste lisible
+        if self.format != 'msgpack' and self.compression is None:
+            return payload
+
+        header = MAGIC + bytes([FORMAT_IDS[self.format], COMPRESSION_IDS[self.compression]])
+        return header + _compress(payload, self.compression)
+
+    decode = staticmethod(decode)
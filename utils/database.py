@@ -0,0 +1,453 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.codec import dumps_json, loads_json
+
+logger = logging.getLogger('discord_bot.database')
+
+_DELETED = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+def encode_value(value):
+    """Sérialise une valeur d'enregistrement (JSON compact).
+
+    Un objet compact en mémoire (compte d'économie...) fournit sa forme
+    enregistrable via `to_record()`, appelée au flush : une écriture
+    programmée sérialise toujours l'état le plus récent.
+    """
+    if hasattr(value, 'to_record'):
+        value = value.to_record()
+    return dumps_json(value).decode('utf-8')
+
+
+def decode_value(text):
+    """Désérialise une valeur d'enregistrement"""
+    return loads_json(text)
+
+
+class SQLiteBackend:
+    """Backend SQLite mono-nœud : toutes les requêtes passent par un thread dédié"""
+
+    def __init__(self, path='bot_data.db'):
+        self.path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+
+    def describe(self):
+        return f"SQLite ({self.path})"
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    async def connect(self):
+        await self._call(self._connect)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        await self._call(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _fetch_namespace(self, namespace):
+        cursor = self._conn.execute(
+            "SELECT key, value FROM records WHERE namespace = ?", (namespace,)
+        )
+        return cursor.fetchall()
+
+    async def fetch_namespace(self, namespace):
+        return await self._call(self._fetch_namespace, namespace)
+
+    def _fetch_namespace_since(self, namespace, since):
+        cursor = self._conn.execute(
+            "SELECT key, value FROM records WHERE namespace = ? AND updated_at >= ?", (namespace, since)
+        )
+        return cursor.fetchall()
+
+    async def fetch_namespace_since(self, namespace, since):
+        return await self._call(self._fetch_namespace_since, namespace, since)
+
+    def _scan_namespace(self, namespace, after, limit):
+        cursor = self._conn.execute(
+            "SELECT key, value FROM records WHERE namespace = ? AND key > ? ORDER BY key LIMIT ?",
+            (namespace, after, limit)
+        )
+        return cursor.fetchall()
+
+    async def scan_namespace(self, namespace, after, limit):
+        return await self._call(self._scan_namespace, namespace, after, limit)
+
+    def _fetch_many(self, namespace, keys):
+        placeholders = ", ".join("?" * len(keys))
+        cursor = self._conn.execute(
+            f"SELECT key, value FROM records WHERE namespace = ? AND key IN ({placeholders})", (namespace, *keys)
+        )
+        return cursor.fetchall()
+
+    async def fetch_many(self, namespace, keys):
+        return await self._call(self._fetch_many, namespace, keys)
+
+    def _fetch(self, namespace, key):
+        row = self._conn.execute(
+            "SELECT value FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return row[0] if row else None
+
+    async def fetch(self, namespace, key):
+        return await self._call(self._fetch, namespace, key)
+
+    def _count(self, namespace):
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM records WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0]
+
+    async def count(self, namespace):
+        return await self._call(self._count, namespace)
+
+    def _namespaces(self, prefix):
+        cursor = self._conn.execute(
+            "SELECT DISTINCT namespace FROM records WHERE substr(namespace, 1, ?) = ?", (len(prefix), prefix)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    async def namespaces(self, prefix):
+        return await self._call(self._namespaces, prefix)
+
+    def _write_batch(self, upserts, deletes):
+        now = time.time()
+        with self._conn:
+            if upserts:
+                self._conn.executemany(
+                    "INSERT INTO records (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    [(namespace, key, value, now) for namespace, key, value in upserts]
+                )
+            if deletes:
+                self._conn.executemany(
+                    "DELETE FROM records WHERE namespace = ? AND key = ?", deletes
+                )
+
+    async def write_batch(self, upserts, deletes):
+        await self._call(self._write_batch, upserts, deletes)
+
+    def _backup(self, target_path):
+        target = sqlite3.connect(target_path)
+        try:
+            self._conn.backup(target)
+        finally:
+            target.close()
+
+    async def backup(self, target_path):
+        """Copie cohérente de la base (API de sauvegarde SQLite) pendant que le bot tourne"""
+        await self._call(self._backup, target_path)
+        return True
+
+
+class PostgresBackend:
+    """Backend PostgreSQL (asyncpg) pour les déploiements multi-nœuds"""
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self._pool = None
+
+    def describe(self):
+        return "PostgreSQL (asyncpg)"
+
+    async def connect(self):
+        import asyncpg
+
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=5)
+        async with self._pool.acquire() as conn:
+            await conn.execute(SCHEMA.replace("value TEXT", "value JSONB").replace("updated_at REAL", "updated_at DOUBLE PRECISION"))
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def fetch_namespace(self, namespace):
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch("SELECT key, value::text FROM records WHERE namespace = $1", namespace)
+        return [(row[0], row[1]) for row in rows]
+
+    async def fetch_namespace_since(self, namespace, since):
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT key, value::text FROM records WHERE namespace = $1 AND updated_at >= $2", namespace, since
+            )
+        return [(row[0], row[1]) for row in rows]
+
+    async def scan_namespace(self, namespace, after, limit):
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT key, value::text FROM records WHERE namespace = $1 AND key > $2 ORDER BY key LIMIT $3",
+                namespace, after, limit
+            )
+        return [(row[0], row[1]) for row in rows]
+
+    async def fetch_many(self, namespace, keys):
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT key, value::text FROM records WHERE namespace = $1 AND key = ANY($2::text[])",
+                namespace, list(keys)
+            )
+        return [(row[0], row[1]) for row in rows]
+
+    async def fetch(self, namespace, key):
+        async with self._pool.acquire() as conn:
+            return await conn.fetchval(
+                "SELECT value::text FROM records WHERE namespace = $1 AND key = $2", namespace, key
+            )
+
+    async def count(self, namespace):
+        async with self._pool.acquire() as conn:
+            return await conn.fetchval("SELECT COUNT(*) FROM records WHERE namespace = $1", namespace)
+
+    async def namespaces(self, prefix):
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT DISTINCT namespace FROM records WHERE substr(namespace, 1, $1) = $2", len(prefix), prefix
+            )
+        return [row[0] for row in rows]
+
+    async def backup(self, target_path):
+        """Non géré : PostgreSQL se sauvegarde avec ses propres outils (pg_dump)"""
+        return False
+
+    async def write_batch(self, upserts, deletes):
+        now = time.time()
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                if upserts:
+                    await conn.executemany(
+                        "INSERT INTO records (namespace, key, value, updated_at) VALUES ($1, $2, $3::jsonb, $4) "
+                        "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                        [(namespace, key, value, now) for namespace, key, value in upserts]
+                    )
+                if deletes:
+                    await conn.executemany(
+                        "DELETE FROM records WHERE namespace = $1 AND key = $2", deletes
+                    )
+
+
+def create_backend(config):
+    """Choisit le backend selon la configuration (DATABASE_URL → PostgreSQL, sinon SQLite)"""
+    dsn = os.getenv('DATABASE_URL') or config.get('database_url')
+    if dsn:
+        return PostgresBackend(dsn)
+    return SQLiteBackend(config.get('sqlite_path', 'bot_data.db'))
+
+
+class Database:
+    """Stockage par enregistrements (namespace, clé) avec upsert ligne par ligne.
+
+    Les écritures des cogs (put/delete) sont regroupées en mémoire puis
+    appliquées en une transaction à chaque passage du flusher : une
+    modification de solde ou d'XP coûte une ligne indexée, pas un fichier entier.
+    """
+
+    def __init__(self, backend, flush_interval=5.0):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._pending = {}  # {(namespace, clé): valeur ou _DELETED}
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stop = asyncio.Event()
+        self.connected = False
+
+        # Statistiques
+        self.flushes = 0
+        self.rows_written = 0
+        self.bytes_written = 0  # Valeurs sérialisées envoyées au backend
+
+    async def connect(self):
+        """Ouvre la connexion et démarre le flusher"""
+        await self.backend.connect()
+        self.connected = True
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"🗄️ Base de données connectée: {self.backend.describe()}")
+
+    async def close(self):
+        """Écrit les modifications en attente et ferme la connexion"""
+        if not self.connected:
+            return
+
+        if self._task is not None:
+            # Pas d'annulation : une transaction en cours se termine (ses lignes ont quitté _pending)
+            self._stop.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
+        await self.backend.close()
+        self.connected = False
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.flush_interval)
+                return  # Arrêt demandé : close() fait la dernière écriture
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Erreur flusher base de données: {e}")
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def put(self, namespace, key, value):
+        """Programme l'upsert d'un enregistrement (écrit au prochain flush)"""
+        self._pending[(namespace, str(key))] = value
+
+    def put_batch(self, namespace, records):
+        """Programme l'upsert d'un lot d'enregistrements {clé: valeur} (écrit au prochain flush)"""
+        self._pending.update(((namespace, str(key)), value) for key, value in records.items())
+
+    def delete(self, namespace, key):
+        """Programme la suppression d'un enregistrement"""
+        self._pending[(namespace, str(key))] = _DELETED
+
+    async def put_many(self, namespace, records):
+        """Upsert immédiat d'un lot d'enregistrements en une transaction"""
+        upserts = [(namespace, str(key), encode_value(value)) for key, value in records.items()]
+        await self.backend.write_batch(upserts, [])
+        self.rows_written += len(upserts)
+        self.bytes_written += sum(len(value) for _, _, value in upserts)
+
+    async def flush(self):
+        """Applique toutes les écritures en attente en une transaction"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            upserts = []
+            deletes = []
+            for (namespace, key), value in pending.items():
+                if value is _DELETED:
+                    deletes.append((namespace, key))
+                else:
+                    upserts.append((namespace, key, encode_value(value)))
+
+            try:
+                await self.backend.write_batch(upserts, deletes)
+            except Exception:
+                # Ne pas perdre les écritures : les remettre en attente sans écraser les plus récentes
+                for item, value in pending.items():
+                    self._pending.setdefault(item, value)
+                raise
+
+            self.flushes += 1
+            self.rows_written += len(pending)
+            self.bytes_written += sum(len(value) for _, _, value in upserts)
+            return len(pending)
+
+    async def load(self, namespace):
+        """Charge tous les enregistrements d'un namespace ({clé: valeur})"""
+        rows = await self.backend.fetch_namespace(namespace)
+        return self._with_pending(namespace, {key: decode_value(value) for key, value in rows})
+
+    async def load_since(self, namespace, since):
+        """Enregistrements d'un namespace modifiés depuis `since` (timestamp), écritures en attente comprises.
+
+        Les suppressions ne sont pas rapportées : réservé aux données dont
+        les enregistrements ne sont jamais supprimés (XP...).
+        """
+        rows = await self.backend.fetch_namespace_since(namespace, since)
+        return self._with_pending(namespace, {key: decode_value(value) for key, value in rows})
+
+    def _with_pending(self, namespace, records):
+        # Les écritures pas encore appliquées restent prioritaires
+        for (pending_namespace, key), value in self._pending.items():
+            if pending_namespace != namespace:
+                continue
+            if value is _DELETED:
+                records.pop(key, None)
+            else:
+                records[key] = value
+
+        return records
+
+    async def scan(self, namespace, batch_size=10000):
+        """Parcourt un namespace par lots [(clé, valeur)] triés par clé, sans le charger en entier"""
+        await self.flush()
+        after = ''
+        while True:
+            rows = await self.backend.scan_namespace(namespace, after, batch_size)
+            if not rows:
+                return
+            yield [(key, decode_value(value)) for key, value in rows]
+            after = rows[-1][0]
+
+    async def get_many(self, namespace, keys):
+        """Récupère plusieurs enregistrements en une requête ({clé: valeur}, clés absentes omises)"""
+        keys = [str(key) for key in keys]
+        if not keys:
+            return {}
+        rows = await self.backend.fetch_many(namespace, keys)
+        records = {key: decode_value(value) for key, value in rows}
+        for key in keys:
+            value = self._pending.get((namespace, key))
+            if value is _DELETED:
+                records.pop(key, None)
+            elif value is not None:
+                records[key] = value
+        return records
+
+    async def get(self, namespace, key, default=None):
+        """Récupère un seul enregistrement"""
+        key = str(key)
+        if (namespace, key) in self._pending:
+            value = self._pending[(namespace, key)]
+            return default if value is _DELETED else value
+
+        text = await self.backend.fetch(namespace, key)
+        return default if text is None else decode_value(text)
+
+    async def count(self, namespace):
+        """Nombre d'enregistrements persistés dans un namespace"""
+        return await self.backend.count(namespace)
+
+    async def namespaces(self, prefix):
+        """Namespaces commençant par `prefix` (persistés ou en attente d'écriture)"""
+        found = set(await self.backend.namespaces(prefix))
+        found.update(namespace for namespace, _ in self._pending if namespace.startswith(prefix))
+        return sorted(found)
+
+    async def backup(self, target_path):
+        """Écrit les modifications en attente puis copie la base, False si non géré"""
+        await self.flush()
+        return await self.backend.backup(target_path)
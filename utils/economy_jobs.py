@@ -0,0 +1,107 @@
+"""Tâches planifiées de l'économie, calculées par colonnes.
+
+Chaque tâche lit une ou deux colonnes (liquide, banque, série quotidienne)
+d'une tranche de comptes, `Account` en mémoire ou lignes lues en base,
+calcule la variation de tous les comptes d'un coup et renvoie seulement les
+comptes modifiés. Avec NumPy le calcul est vectorisé ; sans, une boucle
+Python donne le même résultat.
+
+    bank_interest   intérêts sur la banque (`rate` par exécution)
+    wealth_tax      impôt sur la fortune au-delà de `threshold`, prélevé sur le liquide
+    streak_expiry   remise à zéro des séries !daily interrompues
+"""
+from datetime import timedelta
+from operator import attrgetter
+
+from utils.accounts import Account
+
+try:
+    import numpy as np
+except ImportError:  # Calcul en Python pur, mêmes résultats
+    np = None
+
+# Toutes désactivées par défaut : chaque serveur les active dans economy_config.json
+DEFAULT_JOBS = {
+    'bank_interest': {'enabled': False, 'interval_hours': 24, 'rate': 0.01},
+    'wealth_tax': {'enabled': False, 'interval_hours': 24, 'threshold': 100000, 'rate': 0.005},
+    'streak_expiry': {'enabled': False, 'interval_hours': 1}
+}
+
+# Une série est conservée si le !daily suivant arrive moins de 2 jours après le précédent
+STREAK_GRACE = timedelta(days=2)
+
+
+def _column(accounts, field):
+    if isinstance(accounts[0], Account):
+        # Comptes en mémoire (__slots__) : lecture des attributs en C
+        values = map(attrgetter(field), accounts)
+    else:
+        # Lignes lues en base : seuls les champs non nuls y sont écrits
+        values = (account.get(field) or 0 for account in accounts)
+    if np is not None:
+        return np.fromiter(values, dtype=np.int64, count=len(accounts))
+    return list(values)
+
+
+def bank_interest(accounts, settings, now):
+    """('bank', indices, gains) : intérêts arrondis à l'unité inférieure"""
+    bank = _column(accounts, 'bank')
+    rate = settings['rate']
+    if np is not None:
+        gains = np.floor(np.maximum(bank, 0) * rate).astype(np.int64)
+        indices = np.flatnonzero(gains)
+        return 'bank', indices.tolist(), gains[indices].tolist()
+
+    gains = [int(value * rate) if value > 0 else 0 for value in bank]
+    indices = [index for index, gain in enumerate(gains) if gain]
+    return 'bank', indices, [gains[index] for index in indices]
+
+
+def wealth_tax(accounts, settings, now):
+    """('balance', indices, -impôt) : part de la fortune au-delà du seuil, dans la limite du liquide"""
+    balance = _column(accounts, 'balance')
+    bank = _column(accounts, 'bank')
+    threshold, rate = settings['threshold'], settings['rate']
+    if np is not None:
+        taxable = np.maximum(balance + bank - threshold, 0)
+        taxes = np.minimum(np.floor(taxable * rate).astype(np.int64), np.maximum(balance, 0))
+        indices = np.flatnonzero(taxes)
+        return 'balance', indices.tolist(), (-taxes[indices]).tolist()
+
+    taxes = [
+        min(int(max(cash + saved - threshold, 0) * rate), max(cash, 0))
+        for cash, saved in zip(balance, bank)
+    ]
+    indices = [index for index, tax in enumerate(taxes) if tax]
+    return 'balance', indices, [-taxes[index] for index in indices]
+
+
+def streak_expiry(accounts, settings, now):
+    """('daily_streak', indices, None) : séries dont le dernier !daily date d'au moins 2 jours"""
+    streaks = _column(accounts, 'daily_streak')
+    if np is not None:
+        candidates = np.flatnonzero(streaks > 0).tolist()
+    else:
+        candidates = [index for index, streak in enumerate(streaks) if streak > 0]
+
+    # Dates ISO 8601 de même format (datetime.isoformat) : l'ordre des chaînes est l'ordre chronologique
+    deadline = (now - STREAK_GRACE).isoformat()
+    expired = []
+    for index in candidates:
+        last_daily = accounts[index].get('last_daily')
+        if last_daily is None or last_daily <= deadline:
+            expired.append(index)
+    return 'daily_streak', expired, None
+
+
+JOBS = {
+    'bank_interest': bank_interest,
+    'wealth_tax': wealth_tax,
+    'streak_expiry': streak_expiry
+}
+
+
+def job_settings(config):
+    """Paramètres des tâches : config.json de l'économie complété par les valeurs par défaut"""
+    configured = config.get('jobs', {})
+    return {name: {**defaults, **configured.get(name, {})} for name, defaults in DEFAULT_JOBS.items()}
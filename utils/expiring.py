@@ -0,0 +1,113 @@
+import sys
+import time
+from collections import deque
+
+
+class ExpiringMap:
+    """Dictionnaire dont les entrées expirent `ttl` secondes après leur dernière écriture.
+
+    Les clés sont rangées dans des seaux de `resolution` secondes (roue
+    temporelle) : écrire, lire ou tester une clé coûte O(1), et chaque accès
+    libère les seaux échus. La mémoire suit le nombre de clés actives sur la
+    dernière fenêtre `ttl`, pas le nombre de clés jamais vues.
+    """
+
+    def __init__(self, ttl, resolution=1.0, name=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.resolution = resolution
+        self.name = name
+        self.clock = clock
+        self._entries = {}  # {clé: (expiration, valeur)}
+        self._buckets = deque()  # [(fin du seau, [clés])] par fin croissante
+        self._peak = 0  # Taille maximale depuis la dernière recopie du dict
+        self.expired = 0
+
+    def _expire(self, now):
+        buckets = self._buckets
+        while buckets and buckets[0][0] <= now:
+            _, keys = buckets.popleft()
+            for key in keys:
+                entry = self._entries.get(key)
+                # Une clé réécrite depuis est référencée par un seau plus récent
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    self.expired += 1
+
+            # Un dict ne rend jamais sa mémoire : recopie après un pic d'activité retombé
+            if self._peak > 1024 and len(self._entries) * 4 < self._peak:
+                self._entries = dict(self._entries)
+                self._peak = len(self._entries)
+
+    def expire(self, now=None):
+        """Libère les entrées échues, renvoie le nombre restant"""
+        self._expire(self.clock() if now is None else now)
+        return len(self._entries)
+
+    def _store(self, key, value, now):
+        expires = now + self.ttl
+        self._entries[key] = (expires, value)
+        if len(self._entries) > self._peak:
+            self._peak = len(self._entries)
+        bucket_end = (expires // self.resolution + 1) * self.resolution
+        if self._buckets and self._buckets[-1][0] == bucket_end:
+            self._buckets[-1][1].append(key)
+        else:
+            self._buckets.append((bucket_end, [key]))
+
+    def set(self, key, value=True):
+        """Écrit une entrée et repousse son expiration"""
+        now = self.clock()
+        self._expire(now)
+        self._store(key, value, now)
+
+    __setitem__ = set
+
+    def check_and_set(self, key, value=True):
+        """Cooldown : écrit l'entrée et renvoie True si elle était absente ou échue, sinon False"""
+        now = self.clock()
+        self._expire(now)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return False
+        self._store(key, value, now)
+        return True
+
+    def get(self, key, default=None):
+        now = self.clock()
+        self._expire(now)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            return default
+        return entry[1]
+
+    def __getitem__(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            raise KeyError(key)
+        return entry[1]
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self.clock()
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def items(self):
+        """(clé, valeur) des entrées non échues"""
+        now = self.clock()
+        return [(key, value) for key, (expires, value) in self._entries.items() if expires > now]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def nbytes(self):
+        """Estimation de la mémoire des structures internes (hors clés et valeurs)"""
+        return (
+            sys.getsizeof(self._entries) + len(self._entries) * sys.getsizeof((0.0, None))
+            + sys.getsizeof(self._buckets) + sum(sys.getsizeof(keys) for _, keys in self._buckets)
+        )
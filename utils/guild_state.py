@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger('discord_bot.guild_state')
+
+
+def guild_scoped(value, lookup):
+    """Garde d'un ID (ou d'une liste d'IDs) ceux que `lookup` retrouve sur le serveur.
+
+    Sert à ramener une ancienne configuration globale à un serveur : les
+    salons et rôles des autres serveurs n'y ont pas leur place.
+    """
+    if isinstance(value, list):
+        return [item for item in value if lookup(item) is not None]
+    return value if value and lookup(value) is not None else None
+
+
+class GuildStateCache:
+    """Données d'un cog partitionnées par serveur dans la base de données.
+
+    Chaque serveur a son namespace (`levels:<guild_id>`), chargé au premier
+    accès et retiré de la mémoire après `idle_timeout` secondes sans accès :
+    la mémoire suit le nombre de serveurs actifs, pas le nombre total. Les
+    écritures restent des upserts ligne par ligne, un serveur actif ne
+    réécrit jamais les données des autres.
+
+    `legacy` : ancien namespace global (clés = utilisateurs). Au premier
+    chargement d'un serveur sans données, `seed(guild_id, anciens)` choisit
+    les enregistrements à y copier (par exemple ceux de ses membres).
+
+    `loader(guild_id)` : coroutine qui remplace le chargement par défaut
+    (namespace complet en dict) quand le cog garde ses données sous une
+    autre forme en mémoire (tableaux compacts...).
+
+    `on_evict(guild_id, state)` : appelé quand un serveur quitte la mémoire,
+    pour libérer les structures dérivées (index de classement...).
+    """
+
+    def __init__(self, db, name, idle_timeout=1800, sweep_interval=60, legacy=None, seed=None, on_evict=None,
+                 loader=None):
+        self.db = db
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.legacy = legacy
+        self.seed = seed
+        self.on_evict = on_evict
+        self.loader = loader
+        self._guilds = {}  # {guild_id: {clé: valeur}}
+        self._last_access = {}
+        self._loading = {}
+        self._task = None
+
+        # Statistiques
+        self.loads = 0
+        self.evictions = 0
+        self.seeded = 0
+
+    def namespace(self, guild_id):
+        return f"{self.name}:{guild_id}"
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.evict_idle()
+
+    def __len__(self):
+        return len(self._guilds)
+
+    def loaded(self):
+        """Serveurs actuellement en mémoire"""
+        return list(self._guilds)
+
+    async def get(self, guild_id):
+        """Enregistrements d'un serveur, chargés depuis la base au premier accès"""
+        guild_id = int(guild_id)
+        self._last_access[guild_id] = time.monotonic()
+        records = self._guilds.get(guild_id)
+        if records is not None:
+            return records
+
+        # Un seul chargement même si plusieurs messages arrivent en même temps
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(guild_id))
+            self._loading[guild_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, guild_id):
+        if self.loader is not None:
+            records = await self.loader(guild_id)
+        else:
+            records = await self.db.load(self.namespace(guild_id))
+            if not records and self.legacy is not None:
+                records = await self.seed_from_legacy(guild_id)
+
+        self._guilds[guild_id] = records
+        self._last_access[guild_id] = time.monotonic()
+        self.loads += 1
+        return records
+
+    async def seed_from_legacy(self, guild_id):
+        """Copie (une seule fois) les anciennes données globales vers le serveur"""
+        seeded_key = f"seeded:{self.namespace(guild_id)}"
+        if await self.db.get('meta', seeded_key) or not await self.db.count(self.legacy):
+            return {}
+
+        legacy = await self.db.load(self.legacy)
+        records = self.seed(guild_id, legacy) if self.seed else dict(legacy)
+        if records:
+            await self.db.put_many(self.namespace(guild_id), records)
+        await self.db.put_many('meta', {seeded_key: True})
+
+        self.seeded += 1
+        logger.info(f"📦 {self.name}: {len(records)} enregistrement(s) global(aux) copié(s) vers le serveur {guild_id}")
+        return records
+
+    def peek(self, guild_id):
+        """Enregistrements d'un serveur s'il est en mémoire, sinon None (sans chargement)"""
+        guild_id = int(guild_id)
+        records = self._guilds.get(guild_id)
+        if records is not None:
+            self._last_access[guild_id] = time.monotonic()
+        return records
+
+    def put(self, guild_id, key, value):
+        """Programme l'upsert d'un enregistrement du serveur (écrit au prochain flush)"""
+        self.db.put(self.namespace(guild_id), key, value)
+
+    def delete(self, guild_id, key):
+        records = self._guilds.get(int(guild_id))
+        if records is not None:
+            records.pop(str(key), None)
+        self.db.delete(self.namespace(guild_id), key)
+
+    def evict_idle(self, now=None):
+        """Retire de la mémoire les serveurs inactifs, renvoie leur nombre.
+
+        Les écritures en attente restent dans la base (Database.load les
+        applique), un serveur rechargé retrouve donc ses dernières valeurs.
+        """
+        now = time.monotonic() if now is None else now
+        idle = [
+            guild_id for guild_id in self._guilds
+            if now - self._last_access.get(guild_id, 0) >= self.idle_timeout
+        ]
+        for guild_id in idle:
+            state = self._guilds.pop(guild_id)
+            self._last_access.pop(guild_id, None)
+            if self.on_evict is not None:
+                self.on_evict(guild_id, state)
+
+        if idle:
+            self.evictions += len(idle)
+            logger.debug(f"🧹 {self.name}: {len(idle)} serveur(s) inactif(s) retiré(s) de la mémoire")
+        return len(idle)
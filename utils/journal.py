@@ -0,0 +1,277 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+
+from utils.codec import dumps_json, loads_json, read_file
+from utils.persistence import atomic_write, encode_json
+
+logger = logging.getLogger('discord_bot.journal')
+
+
+def encode_record(record):
+    """Encode un enregistrement du journal : '<crc32> <json>\\n'"""
+    payload = dumps_json(record)
+    return f"{zlib.crc32(payload):08x} ".encode('ascii') + payload + b'\n'
+
+
+def fingerprint(value):
+    """Empreinte du contenu d'une valeur et taille de son encodage"""
+    payload = json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).digest(), len(payload)
+
+
+def scan_records(path):
+    """Lit les enregistrements valides d'un journal, renvoie (enregistrements, octets valides).
+
+    La lecture s'arrête au premier enregistrement tronqué ou corrompu
+    (crash pendant une écriture) : tout ce qui précède est conservé.
+    """
+    records = []
+    valid_bytes = 0
+    try:
+        with open(path, 'rb') as f:
+            for line_number, raw in enumerate(f, start=1):
+                if not raw.endswith(b'\n'):
+                    logger.warning(f"⚠️ {path}: enregistrement tronqué ignoré (ligne {line_number})")
+                    break
+                try:
+                    checksum, payload = raw[:-1].split(b' ', 1)
+                    if int(checksum, 16) != zlib.crc32(payload):
+                        raise ValueError("somme de contrôle invalide")
+                    records.append(loads_json(payload))
+                except Exception as e:
+                    logger.warning(f"⚠️ {path}: enregistrement corrompu ignoré (ligne {line_number}): {e}")
+                    break
+                valid_bytes += len(raw)
+    except FileNotFoundError:
+        pass
+    return records, valid_bytes
+
+
+def read_records(path):
+    """Lit les enregistrements valides d'un journal (voir scan_records)"""
+    return scan_records(path)[0]
+
+
+def truncate_torn_tail(path, valid_bytes):
+    """Coupe ce qui suit la partie valide d'un journal, renvoie le nombre d'octets retirés.
+
+    La lecture s'arrêtant à la première ligne invalide, des lignes ajoutées
+    après une fin tronquée seraient perdues au prochain rejeu.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+    if size <= valid_bytes:
+        return 0
+
+    with open(path, 'r+b') as f:
+        f.truncate(valid_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    logger.warning(f"✂️ {path}: fin tronquée retirée ({size - valid_bytes} octets)")
+    return size - valid_bytes
+
+
+def _append_lines(path, lines):
+    """Ajoute des lignes au journal puis fsync (un seul fsync par groupe)"""
+    with open(path, 'ab') as f:
+        f.write(b''.join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _write_snapshot(snapshot_path, log_path, data):
+    """Écrit l'instantané de façon atomique puis vide le journal"""
+    atomic_write(snapshot_path, data)
+    with open(log_path, 'wb') as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class Journal:
+    """Journal d'écriture anticipée (WAL) avec instantanés.
+
+    Chaque modification est ajoutée au journal sous forme d'un petit
+    enregistrement ; les enregistrements sont écrits et fsync'és par groupe
+    à chaque intervalle. Au-delà de `compact_every` enregistrements, un
+    instantané complet est écrit et le journal est vidé. Au démarrage,
+    l'instantané est chargé puis la queue du journal est rejouée.
+
+    Les opérations rejouées doivent être idempotentes : un crash entre
+    l'écriture de l'instantané et la vidange du journal fait rejouer des
+    opérations déjà présentes dans l'instantané.
+    """
+
+    def __init__(self, snapshot_path, log_path=None, interval=5.0, compact_every=1000, encoder=encode_json):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or f"{snapshot_path}.log"
+        self.interval = interval
+        self.compact_every = compact_every
+        self.encoder = encoder
+        self._snapshot = None
+        self._pending = []
+        self._fingerprints = {}  # {clé: empreinte de la dernière valeur journalisée}
+        self._has_snapshot = os.path.exists(snapshot_path)
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._stop = asyncio.Event()
+
+        # Statistiques
+        self.log_records = 0  # Enregistrements dans le journal depuis le dernier instantané
+        self.commits = 0
+        self.records_written = 0
+        self.snapshots = 0
+        self.replayed = 0
+        self.last_snapshot = None
+        self.bytes_written = 0
+        self.skipped = 0
+        self.bytes_skipped = 0
+        self.snapshot_bytes = 0
+
+    def attach(self, snapshot):
+        """Définit la fonction qui renvoie l'état complet à écrire dans l'instantané"""
+        self._snapshot = snapshot
+
+    def load(self, default, apply):
+        """Charge l'instantané puis rejoue le journal avec apply(état, enregistrement)"""
+        state = copy.deepcopy(default)
+        try:
+            state = read_file(self.snapshot_path)
+        except FileNotFoundError:
+            logger.info(f"📁 Aucun instantané {self.snapshot_path}, démarrage à partir du journal")
+        except Exception as e:
+            # Conserver le fichier illisible pour analyse au lieu de l'écraser
+            corrupt_path = f"{self.snapshot_path}.corrupt-{int(time.time())}"
+            os.replace(self.snapshot_path, corrupt_path)
+            logger.error(f"❌ Instantané {self.snapshot_path} illisible ({e}), déplacé vers {corrupt_path}")
+
+        records, valid_bytes = scan_records(self.log_path)
+        # Les commits suivants s'ajoutent à ce journal : couper d'abord une fin tronquée par un crash
+        truncate_torn_tail(self.log_path, valid_bytes)
+        for record in records:
+            apply(state, record)
+
+        self.replayed = len(records)
+        self.log_records = len(records)
+        self._has_snapshot = os.path.exists(self.snapshot_path)
+        if self._has_snapshot:
+            self.snapshot_bytes = os.path.getsize(self.snapshot_path)
+        return state
+
+    def remember(self, key, value):
+        """Enregistre l'empreinte d'une valeur déjà persistée (au chargement)"""
+        self._fingerprints[key] = fingerprint(value)[0]
+
+    def forget(self, key):
+        """Oublie l'empreinte d'une clé : sa prochaine valeur sera journalisée"""
+        self._fingerprints.pop(key, None)
+
+    def changed(self, key, value):
+        """Indique si une valeur diffère de la dernière journalisée pour cette clé.
+
+        Compare le contenu et non l'objet : les cogs modifient souvent leurs
+        dictionnaires sur place avant de les réenregistrer.
+        """
+        digest, size = fingerprint(value)
+        if self._fingerprints.get(key) == digest:
+            self.skipped += 1
+            self.bytes_skipped += size
+            return False
+        self._fingerprints[key] = digest
+        return True
+
+    def append(self, record):
+        """Ajoute un enregistrement (écrit au prochain commit de groupe)"""
+        self._pending.append(encode_record(record))
+
+    def is_dirty(self):
+        """Enregistrements en attente ou journal non compacté"""
+        return bool(self._pending) or self.log_records > 0
+
+    def start(self):
+        """Démarre le commit de groupe en tâche de fond"""
+        if self._task is None or self._task.done():
+            self._stop.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+                return  # Arrêt demandé : close() écrit l'instantané final
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.commit()
+            except Exception as e:
+                logger.error(f"❌ Erreur commit du journal {self.log_path}: {e}")
+
+    async def _commit_locked(self):
+        if not self._pending:
+            return 0
+
+        lines, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(_append_lines, self.log_path, lines)
+        except Exception:
+            self._pending[:0] = lines
+            raise
+
+        self.commits += 1
+        self.records_written += len(lines)
+        self.log_records += len(lines)
+        self.bytes_written += sum(len(line) for line in lines)
+        return len(lines)
+
+    async def commit(self):
+        """Écrit et fsync les enregistrements en attente, compacte si nécessaire"""
+        async with self._lock:
+            written = await self._commit_locked()
+            if self.log_records >= self.compact_every:
+                await self._compact_locked()
+            return written
+
+    async def _compact_locked(self):
+        await self._commit_locked()
+        if self._snapshot is None:
+            return False
+
+        # Rien de journalisé depuis le dernier instantané : il est déjà à jour
+        if self.log_records == 0 and self._has_snapshot:
+            self.bytes_skipped += self.snapshot_bytes
+            return False
+
+        # L'instantané est capturé sur la boucle : il contient tout ce qui est déjà journalisé
+        data = self.encoder(self._snapshot())
+        await asyncio.to_thread(_write_snapshot, self.snapshot_path, self.log_path, data)
+
+        self.snapshots += 1
+        self.log_records = 0
+        self.last_snapshot = time.time()
+        self.snapshot_bytes = len(data)
+        self.bytes_written += len(data)
+        self._has_snapshot = True
+        logger.info(f"📸 Instantané {self.snapshot_path} écrit ({len(data)} octets), journal compacté")
+        return True
+
+    async def compact(self):
+        """Écrit un instantané et vide le journal si quelque chose a été journalisé"""
+        async with self._lock:
+            return await self._compact_locked()
+
+    async def close(self):
+        """Arrête le commit de groupe et écrit un instantané final"""
+        if self._task is not None:
+            # Pas d'annulation : un commit en cours se termine au lieu de perdre ses lignes
+            self._stop.set()
+            await self._task
+            self._task = None
+
+        await self.compact()
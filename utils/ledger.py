@@ -0,0 +1,260 @@
+"""Registre des transactions de l'économie (ajout seul).
+
+Chaque mouvement d'argent est une ligne du registre :
+    {"seq": 42, "time": 1718000000.0, "guild": 123, "user": 456,
+     "kind": "bet", "amount": -100, "balance": 250, "reason": "..."}
+
+Les lignes sont écrites et fsync'ées par groupe (même format que le
+journal : '<crc32> <json>'), dans des segments `data/ledger/<seq>.log`
+jamais réécrits. Les soldes des comptes (base de données) sont une vue
+matérialisée : un point de contrôle note le dernier numéro de transaction
+dont l'effet est sûr d'être en base, et seules les transactions suivantes
+sont rejouées au démarrage.
+
+Utilisation :
+    python -m utils.ledger verify
+    python -m utils.ledger history <guild_id> <user_id>
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from utils.codec import read_file
+from utils.journal import _append_lines, encode_record, read_records, scan_records, truncate_torn_tail
+from utils.persistence import atomic_write, encode_json
+
+logger = logging.getLogger('discord_bot.ledger')
+
+KINDS = ('earn', 'spend', 'bet', 'payout', 'transfer')
+
+
+class Ledger:
+    """Registre des transactions avec commit de groupe et points de contrôle"""
+
+    def __init__(self, directory='data/ledger', interval=5.0, checkpoint_interval=300,
+                 segment_size=16 * 1024 * 1024):
+        self.directory = directory
+        self.checkpoint_path = os.path.join(directory, 'checkpoint.json')
+        self.interval = interval
+        self.checkpoint_interval = checkpoint_interval
+        self.segment_size = segment_size
+        self.seq = 0  # Dernier numéro attribué
+        self.committed_seq = 0  # Dernier numéro écrit sur disque
+        self.checkpoint_seq = 0
+        self._pending = []
+        self._segment = None
+        self._segment_bytes = 0
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._stop = asyncio.Event()
+        self._flush = None
+
+        # Statistiques
+        self.transactions = 0
+        self.commits = 0
+        self.bytes_written = 0
+        self.checkpoints = 0
+        self.replayed = 0
+
+    def segments(self):
+        """Chemins des segments, du plus ancien au plus récent"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.log')]
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(names)]
+
+    def records(self, after=0):
+        """Itère sur les transactions de numéro > after (lecture bloquante)"""
+        segments = self.segments()
+        # Un segment est nommé d'après son premier numéro : ignorer ceux entièrement avant `after`
+        start = 0
+        for index, path in enumerate(segments):
+            if int(os.path.basename(path)[:-4]) <= after + 1:
+                start = index
+        for path in segments[start:]:
+            for record in read_records(path):
+                if record['seq'] > after:
+                    yield record
+
+    def open(self):
+        """Lit le point de contrôle, renvoie les transactions à rejouer (bloquant)"""
+        try:
+            self.checkpoint_seq = read_file(self.checkpoint_path)['seq']
+        except FileNotFoundError:
+            self.checkpoint_seq = 0
+
+        # Crash pendant un commit : couper la fin tronquée du dernier segment. Le prochain
+        # segment peut porter le même nom (committed_seq + 1), et des lignes ajoutées après
+        # la partie illisible seraient masquées au rejeu suivant
+        segments = self.segments()
+        if segments:
+            truncate_torn_tail(segments[-1], scan_records(segments[-1])[1])
+
+        replay = list(self.records(self.checkpoint_seq))
+        self.seq = self.committed_seq = replay[-1]['seq'] if replay else self.checkpoint_seq
+        self.replayed = len(replay)
+        self._segment = None  # Nouveau segment à chaque démarrage
+        return replay
+
+    def append(self, kind, guild_id, user_id, amount, balance, reason=""):
+        """Ajoute une transaction (écrite au prochain commit de groupe), renvoie son numéro"""
+        self.seq += 1
+        self._pending.append(encode_record({
+            'seq': self.seq, 'time': round(time.time(), 3), 'guild': int(guild_id), 'user': int(user_id),
+            'kind': kind, 'amount': amount, 'balance': balance, 'reason': reason
+        }))
+        self.transactions += 1
+        return self.seq
+
+    def append_many(self, guild_id, entries, reason=""):
+        """Ajoute un lot de transactions d'un serveur [(kind, user_id, amount, balance)].
+
+        Numéros consécutifs, renvoie celui de la première.
+        """
+        first = self.seq + 1
+        now = round(time.time(), 3)
+        guild_id = int(guild_id)
+        self._pending.extend(
+            encode_record({
+                'seq': first + offset, 'time': now, 'guild': guild_id, 'user': int(user_id),
+                'kind': kind, 'amount': amount, 'balance': balance, 'reason': reason
+            })
+            for offset, (kind, user_id, amount, balance) in enumerate(entries)
+        )
+        self.seq += len(entries)
+        self.transactions += len(entries)
+        return first
+
+    def _segment_path(self):
+        if self._segment is None or self._segment_bytes >= self.segment_size:
+            os.makedirs(self.directory, exist_ok=True)
+            self._segment = os.path.join(self.directory, f"{self.committed_seq + 1:012d}.log")
+            self._segment_bytes = 0
+        return self._segment
+
+    async def _commit_locked(self):
+        if not self._pending:
+            return 0
+
+        lines, self._pending = self._pending, []
+        seq = self.seq
+        path = self._segment_path()
+        try:
+            await asyncio.to_thread(_append_lines, path, lines)
+        except Exception:
+            self._pending[:0] = lines
+            raise
+
+        size = sum(len(line) for line in lines)
+        self._segment_bytes += size
+        self.bytes_written += size
+        self.committed_seq = seq
+        self.commits += 1
+        return len(lines)
+
+    async def commit(self):
+        """Écrit et fsync les transactions en attente"""
+        async with self._lock:
+            return await self._commit_locked()
+
+    async def checkpoint(self, flush):
+        """Commit, attend que la vue matérialisée soit écrite (`flush`), puis note le numéro atteint"""
+        async with self._lock:
+            await self._commit_locked()
+            seq = self.committed_seq
+            if seq == self.checkpoint_seq:
+                return False
+            await flush()
+            await asyncio.to_thread(atomic_write, self.checkpoint_path, encode_json({'seq': seq, 'time': time.time()}))
+            self.checkpoint_seq = seq
+            self.checkpoints += 1
+            return True
+
+    def start(self, flush):
+        """Démarre le commit de groupe et les points de contrôle périodiques"""
+        self._flush = flush
+        if self._task is None or self._task.done():
+            self._stop.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        last_checkpoint = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+                return  # Arrêt demandé : l'appelant fait le dernier point de contrôle
+            except asyncio.TimeoutError:
+                pass
+            try:
+                if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                    await self.checkpoint(self._flush)
+                    last_checkpoint = time.monotonic()
+                else:
+                    await self.commit()
+            except Exception as e:
+                logger.error(f"❌ Erreur écriture du registre {self.directory}: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            # Pas d'annulation : un commit en cours se termine au lieu de perdre ses lignes
+            self._stop.set()
+            await self._task
+            self._task = None
+
+    def rebuild(self):
+        """Recalcule les soldes depuis le registre (bloquant).
+
+        Renvoie ({(guild_id, user_id): solde}, [incohérences]) : une incohérence
+        est une transaction dont le solde ne suit pas celui de la précédente
+        du même compte (modification hors registre).
+        """
+        balances = {}
+        mismatches = []
+        for record in self.records():
+            account = (record['guild'], record['user'])
+            previous = balances.get(account)
+            if previous is not None and previous + record['amount'] != record['balance']:
+                mismatches.append(record)
+            balances[account] = record['balance']
+        return balances, mismatches
+
+    def history(self, guild_id, user_id):
+        """Transactions d'un compte, de la plus ancienne à la plus récente (bloquant)"""
+        return [
+            record for record in self.records()
+            if record['guild'] == guild_id and record['user'] == user_id
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registre des transactions de l'économie")
+    parser.add_argument('action', choices=('verify', 'history'))
+    parser.add_argument('guild_id', type=int, nargs='?')
+    parser.add_argument('user_id', type=int, nargs='?')
+    parser.add_argument('--directory', default='data/ledger')
+    args = parser.parse_args()
+
+    ledger = Ledger(args.directory)
+    if args.action == 'history':
+        if args.user_id is None:
+            parser.error("history attend <guild_id> <user_id>")
+        for record in ledger.history(args.guild_id, args.user_id):
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['time']))
+            print(f"#{record['seq']} {when} {record['kind']:<8} {record['amount']:+,} → {record['balance']:,} "
+                  f"{record['reason']}")
+        return
+
+    started = time.perf_counter()
+    balances, mismatches = ledger.rebuild()
+    for record in mismatches[:20]:
+        print(f"⚠️ #{record['seq']} compte {record['guild']}/{record['user']}: solde {record['balance']:,} "
+              f"inattendu après {record['amount']:+,}")
+    print(f"{len(balances):,} compte(s), {len(mismatches)} incohérence(s), "
+          f"{time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
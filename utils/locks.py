@@ -0,0 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class StripedLock:
+    """Verrous asyncio répartis par clé sur un nombre fixe de bandes.
+
+    Deux clés différentes ne se bloquent que si elles tombent sur la même
+    bande (probabilité 1/`stripes`) ; la mémoire ne dépend pas du nombre de
+    clés. Plusieurs clés sont verrouillées dans l'ordre des bandes : deux
+    opérations croisées (A→B et B→A) ne peuvent pas s'interbloquer.
+    """
+
+    def __init__(self, stripes=1024):
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+        self.contended = 0  # Acquisitions qui ont dû attendre
+
+    def _stripe(self, key):
+        return hash(key) % len(self._locks)
+
+    @asynccontextmanager
+    async def lock(self, *keys):
+        """Verrouille toutes les clés données (dans un ordre global fixe)"""
+        locks = [self._locks[index] for index in sorted({self._stripe(key) for key in keys})]
+        acquired = []
+        try:
+            for lock in locks:
+                if lock.locked():
+                    self.contended += 1
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
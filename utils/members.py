@@ -0,0 +1,122 @@
+import asyncio
+import logging
+
+import discord
+
+from utils.expiring import ExpiringMap
+
+logger = logging.getLogger('discord_bot.members')
+
+
+class NameResolver:
+    """Noms d'affichage d'une liste d'utilisateurs, résolus par lots.
+
+    Ordre de résolution : cache des membres du serveur, cache des
+    utilisateurs du bot, noms déjà récupérés (expirent après `ttl`), puis un
+    seul `query_members` par lot de 100 pour les membres pas encore chargés.
+    Les utilisateurs restants (anciens membres, classement global) passent
+    par une file de `fetch_user` traitée un par un ; une demande qui attend
+    le même utilisateur partage la requête en cours.
+    """
+
+    def __init__(self, bot, ttl=3600, fetch_interval=0.25):
+        self.bot = bot
+        self.fetch_interval = fetch_interval
+        self.names = ExpiringMap(ttl, resolution=60, name='members.names')
+        self._queue = asyncio.Queue()
+        self._waiting = {}  # {user_id: future du nom}
+        self._task = None
+
+        # Statistiques
+        self.cache_hits = 0
+        self.queries = 0
+        self.fetches = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for future in self._waiting.values():
+            future.cancel()
+        self._waiting.clear()
+
+    def cached_name(self, guild, user_id):
+        """Nom connu sans requête réseau, None sinon"""
+        member = guild.get_member(user_id) if guild is not None else None
+        if member is not None:
+            return member.display_name
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user.display_name
+        return self.names.get(user_id)
+
+    async def resolve(self, guild, user_ids, timeout=3.0):
+        """{user_id: nom} ; les utilisateurs non résolus avant `timeout` sont absents"""
+        resolved = {}
+        missing = []
+        for user_id in user_ids:
+            name = self.cached_name(guild, user_id)
+            if name is not None:
+                resolved[user_id] = name
+                self.cache_hits += 1
+            else:
+                missing.append(user_id)
+
+        # Membres du serveur pas encore chargés : une requête gateway par lot de 100
+        if missing and guild is not None and not guild.chunked:
+            for start in range(0, len(missing), 100):
+                batch = missing[start:start + 100]
+                try:
+                    members = await guild.query_members(user_ids=batch, limit=len(batch), cache=True)
+                except asyncio.TimeoutError:
+                    logger.warning(f"⚠️ Délai dépassé pour la recherche de membres sur {guild.name}")
+                    break
+                self.queries += 1
+                for member in members:
+                    resolved[member.id] = member.display_name
+            missing = [user_id for user_id in missing if user_id not in resolved]
+
+        # Utilisateurs hors du serveur : file de fetch_user
+        if missing:
+            futures = {user_id: self._enqueue(user_id) for user_id in missing}
+            await asyncio.wait(futures.values(), timeout=timeout)
+            for user_id, future in futures.items():
+                if future.done() and not future.cancelled() and future.result() is not None:
+                    resolved[user_id] = future.result()
+        return resolved
+
+    def _enqueue(self, user_id):
+        future = self._waiting.get(user_id)
+        if future is None:
+            future = self._waiting[user_id] = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait(user_id)
+            self.start()
+        return future
+
+    async def _run(self):
+        while True:
+            user_id = await self._queue.get()
+            future = self._waiting.pop(user_id, None)
+            try:
+                user = await self.bot.fetch_user(user_id)
+                name = user.display_name
+            except discord.NotFound:
+                name = "Utilisateur supprimé"
+            except discord.HTTPException as e:
+                logger.warning(f"⚠️ Impossible de récupérer l'utilisateur {user_id}: {e}")
+                name = None
+
+            self.fetches += 1
+            if name is not None:
+                self.names[user_id] = name
+            if future is not None and not future.done():
+                future.set_result(name)
+            await asyncio.sleep(self.fetch_interval)
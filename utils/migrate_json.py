@@ -0,0 +1,84 @@
+"""Migration unique des anciens fichiers JSON des cogs vers la base de données.
+
+Utilisation :
+    python -m utils.migrate_json            # importe les fichiers présents
+    python -m utils.migrate_json --force    # ré-importe même les fichiers déjà migrés
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from utils.codec import read_file
+from utils.database import Database, create_backend
+
+logger = logging.getLogger('discord_bot.migration')
+
+# {fichier: (namespace, clé)} — clé None : chaque entrée de premier niveau devient un enregistrement
+LEGACY_FILES = {
+    'xp_data.json': ('levels', None),
+    'economy_users.json': ('economy_users', None),
+    'giveaways.json': ('giveaways', None),
+    'events.json': ('events', None),
+    'suggestions.json': ('suggestions', None),
+    'playlists.json': ('playlists', None),
+    'guild_settings.json': ('guild_settings', None),
+    'automod_config.json': ('config', 'automod'),
+    'word_filters.json': ('config', 'word_filters'),
+}
+
+
+async def migrate_legacy_files(db, force=False):
+    """Importe les fichiers JSON existants, renvoie {fichier: nombre d'enregistrements}"""
+    migrated = await db.get('meta', 'migrated_files', {})
+    results = {}
+
+    for filename, (namespace, key) in LEGACY_FILES.items():
+        if not os.path.exists(filename):
+            continue
+        if filename in migrated and not force:
+            continue
+
+        try:
+            data = read_file(filename)
+        except Exception as e:
+            logger.error(f"❌ Lecture impossible de {filename}: {e}")
+            continue
+
+        records = data if key is None else {key: data}
+        await db.put_many(namespace, records)
+
+        migrated[filename] = len(records)
+        results[filename] = len(records)
+        logger.info(f"📦 {filename} → {namespace} ({len(records)} enregistrements)")
+
+    if results:
+        await db.put_many('meta', {'migrated_files': migrated})
+
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Importe les anciens fichiers JSON dans la base de données")
+    parser.add_argument('--force', action='store_true', help="Ré-importer les fichiers déjà migrés")
+    args = parser.parse_args()
+
+    config = read_file('config.json')
+
+    db = Database(create_backend(config.get('persistence', {})))
+    await db.connect()
+    try:
+        results = await migrate_legacy_files(db, force=args.force)
+    finally:
+        await db.close()
+
+    if results:
+        for filename, count in results.items():
+            print(f"✅ {filename}: {count} enregistrements importés")
+    else:
+        print("Aucun fichier à migrer")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger('discord_bot.monitor')
+
+
+class LoopMonitor:
+    """Mesure les blocages de la boucle d'événements.
+
+    Une tâche dort `interval` secondes en boucle : tout retard au réveil est du
+    temps pendant lequel la boucle n'a pas pu tourner (heartbeat gateway compris).
+    """
+
+    def __init__(self, interval=0.1, stall_threshold=0.1, warn_threshold=1.0, window=600):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.warn_threshold = warn_threshold
+        self._recent = deque(maxlen=window)
+        self._task = None
+
+        # Statistiques
+        self.samples = 0
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.last_stall = None  # (timestamp, retard)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def record(self, lag):
+        """Enregistre un retard de réveil (en secondes)"""
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self._recent.append(lag)
+
+        if lag >= self.stall_threshold:
+            self.stalls += 1
+            self.last_stall = (time.time(), lag)
+            if lag >= self.warn_threshold:
+                logger.warning(f"🐢 Boucle d'événements bloquée pendant {lag * 1000:.0f} ms")
+
+    @property
+    def mean_lag(self):
+        return self.total_lag / self.samples if self.samples else 0.0
+
+    def percentile(self, p):
+        """Percentile du retard sur la fenêtre récente"""
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+    def reset(self):
+        self._recent.clear()
+        self.samples = 0
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.last_stall = None
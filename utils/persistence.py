@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+
+from utils.codec import dumps_json
+
+logger = logging.getLogger('discord_bot.persistence')
+
+
+def atomic_write(path, data):
+    """Écrit des octets dans un fichier de manière atomique (fichier temporaire + rename)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def encode_json(data, indent=2):
+    """Sérialise des données en JSON indenté (UTF-8), lisible à la main"""
+    return dumps_json(data, indent=bool(indent))
+
+
+def _tracked(method_name, base):
+    """Enveloppe une méthode modifiante pour incrémenter le compteur de version"""
+    method = getattr(base, method_name)
+
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method_name
+    return wrapper
+
+
+class TrackedDict(dict):
+    """dict dont `version` augmente à chaque modification (premier niveau uniquement)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+
+class TrackedSet(set):
+    """set dont `version` augmente à chaque modification"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+
+for _name in ('__setitem__', '__delitem__', '__ior__', 'clear', 'pop', 'popitem', 'setdefault', 'update'):
+    setattr(TrackedDict, _name, _tracked(_name, dict))
+
+for _name in ('__ior__', '__iand__', '__isub__', '__ixor__', 'add', 'discard', 'remove', 'pop', 'clear',
+              'update', 'difference_update', 'intersection_update', 'symmetric_difference_update'):
+    setattr(TrackedSet, _name, _tracked(_name, set))
+
+
+class WriteBehindStore:
+    """Persistance différée : les modifications marquent des cibles sales,
+    un flusher en tâche de fond regroupe tout en une écriture par intervalle.
+
+    La sérialisation se fait sur la boucle pour capturer un instantané cohérent,
+    seule l'écriture disque (write + fsync + rename) part dans un thread.
+    """
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self._targets = {}  # {nom: (chemin, fonction_instantané, encodeur, fonction_version)}
+        self._dirty = {}  # {nom: set(catégories)}
+        self._versions = {}  # {nom: version au dernier enregistrement}
+        self._sizes = {}  # {nom: taille du dernier fichier écrit}
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stop = asyncio.Event()
+
+        # Statistiques
+        self.writes = 0
+        self.coalesced = 0
+        self.bytes_written = 0
+        self.skipped = 0
+        self.bytes_skipped = 0
+
+    def register(self, name, path, snapshot, encoder=encode_json, version=None):
+        """Déclare une cible persistée (snapshot() renvoie les données à écrire).
+
+        Avec version(), la cible est écrite dès que la version change et une
+        demande d'écriture sans changement de version est ignorée.
+        """
+        self._targets[name] = (path, snapshot, encoder, version)
+        if version is not None:
+            self._versions[name] = version()
+        try:
+            self._sizes[name] = os.path.getsize(path)
+        except OSError:
+            self._sizes[name] = 0
+
+    def mark_dirty(self, name, category=None):
+        """Marque une cible (et éventuellement une catégorie) comme modifiée"""
+        if name not in self._targets:
+            raise KeyError(f"Cible de persistance inconnue: {name}")
+
+        categories = self._dirty.get(name)
+        if categories is None:
+            categories = self._dirty[name] = set()
+        else:
+            self.coalesced += 1
+
+        if category is not None:
+            categories.add(category)
+
+    def _changed(self, name):
+        version = self._targets[name][3]
+        return version is not None and version() != self._versions.get(name)
+
+    def is_dirty(self, name=None):
+        """Indique si une cible (ou n'importe laquelle) attend une écriture"""
+        if name is None:
+            return bool(self._dirty) or any(self._changed(target) for target in self._targets)
+        return name in self._dirty or self._changed(name)
+
+    def start(self):
+        """Démarre le flusher en tâche de fond"""
+        if self._task is None or self._task.done():
+            self._stop.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        """Boucle du flusher : au plus une écriture par cible et par intervalle"""
+        while True:
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+                return  # Arrêt demandé : close() fait la dernière écriture
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Erreur flusher de persistance: {e}")
+
+    async def flush(self):
+        """Écrit toutes les cibles sales, renvoie le nombre de fichiers écrits"""
+        async with self._flush_lock:
+            pending, self._dirty = self._dirty, {}
+            for name in self._targets:
+                if name not in pending and self._changed(name):
+                    pending[name] = set()
+
+            written = 0
+            for name, categories in pending.items():
+                path, snapshot, encoder, version = self._targets[name]
+
+                # Marquée sale mais rien n'a changé depuis la dernière écriture
+                if version is not None and not self._changed(name) and os.path.exists(path):
+                    self.skipped += 1
+                    self.bytes_skipped += self._sizes.get(name, 0)
+                    continue
+
+                current = version() if version is not None else None
+                try:
+                    data = encoder(snapshot())
+                    await asyncio.to_thread(atomic_write, path, data)
+                except Exception as e:
+                    logger.error(f"❌ Erreur écriture {path}: {e}")
+                    # Remettre la cible en attente pour le prochain passage
+                    self._dirty.setdefault(name, set()).update(categories)
+                    continue
+
+                if version is not None:
+                    self._versions[name] = current
+                self._sizes[name] = len(data)
+                written += 1
+                self.writes += 1
+                self.bytes_written += len(data)
+
+                if categories:
+                    logger.debug(f"💾 {path} sauvegardé ({', '.join(sorted(categories))})")
+                else:
+                    logger.debug(f"💾 {path} sauvegardé")
+
+            return written
+
+    async def close(self):
+        """Arrête le flusher et force l'écriture de tout ce qui est en attente"""
+        if self._task is not None:
+            # Pas d'annulation : une écriture en cours se termine (ses catégories sont déjà retirées)
+            self._stop.set()
+            await self._task
+            self._task = None
+
+        return await self.flush()
@@ -0,0 +1,154 @@
+from bisect import bisect_left, insort
+
+
+class FenwickTree:
+    """Sommes préfixes en O(log n) avec mise à jour ponctuelle en O(log n)"""
+
+    def __init__(self, values=()):
+        self._tree = [0] * (len(values) + 1)
+        for index, value in enumerate(values):
+            self.add(index, value)
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def add(self, index, delta):
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        """Somme des valeurs d'indice < index"""
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, position):
+        """Plus petit indice dont la somme préfixe inclusive dépasse `position` (0-indexé)"""
+        index = 0
+        step = 1 << (len(self).bit_length())
+        while step:
+            candidate = index + step
+            if candidate < len(self._tree) and self._tree[candidate] <= position:
+                index = candidate
+                position -= self._tree[candidate]
+            step >>= 1
+        return index, position
+
+
+class RankingIndex:
+    """Classement maintenu incrémentalement (score décroissant, puis ID croissant).
+
+    Les entrées sont réparties dans des seaux triés d'au plus `bucket_size`
+    éléments ; un arbre de Fenwick sur la taille des seaux donne la position
+    absolue. Mise à jour, rang d'un membre et début d'une page coûtent
+    O(log n) (plus un décalage mémoire dans un seau de taille bornée), une
+    page de `count` entrées O(log n + count).
+    """
+
+    def __init__(self, scores=None, bucket_size=512):
+        self.bucket_size = bucket_size
+        self._scores = {}
+        self._buckets = []
+        self._maxes = []  # Plus grande entrée de chaque seau
+        self._sizes = FenwickTree()
+        if scores:
+            self._scores = {str(key): score for key, score in scores.items()}
+            self._rebuild(sorted((-score, key) for key, score in self._scores.items()))
+
+    def _rebuild(self, entries):
+        size = self.bucket_size // 2 or 1
+        self._buckets = [entries[i:i + size] for i in range(0, len(entries), size)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._sizes = FenwickTree([len(bucket) for bucket in self._buckets])
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, key):
+        return str(key) in self._scores
+
+    def score(self, key, default=None):
+        return self._scores.get(str(key), default)
+
+    def _locate(self, entry):
+        """Indice du seau où se trouve (ou doit aller) une entrée"""
+        index = bisect_left(self._maxes, entry)
+        return min(index, len(self._buckets) - 1)
+
+    def update(self, key, score):
+        """Insère ou déplace un membre"""
+        key = str(key)
+        previous = self._scores.get(key)
+        if previous == score:
+            return
+        if previous is not None:
+            self._remove_entry((-previous, key))
+        self._scores[key] = score
+        self._insert_entry((-score, key))
+
+    def remove(self, key):
+        key = str(key)
+        score = self._scores.pop(key, None)
+        if score is not None:
+            self._remove_entry((-score, key))
+
+    def _insert_entry(self, entry):
+        if not self._buckets:
+            self._rebuild([entry])
+            return
+
+        index = self._locate(entry)
+        bucket = self._buckets[index]
+        insort(bucket, entry)
+        self._maxes[index] = bucket[-1]
+        self._sizes.add(index, 1)
+
+        if len(bucket) > self.bucket_size:
+            # Découpage du seau : rare, l'arbre des tailles est reconstruit
+            half = len(bucket) // 2
+            self._buckets[index:index + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[index:index + 1] = [bucket[half - 1], bucket[-1]]
+            self._sizes = FenwickTree([len(b) for b in self._buckets])
+
+    def _remove_entry(self, entry):
+        index = self._locate(entry)
+        bucket = self._buckets[index]
+        position = bisect_left(bucket, entry)
+        del bucket[position]
+        self._sizes.add(index, -1)
+
+        if bucket:
+            self._maxes[index] = bucket[-1]
+        else:
+            del self._buckets[index]
+            del self._maxes[index]
+            self._sizes = FenwickTree([len(b) for b in self._buckets])
+
+    def rank(self, key):
+        """Rang (1 = premier) d'un membre, None s'il n'est pas classé"""
+        key = str(key)
+        score = self._scores.get(key)
+        if score is None:
+            return None
+        entry = (-score, key)
+        index = self._locate(entry)
+        return self._sizes.prefix(index) + bisect_left(self._buckets[index], entry) + 1
+
+    def page(self, start, count):
+        """Entrées [(clé, score)] aux positions start..start+count-1 (0-indexées)"""
+        if start < 0 or start >= len(self) or count <= 0:
+            return []
+
+        index, offset = self._sizes.find(start)
+        results = []
+        while index < len(self._buckets) and len(results) < count:
+            bucket = self._buckets[index]
+            for negative_score, key in bucket[offset:offset + count - len(results)]:
+                results.append((key, -negative_score))
+            index += 1
+            offset = 0
+        return results
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger('discord_bot.role_sync')
+
+
+class RoleSyncQueue:
+    """File de modifications de rôles regroupées par membre.
+
+    Les demandes successives pour un même membre (ajouts et retraits) sont
+    fusionnées en un seul `member.edit(roles=...)`, envoyé seulement si les
+    rôles changent vraiment. Les modifications d'un serveur sont espacées
+    d'au moins 1/`rate_per_guild` seconde pour rester sous la limite de
+    l'API Discord, même pendant une réconciliation de milliers de membres.
+    """
+
+    def __init__(self, rate_per_guild=2.0, reason="Synchronisation des rôles"):
+        self.interval = 1 / rate_per_guild
+        self.reason = reason
+        self._pending = {}  # {(guild_id, member_id): [membre, ajouts, retraits]}, ordre d'arrivée
+        self._next_edit = {}  # {guild_id: instant de la prochaine modification autorisée}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+        # Statistiques
+        self.requests = 0
+        self.edits = 0
+        self.skipped = 0
+        self.failures = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request(self, member, add=(), remove=()):
+        """Programme l'ajout / le retrait de rôles (IDs), fusionné avec les demandes en attente"""
+        key = (member.guild.id, member.id)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = [member, set(), set()]
+        else:
+            entry[0] = member
+        entry[1].difference_update(remove)
+        entry[2].difference_update(add)
+        entry[1].update(add)
+        entry[2].update(remove)
+        self.requests += 1
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # Premier membre dont le serveur peut recevoir une modification
+            now = time.monotonic()
+            ready = next(
+                (key for key in self._pending if self._next_edit.get(key[0], 0) <= now), None
+            )
+            if ready is None:
+                wait = min(self._next_edit[guild_id] for guild_id, _ in self._pending) - now
+                await asyncio.sleep(max(wait, 0.01))
+                continue
+
+            member, add, remove = self._pending.pop(ready)
+            try:
+                if await self._apply(member, add, remove):
+                    self._next_edit[ready[0]] = time.monotonic() + self.interval
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ Erreur synchronisation des rôles de {member}: {e}")
+
+    async def _apply(self, member, add, remove):
+        # Rôles actuels (cache à jour), sans @everyone
+        member = member.guild.get_member(member.id) or member
+        current = {role.id for role in member.roles[1:]}
+        target = (current | add) - remove
+        if target == current:
+            self.skipped += 1
+            return False
+
+        roles = [role for role in member.roles[1:] if role.id in target]
+        roles += filter(None, (member.guild.get_role(role_id) for role_id in target - current))
+        try:
+            await member.edit(roles=roles, reason=self.reason)
+        except discord.Forbidden:
+            self.failures += 1
+            logger.warning(f"⚠️ Permissions insuffisantes pour modifier les rôles de {member}")
+            return True
+
+        self.edits += 1
+        return True
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.codec import read_file
+from utils.persistence import atomic_write, encode_json
+
+logger = logging.getLogger('discord_bot.storage')
+
+
+class AsyncStorage:
+    """Façade de stockage asynchrone : aucune E/S disque sur la boucle.
+
+    La sérialisation se fait sur la boucle (instantané cohérent des données
+    que les cogs continuent de modifier), l'écriture atomique + fsync part sur
+    un thread d'E/S dédié. Avec un seul thread, les écritures d'un même fichier
+    sont appliquées dans l'ordre où elles ont été demandées.
+    """
+
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='storage-io')
+        self._pending = set()
+        self.closed = False
+
+        # Statistiques
+        self.saves = 0
+        self.failures = 0
+        self.bytes_written = 0
+        self.encode_time = 0.0  # Temps passé sur la boucle
+        self.write_time = 0.0  # Temps passé dans le thread d'E/S
+        self.max_encode_time = 0.0
+
+    async def run(self, func, *args):
+        """Exécute une opération fichier bloquante sur le thread d'E/S"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _write(self, path, data):
+        start = time.perf_counter()
+        atomic_write(path, data)
+        return time.perf_counter() - start
+
+    def _submit(self, path, data, encoder):
+        start = time.perf_counter()
+        payload = encoder(data)
+        elapsed = time.perf_counter() - start
+        self.encode_time += elapsed
+        self.max_encode_time = max(self.max_encode_time, elapsed)
+
+        loop = asyncio.get_running_loop()
+        return payload, loop.run_in_executor(self._executor, self._write, path, payload)
+
+    async def save(self, path, data, encoder=encode_json):
+        """Sauvegarde des données et attend que l'écriture soit sur disque"""
+        payload, future = self._submit(path, data, encoder)
+        try:
+            self.write_time += await future
+        except Exception:
+            self.failures += 1
+            raise
+
+        self.saves += 1
+        self.bytes_written += len(payload)
+        return len(payload)
+
+    def save_soon(self, path, data, encoder=encode_json):
+        """Programme une sauvegarde sans l'attendre (pour les méthodes synchrones)"""
+        task = asyncio.get_running_loop().create_task(self._save_logged(path, data, encoder))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _save_logged(self, path, data, encoder):
+        try:
+            await self.save(path, data, encoder)
+        except Exception as e:
+            logger.error(f"❌ Erreur sauvegarde {path}: {e}")
+
+    async def load(self, path, default=None):
+        """Lit un fichier d'état sur le thread d'E/S, format détecté (default si absent)"""
+        try:
+            return await self.run(read_file, path)
+        except FileNotFoundError:
+            return default
+
+    async def drain(self):
+        """Attend la fin de toutes les sauvegardes programmées"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self):
+        """Termine les écritures en cours puis arrête le thread d'E/S"""
+        if self.closed:
+            return
+        await self.drain()
+        self._executor.shutdown(wait=True)
+        self.closed = True
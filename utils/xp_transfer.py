@@ -0,0 +1,306 @@
+"""Import / export en flux de l'XP d'un serveur (NDJSON ou CSV).
+
+Une ligne par membre :
+    NDJSON  {"user_id": "123", "xp": 4500, "messages": 210}
+    CSV     user_id,xp,messages (ligne d'en-tête obligatoire)
+
+Le format se déduit de l'extension (.ndjson / .jsonl / .csv, suffixe .gz
+accepté). Les fichiers sont lus et écrits par lots de lignes : la mémoire
+ne dépend pas de la taille du fichier.
+
+Utilisation (bot arrêté, sinon passer par !xpexport / !xpimport) :
+    python -m utils.xp_transfer export <guild_id> xp.ndjson
+    python -m utils.xp_transfer import <guild_id> xp.csv [--add] [--dry-run]
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import math
+import os
+import sys
+import time
+from itertools import islice
+
+from utils.codec import read_file
+from utils.database import Database, create_backend
+from utils.xpstore import MAX_MESSAGES, MAX_XP, XPStore
+
+logger = logging.getLogger('discord_bot.xp_transfer')
+
+FIELDS = ('user_id', 'xp', 'messages')
+MAX_ERRORS = 20  # Erreurs détaillées dans le rapport (les suivantes sont seulement comptées)
+MAX_USER_ID = 2 ** 64 - 1
+
+# Namespaces du cog Levels : levels:<guild_id>, total global dans levels:0
+NAMESPACE = 'levels'
+GLOBAL_XP = 0
+
+
+class XPImportError(ValueError):
+    """Fichier d'import invalide"""
+
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    raise XPImportError(f"Format inconnu pour {os.path.basename(path)} (attendu .ndjson, .jsonl ou .csv)")
+
+
+def level_from_xp(xp):
+    """Même formule que Levels.get_level_from_xp"""
+    return int(math.sqrt(xp / 100))
+
+
+def parse_row(fields):
+    """Valide une ligne {'user_id', 'xp', 'messages'} et renvoie (user_id, xp, messages)"""
+    try:
+        user_id = int(fields.get('user_id', fields.get('id')))
+        xp = int(fields['xp'])
+        messages = int(fields.get('messages') or 0)
+    except KeyError as e:
+        raise XPImportError(f"champ manquant {e}")
+    except (TypeError, ValueError):
+        raise XPImportError("valeur non entière")
+
+    if not 0 < user_id <= MAX_USER_ID:
+        raise XPImportError(f"ID utilisateur invalide: {user_id}")
+    if not 0 <= xp <= MAX_XP:
+        raise XPImportError(f"XP hors limites: {xp}")
+    if not 0 <= messages <= MAX_MESSAGES:
+        raise XPImportError(f"nombre de messages hors limites: {messages}")
+    return user_id, xp, messages
+
+
+class RowReader:
+    """Lecture par lots d'un fichier d'XP (bloquante : à appeler depuis un thread d'E/S)"""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or detect_format(path)
+        self.size = os.path.getsize(path)
+        self._raw = open(path, 'rb')
+        stream = gzip.GzipFile(fileobj=self._raw) if path.endswith('.gz') else self._raw
+        self._text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        self._lines = self._iter_lines()
+        self.line = 0
+        self.rows = 0
+        self.error_count = 0
+        self.errors = []  # [(ligne, message)], au plus MAX_ERRORS
+
+    def _iter_lines(self):
+        if self.format == 'csv':
+            reader = csv.DictReader(self._text)
+            columns = set(reader.fieldnames or ())
+            if 'xp' not in columns or not columns & {'user_id', 'id'}:
+                yield 1, XPImportError("en-tête CSV manquant (user_id,xp,messages)")
+                return
+            for fields in reader:
+                yield reader.line_num, fields
+        else:
+            for number, line in enumerate(self._text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    fields = json.loads(line)
+                except ValueError:
+                    yield number, XPImportError("JSON invalide")
+                    continue
+                yield number, fields if isinstance(fields, dict) else XPImportError("objet JSON attendu")
+
+    def read(self, count):
+        """Jusqu'à `count` lignes valides [(user_id, xp, messages)], [] à la fin du fichier"""
+        batch = []
+        for number, fields in self._lines:
+            self.line = number
+            try:
+                if isinstance(fields, XPImportError):
+                    raise fields
+                batch.append(parse_row(fields))
+            except XPImportError as e:
+                self.error_count += 1
+                if len(self.errors) < MAX_ERRORS:
+                    self.errors.append((number, str(e)))
+                continue
+            if len(batch) >= count:
+                break
+        self.rows += len(batch)
+        return batch
+
+    def progress(self):
+        """Part du fichier lue (0 à 1)"""
+        return self._raw.tell() / self.size if self.size else 1.0
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RowWriter:
+    """Écriture par lots d'un fichier d'XP (bloquante : à appeler depuis un thread d'E/S)"""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or detect_format(path)
+        self.rows = 0
+        if path.endswith('.gz'):
+            self._file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+        if self.format == 'csv':
+            self._file.write(",".join(FIELDS) + "\n")
+
+    def write(self, rows):
+        if self.format == 'csv':
+            lines = [f"{user_id},{xp},{messages}\n" for user_id, xp, messages in rows]
+        else:
+            # ID en chaîne : les snowflakes dépassent la précision des nombres JSON de la plupart des outils
+            lines = [
+                f'{{"user_id": "{user_id}", "xp": {xp}, "messages": {messages}}}\n'
+                for user_id, xp, messages in rows
+            ]
+        self._file.writelines(lines)
+        self.rows += len(lines)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def validate_file(path, fmt=None, batch_size=10000):
+    """Première passe : (lignes valides, nombre d'erreurs, détail des premières erreurs)"""
+    with RowReader(path, fmt) as reader:
+        while reader.read(batch_size):
+            pass
+        return reader.rows, reader.error_count, reader.errors
+
+
+def export_snapshot(snapshot, path, fmt=None, batch_size=10000):
+    """Exporte un instantané XPStore (octets de serialize()), renvoie le nombre de lignes"""
+    rows = XPStore.from_buffer(snapshot).items()
+    with RowWriter(path, fmt) as writer:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            writer.write(batch)
+    return writer.rows
+
+
+async def export_guild(db, guild_id, path, fmt=None, batch_size=10000):
+    """Exporte l'XP d'un serveur depuis la base, par lots triés par ID"""
+    with RowWriter(path, fmt) as writer:
+        async for batch in db.scan(f"{NAMESPACE}:{guild_id}", batch_size):
+            writer.write(
+                (user_id, data.get('xp', 0), data.get('messages', 0)) for user_id, data in batch
+            )
+    return writer.rows
+
+
+async def import_guild(db, guild_id, path, fmt=None, add=False, batch_size=5000, progress=None):
+    """Importe un fichier validé dans la base, une transaction par lot.
+
+    `add` : ajoute l'XP et les messages aux valeurs existantes au lieu de
+    les remplacer. Le total global (levels:0) reçoit la différence.
+    """
+    rows, error_count, errors = validate_file(path, fmt)
+    if error_count:
+        details = "\n".join(f"  ligne {line}: {message}" for line, message in errors)
+        raise XPImportError(f"{error_count} ligne(s) invalide(s), rien n'a été importé :\n{details}")
+
+    namespace = f"{NAMESPACE}:{guild_id}"
+    global_namespace = f"{NAMESPACE}:{GLOBAL_XP}"
+    capped = 0
+    with RowReader(path, fmt) as reader:
+        while True:
+            batch = reader.read(batch_size)
+            if not batch:
+                break
+
+            keys = [str(user_id) for user_id, _, _ in batch]
+            current = await db.get_many(namespace, keys)
+            totals = await db.get_many(global_namespace, keys)
+            for key, (_, xp, messages) in zip(keys, batch):
+                old = current.get(key, {})
+                old_xp, old_messages = old.get('xp', 0), old.get('messages', 0)
+                if add:
+                    xp, messages = xp + old_xp, messages + old_messages
+                    if xp > MAX_XP or messages > MAX_MESSAGES:
+                        xp, messages = min(xp, MAX_XP), min(messages, MAX_MESSAGES)
+                        capped += 1
+
+                total = totals.get(key, {})
+                total_xp = min(max(0, total.get('xp', 0) + xp - old_xp), MAX_XP)
+                total_messages = min(max(0, total.get('messages', 0) + messages - old_messages), MAX_MESSAGES)
+                db.put(namespace, key, {'xp': xp, 'level': level_from_xp(xp), 'messages': messages})
+                db.put(global_namespace, key, {
+                    'xp': total_xp, 'level': level_from_xp(total_xp), 'messages': total_messages
+                })
+
+            await db.flush()
+            if progress is not None:
+                progress(reader.rows, reader.progress())
+    if capped:
+        logger.warning(f"⚠️ {capped} membre(s) plafonné(s) à {MAX_XP} XP / {MAX_MESSAGES} messages (somme trop grande)")
+    return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Import / export de l'XP d'un serveur (NDJSON ou CSV)")
+    parser.add_argument('action', choices=('export', 'import'))
+    parser.add_argument('guild_id', type=int)
+    parser.add_argument('path', help="Fichier .ndjson, .jsonl ou .csv (suffixe .gz accepté)")
+    parser.add_argument('--add', action='store_true', help="Ajouter aux valeurs existantes au lieu de les remplacer")
+    parser.add_argument('--dry-run', action='store_true', help="Valider le fichier sans rien importer")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        rows, error_count, errors = validate_file(args.path)
+        for line, message in errors:
+            print(f"❌ ligne {line}: {message}")
+        print(f"{rows} ligne(s) valide(s), {error_count} erreur(s)")
+        sys.exit(1 if error_count else 0)
+
+    config = read_file('config.json')
+    db = Database(create_backend(config.get('persistence', {})))
+    await db.connect()
+    started = time.perf_counter()
+    try:
+        if args.action == 'export':
+            rows = await export_guild(db, args.guild_id, args.path)
+        else:
+            def report(count, fraction):
+                print(f"\r⏳ {count:,} ligne(s) importée(s) ({fraction:.0%})", end="", flush=True)
+            rows = await import_guild(db, args.guild_id, args.path, add=args.add, progress=report)
+            print()
+    except XPImportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        await db.close()
+
+    print(f"✅ {rows:,} membre(s) {'exporté(s)' if args.action == 'export' else 'importé(s)'} "
+          f"en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+"""Stockage compact de l'XP d'un serveur.
+
+Trois tableaux typés parallèles (IDs triés, XP, messages) : 20 octets par
+membre au lieu d'un dict Python par membre (plusieurs centaines d'octets).
+Le niveau n'est pas stocké, il se calcule depuis l'XP.
+
+Format de l'instantané (`data/xp/<guild_id>.xpa`) :
+    en-tête  MAGIC, version, nombre de membres, date de l'instantané
+    ids      nombre × uint64, triés
+    xp       nombre × int64
+    messages nombre × uint32
+
+Le fichier est projeté en mémoire (mmap, copie à l'écriture) : l'ouverture
+ne lit rien, les pages sont chargées à la demande et partagées avec le cache
+du système. Les modifications restent privées jusqu'au prochain instantané.
+"""
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+
+MAGIC = b'NZXP'
+VERSION = 1
+HEADER = struct.Struct('<4sIQd')
+
+# Limites des tableaux (int64 et uint32) : une valeur au-delà ne peut pas être stockée
+MAX_XP = 2 ** 63 - 1
+MAX_MESSAGES = 2 ** 32 - 1
+
+
+def _clamp(value, maximum):
+    return 0 if value < 0 else maximum if value > maximum else value
+
+
+class XPStoreError(Exception):
+    """Instantané illisible ou incompatible"""
+
+
+class XPStore:
+    """XP et messages des membres d'un serveur, indexés par ID"""
+
+    def __init__(self, ids=None, xp=None, messages=None, snapshot_time=0.0):
+        self._ids = ids if ids is not None else array('Q')  # Triés : recherche par bisect
+        self._xp = xp if xp is not None else array('q')
+        self._messages = messages if messages is not None else array('I')
+        self._extra = {}  # {user_id: [xp, messages]} membres apparus depuis l'instantané
+        self.snapshot_time = snapshot_time
+        self.changes = 0  # Modifications depuis le dernier instantané
+
+    @classmethod
+    def from_records(cls, records, snapshot_time=0.0):
+        """Construit le store depuis des enregistrements {user_id: {'xp', 'messages', ...}}"""
+        ordered = sorted((int(user_id), data) for user_id, data in records.items())
+        return cls(
+            array('Q', (user_id for user_id, _ in ordered)),
+            array('q', (data.get('xp', 0) for _, data in ordered)),
+            array('I', (data.get('messages', 0) for _, data in ordered)),
+            snapshot_time
+        )
+
+    @classmethod
+    def open(cls, path):
+        """Projette un instantané en mémoire (FileNotFoundError s'il n'existe pas)"""
+        with open(path, 'rb') as f:
+            size = f.seek(0, 2)
+            if size < HEADER.size:
+                raise XPStoreError(f"Instantané tronqué: {path}")
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        return cls.from_buffer(mapping, path)
+
+    @classmethod
+    def from_buffer(cls, buffer, name="<mémoire>"):
+        """Store adossé à un instantané déjà en mémoire (octets de serialize(), mmap...)"""
+        if len(buffer) < HEADER.size:
+            raise XPStoreError(f"Instantané tronqué: {name}")
+        magic, version, count, snapshot_time = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise XPStoreError(f"Format d'instantané inconnu: {name}")
+        if len(buffer) != HEADER.size + count * 20:
+            raise XPStoreError(f"Taille d'instantané incohérente: {name}")
+
+        view = memoryview(buffer)
+        ids_end = HEADER.size + count * 8
+        xp_end = ids_end + count * 8
+        return cls(
+            view[HEADER.size:ids_end].cast('Q'),
+            view[ids_end:xp_end].cast('q'),
+            view[xp_end:].cast('I'),
+            snapshot_time
+        )
+
+    def __len__(self):
+        return len(self._ids) + len(self._extra)
+
+    def __contains__(self, user_id):
+        user_id = int(user_id)
+        return user_id in self._extra or self._slot(user_id) is not None
+
+    def _slot(self, user_id):
+        index = bisect_left(self._ids, user_id)
+        if index < len(self._ids) and self._ids[index] == user_id:
+            return index
+        return None
+
+    def get(self, user_id):
+        """(xp, messages) d'un membre, None s'il n'a jamais gagné d'XP"""
+        user_id = int(user_id)
+        slot = self._slot(user_id)
+        if slot is not None:
+            return self._xp[slot], self._messages[slot]
+        extra = self._extra.get(user_id)
+        return tuple(extra) if extra is not None else None
+
+    def add(self, user_id, xp, messages=0):
+        """Ajoute de l'XP et des messages (O(log n)), renvoie la nouvelle XP (bornée à MAX_XP)"""
+        user_id = int(user_id)
+        self.changes += 1
+        slot = self._slot(user_id)
+        if slot is not None:
+            self._xp[slot] = _clamp(self._xp[slot] + xp, MAX_XP)
+            self._messages[slot] = _clamp(self._messages[slot] + messages, MAX_MESSAGES)
+            return self._xp[slot]
+
+        extra = self._extra.setdefault(user_id, [0, 0])
+        extra[0] = _clamp(extra[0] + xp, MAX_XP)
+        extra[1] = _clamp(extra[1] + messages, MAX_MESSAGES)
+        return extra[0]
+
+    def set(self, user_id, xp, messages=None):
+        """Remplace l'XP (et les messages si fournis) d'un membre, valeurs bornées aux limites"""
+        user_id = int(user_id)
+        self.changes += 1
+        xp = _clamp(xp, MAX_XP)
+        if messages is not None:
+            messages = _clamp(messages, MAX_MESSAGES)
+        slot = self._slot(user_id)
+        if slot is not None:
+            self._xp[slot] = xp
+            if messages is not None:
+                self._messages[slot] = messages
+            return
+
+        extra = self._extra.setdefault(user_id, [0, 0])
+        extra[0] = xp
+        if messages is not None:
+            extra[1] = messages
+
+    def items(self):
+        """Itère sur (user_id, xp, messages)"""
+        yield from zip(self._ids, self._xp, self._messages)
+        for user_id, (xp, messages) in self._extra.items():
+            yield user_id, xp, messages
+
+    def serialize(self, snapshot_time):
+        """Octets de l'instantané : les nouveaux membres sont fusionnés par tranches triées dans les tableaux"""
+        ids, xp, messages = self._ids, self._xp, self._messages
+        if self._extra:
+            merged_ids, merged_xp, merged_messages = array('Q'), array('q'), array('I')
+            start = 0
+            for user_id in sorted(self._extra):
+                position = bisect_left(ids, user_id, start)
+                merged_ids.frombytes(ids[start:position].tobytes())
+                merged_xp.frombytes(xp[start:position].tobytes())
+                merged_messages.frombytes(messages[start:position].tobytes())
+
+                extra_xp, extra_messages = self._extra[user_id]
+                merged_ids.append(user_id)
+                merged_xp.append(extra_xp)
+                merged_messages.append(extra_messages)
+                start = position
+
+            merged_ids.frombytes(ids[start:].tobytes())
+            merged_xp.frombytes(xp[start:].tobytes())
+            merged_messages.frombytes(messages[start:].tobytes())
+            ids, xp, messages = merged_ids, merged_xp, merged_messages
+            # Les tableaux fusionnés remplacent les anciens : _extra ne grossit pas sur un serveur jamais évincé
+            self._ids, self._xp, self._messages = ids, xp, messages
+            self._extra = {}
+
+        header = HEADER.pack(MAGIC, VERSION, len(ids), snapshot_time)
+        return b''.join((header, ids.tobytes(), xp.tobytes(), messages.tobytes()))
+
+    def nbytes(self):
+        """Mémoire des tableaux (hors membres ajoutés depuis l'instantané)"""
+        return len(self._ids) * 20
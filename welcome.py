@@ -138,9 +138,7 @@ class Welcome(commands.Cog):
         self.bot.config['channels']['welcome'] = channel.id
         
         # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
         
         embed = discord.Embed(
             title="✅ Configuration mise à jour",
@@ -158,9 +156,7 @@ class Welcome(commands.Cog):
         self.bot.config['messages']['welcome_description'] = message
 
         # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
 
         embed = discord.Embed(
             title="✅ Message de bienvenue mis à jour",
@@ -183,9 +179,7 @@ class Welcome(commands.Cog):
         self.bot.config['channels']['goodbye'] = channel.id
 
         # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
 
         embed = discord.Embed(
             title="✅ Configuration mise à jour",
@@ -205,9 +199,7 @@ class Welcome(commands.Cog):
         self.bot.config['messages']['goodbye_description'] = message
 
         # Sauvegarde de la configuration
-        import json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.bot.config, f, indent=2, ensure_ascii=False)
+        await self.bot.save_config()
 
         embed = discord.Embed(
             title="✅ Message d'au revoir mis à jour",